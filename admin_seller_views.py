@@ -1,6 +1,9 @@
 # admin_seller_views.py — Streamlit version
 import streamlit as st
 import pandas as pd
+import metrics
+import services
+from db_connector import fetch_parallel
 
 # ---------- small helpers ----------
 def _fetchall(cursor, query, params=None):
@@ -11,12 +14,55 @@ def _fetchone(cursor, query, params=None):
     cursor.execute(query, params or ())
     return cursor.fetchone()
 
+def _listing_products(cursor, inventory_id):
+    """[product_id] of a listing, for services.invalidate_offers(); None (= all) if unknown."""
+    row = _fetchone(cursor, "SELECT product_id FROM Inventory WHERE inventory_id = %s", (int(inventory_id),))
+    return [int(row[0])] if row else None
+
+# Every tab below is an st.fragment: interacting with a tab reruns only that tab.
+# A full menu run loads all tab data at once (fetch_parallel) and hands each tab its
+# rows through _take_prefetched(); when a tab reruns on its own it finds nothing
+# there and runs just its own query.
+def _store_prefetched(scope, rows_by_tab):
+    st.session_state[scope] = rows_by_tab
+
+def _take_prefetched(scope, tab):
+    """Rows loaded for `tab` by the last full menu run, once; None on the tab's own reruns."""
+    return st.session_state.get(scope, {}).pop(tab, None)
+
+# A tab that changes data reruns the whole menu, since the other tabs show that data
+# too. The rerun would wipe an st.success() shown first, so the message waits in
+# session state and the tab shows it on the run after.
+def _flash(tab, message):
+    st.session_state.setdefault("menu_notices", {})[tab] = message
+
+def _show_flash(tab):
+    message = st.session_state.get("menu_notices", {}).pop(tab, None)
+    if message:
+        st.success(message)
+
+USERS_SQL = "SELECT user_id, first_name, last_name, email, user_role FROM Users"
+PRODUCTS_SQL = "SELECT product_id, product_name, brand, category_id FROM Products"
+ORDERS_SQL = "SELECT order_id, customer_id, total_amount, order_status, order_date FROM Orders"
+ARCHIVED_ORDERS_SQL = "SELECT order_id, customer_id, total_amount, order_status, order_date FROM OrdersArchive"
+SELLER_LISTINGS_SQL = """
+    SELECT i.inventory_id, p.product_name, i.price, i.stock_quantity
+    FROM Inventory AS i
+    JOIN Products AS p ON i.product_id = p.product_id
+    WHERE i.seller_id = %s
+    ORDER BY i.inventory_id DESC
+"""
+CATALOG_SQL = "SELECT product_id, product_name, brand FROM Products ORDER BY product_name ASC"
+
 # ---------- Admin helpers ----------
+@st.fragment
+@metrics.timed_fragment("admin_menu")
 def add_new_product(connection):
     """Streamlit UI for admin to add a new product to Products."""
     c = connection.cursor()
     try:
         st.markdown("### ➕ Add New Product to Catalog")
+        _show_flash("add_product")
 
         # categories list
         cats = _fetchall(c, "SELECT category_id, category_name FROM Categories")
@@ -46,19 +92,26 @@ def add_new_product(connection):
                     (product_name, brand, int(category_id))
                 )
                 connection.commit()
-                st.success(f"Product '{product_name}' added successfully.")
+                services.invalidate_catalog()
             except Exception as e:
                 connection.rollback()
                 st.error(f"❌ Error adding product: {e}")
+            else:
+                # All Products lists the new product, so refresh the whole menu
+                _flash("add_product", f"Product '{product_name}' added successfully.")
+                st.rerun()
     finally:
         c.close()
 
 
+@st.fragment
+@metrics.timed_fragment("admin_menu")
 def add_new_user(connection):
     """Streamlit UI for admin to add a new user."""
     c = connection.cursor()
     try:
         st.markdown("### 👤 Add New User")
+        _show_flash("add_user")
         with st.form("add_user_form"):
             col1, col2 = st.columns(2)
             with col1:
@@ -80,19 +133,25 @@ def add_new_user(connection):
                     (first_name, last_name, email, password, role)
                 )
                 connection.commit()
-                st.success(f"User '{email}' created successfully as a '{role}'.")
             except Exception as e:
                 connection.rollback()
                 st.error(f"❌ Error adding user: {e}")
+            else:
+                # All Users lists the new user, so refresh the whole menu
+                _flash("add_user", f"User '{email}' created successfully as a '{role}'.")
+                st.rerun()
     finally:
         c.close()
 
 
+@st.fragment
+@metrics.timed_fragment("admin_menu")
 def remove_user(connection):
     """Streamlit UI for admin to remove a user."""
     c = connection.cursor()
     try:
         st.markdown("### 🗑️ Remove User")
+        _show_flash("remove_user")
         with st.form("remove_user_form"):
             user_id_str = st.text_input("User ID to remove")
             submitted = st.form_submit_button("Remove")
@@ -104,20 +163,85 @@ def remove_user(connection):
             user_id = int(user_id_str)
             try:
                 c.execute("DELETE FROM Users WHERE user_id = %s", (user_id,))
-                if c.rowcount > 0:
+                removed = c.rowcount > 0
+                if removed:
                     connection.commit()
-                    st.success(f"User with ID {user_id} has been removed.")
+                    # A removed seller's listings go with them
+                    services.invalidate_offers()
                 else:
                     st.info("User ID not found.")
             except Exception as e:
                 connection.rollback()
                 st.error("❌ Error removing user: "
                          f"{e}\n(Note: You cannot remove a user who has existing orders or inventory listings.)")
+            else:
+                if removed:
+                    # All Users still lists the removed user, so refresh the whole menu
+                    _flash("remove_user", f"User with ID {user_id} has been removed.")
+                    st.rerun()
     finally:
         c.close()
 
 
 # ---------- Admin main ----------
+@st.fragment
+@metrics.timed_fragment("admin_menu")
+def _all_users_tab(connection):
+    c = connection.cursor()
+    try:
+        rows = _take_prefetched("admin_prefetch", "users")
+        if rows is None:
+            rows = _fetchall(c, USERS_SQL)
+        if rows:
+            df = pd.DataFrame(rows, columns=["User ID", "First", "Last", "Email", "Role"])
+            st.dataframe(df, width="stretch")
+        else:
+            st.info("No users found.")
+    except Exception as e:
+        st.error(f"Error loading users: {e}")
+    finally:
+        c.close()
+
+@st.fragment
+@metrics.timed_fragment("admin_menu")
+def _all_products_tab(connection):
+    c = connection.cursor()
+    try:
+        rows = _take_prefetched("admin_prefetch", "products")
+        if rows is None:
+            rows = _fetchall(c, PRODUCTS_SQL)
+        if rows:
+            df = pd.DataFrame(rows, columns=["Product ID", "Product", "Brand", "Category ID"])
+            st.dataframe(df, width="stretch")
+        else:
+            st.info("No products found.")
+    except Exception as e:
+        st.error(f"Error loading products: {e}")
+    finally:
+        c.close()
+
+@st.fragment
+@metrics.timed_fragment("admin_menu")
+def _all_orders_tab(connection):
+    include_archived = st.checkbox("Include archived orders", value=False, key="admin_include_archived")
+    c = connection.cursor()
+    try:
+        rows = _take_prefetched("admin_prefetch", "orders")
+        if rows is None:
+            rows = _fetchall(c, ORDERS_SQL)
+            # The archive is only read when asked for
+            if include_archived:
+                rows = list(rows) + list(_fetchall(c, ARCHIVED_ORDERS_SQL))
+        if rows:
+            df = pd.DataFrame(rows, columns=["Order ID", "Customer ID", "Total", "Status", "Date"])
+            st.dataframe(df, width="stretch")
+        else:
+            st.info("No orders found.")
+    except Exception as e:
+        st.error(f"Error loading orders: {e}")
+    finally:
+        c.close()
+
 def show_admin_menu(connection):
     """Streamlit admin menu."""
     st.subheader("👑 Admin Menu")
@@ -132,50 +256,30 @@ def show_admin_menu(connection):
         "Logout",
     ])
 
+    # Tabs render one after another, so load all three lists up front in parallel.
+    # If that fails each tab loads (and reports) its own data.
+    queries = {"users": (USERS_SQL, None), "products": (PRODUCTS_SQL, None), "orders": (ORDERS_SQL, None)}
+    if st.session_state.get("admin_include_archived"):
+        queries["archived_orders"] = (ARCHIVED_ORDERS_SQL, None)
+    try:
+        results = fetch_parallel(connection, queries)
+        if "archived_orders" in results:
+            results["orders"] = list(results["orders"]) + list(results.pop("archived_orders"))
+        _store_prefetched("admin_prefetch", results)
+    except Exception:
+        _store_prefetched("admin_prefetch", {})
+
     # 1. All Users
     with tabs[0]:
-        c = connection.cursor()
-        try:
-            rows = _fetchall(c, "SELECT user_id, first_name, last_name, email, user_role FROM Users")
-            if rows:
-                df = pd.DataFrame(rows, columns=["User ID", "First", "Last", "Email", "Role"])
-                st.dataframe(df, use_container_width=True)
-            else:
-                st.info("No users found.")
-        except Exception as e:
-            st.error(f"Error loading users: {e}")
-        finally:
-            c.close()
+        _all_users_tab(connection)
 
     # 2. All Products
     with tabs[1]:
-        c = connection.cursor()
-        try:
-            rows = _fetchall(c, "SELECT product_id, product_name, brand, category_id FROM Products")
-            if rows:
-                df = pd.DataFrame(rows, columns=["Product ID", "Product", "Brand", "Category ID"])
-                st.dataframe(df, use_container_width=True)
-            else:
-                st.info("No products found.")
-        except Exception as e:
-            st.error(f"Error loading products: {e}")
-        finally:
-            c.close()
+        _all_products_tab(connection)
 
     # 3. All Orders
     with tabs[2]:
-        c = connection.cursor()
-        try:
-            rows = _fetchall(c, "SELECT order_id, customer_id, total_amount, order_status, order_date FROM Orders")
-            if rows:
-                df = pd.DataFrame(rows, columns=["Order ID", "Customer ID", "Total", "Status", "Date"])
-                st.dataframe(df, use_container_width=True)
-            else:
-                st.info("No orders found.")
-        except Exception as e:
-            st.error(f"Error loading orders: {e}")
-        finally:
-            c.close()
+        _all_orders_tab(connection)
 
     # 4. Add Product
     with tabs[3]:
@@ -198,6 +302,158 @@ def show_admin_menu(connection):
 
 
 # ---------- Seller main ----------
+@st.fragment
+@metrics.timed_fragment("seller_menu")
+def _my_listings_tab(connection, user_id):
+    c = connection.cursor()
+    try:
+        rows = _take_prefetched("seller_prefetch", "my_listings")
+        if rows is None:
+            rows = _fetchall(c, SELLER_LISTINGS_SQL, (user_id,))
+        if rows:
+            df = pd.DataFrame(rows, columns=["Inventory ID", "Product", "Price", "Stock"])
+            st.dataframe(df, width="stretch")
+        else:
+            st.info("You have no listings yet.")
+    except Exception as e:
+        st.error(f"An error occurred: {e}")
+    finally:
+        c.close()
+
+@st.fragment
+@metrics.timed_fragment("seller_menu")
+def _add_listing_tab(connection, user_id):
+    c = connection.cursor()
+    try:
+        st.markdown("### ➕ Add New Listing")
+        _show_flash("add_listing")
+
+        # Pick from master products
+        prows = _take_prefetched("seller_prefetch", "add_listing")
+        if prows is None:
+            prows = _fetchall(c, CATALOG_SQL)
+        if not prows:
+            st.info("No products in the master catalog. Ask admin to add products first.")
+        else:
+            pdf = pd.DataFrame(prows, columns=["product_id", "product_name", "brand"])
+            with st.form("add_listing_form"):
+                product_id = st.selectbox(
+                    "Master Product",
+                    options=pdf["product_id"],
+                    format_func=lambda pid: f"{int(pid)} — {pdf.loc[pdf['product_id']==pid, 'product_name'].values[0]} ({pdf.loc[pdf['product_id']==pid, 'brand'].values[0]})"
+                )
+                price = st.number_input("Price", min_value=0.0, step=0.01)
+                stock = st.number_input("Stock quantity", min_value=0, step=1)
+                submitted = st.form_submit_button("Create Listing")
+
+            if submitted:
+                try:
+                    c.execute(
+                        "INSERT INTO Inventory (seller_id, product_id, price, stock_quantity) VALUES (%s, %s, %s, %s)",
+                        (user_id, int(product_id), float(price), int(stock))
+                    )
+                    connection.commit()
+                    services.invalidate_offers([int(product_id)])
+                except Exception as e:
+                    connection.rollback()
+                    st.error(f"Error adding listing: {e}")
+                else:
+                    # My Listings, Update and Remove show the new listing too, so refresh the whole menu
+                    _flash("add_listing", "✅ Listing added successfully!")
+                    st.rerun()
+    finally:
+        c.close()
+
+@st.fragment
+@metrics.timed_fragment("seller_menu")
+def _update_listing_tab(connection, user_id):
+    c = connection.cursor()
+    try:
+        st.markdown("### ✏️ Update Listing (Stock/Price)")
+        _show_flash("update_listing")
+        rows = _take_prefetched("seller_prefetch", "update_listing")
+        if rows is None:
+            rows = _fetchall(c, SELLER_LISTINGS_SQL, (user_id,))
+        if not rows:
+            st.info("No listings to update.")
+        else:
+            df = pd.DataFrame(rows, columns=["inventory_id", "Product", "Price", "Stock"])
+            choice = st.selectbox(
+                "Choose a listing",
+                options=df["inventory_id"],
+                format_func=lambda inv: f"#{int(inv)} — {df.loc[df['inventory_id']==inv, 'Product'].values[0]}"
+            )
+            current_row = df.loc[df["inventory_id"] == choice].iloc[0]
+            col1, col2 = st.columns(2)
+            with col1:
+                new_price = st.number_input("New price (leave same to keep)", min_value=0.0, step=0.01, value=float(current_row["Price"]))
+            with col2:
+                new_stock = st.number_input("New stock (leave same to keep)", min_value=0, step=1, value=int(current_row["Stock"]))
+
+            if st.button("Update Listing"):
+                try:
+                    # Only update if changed
+                    if float(new_price) != float(current_row["Price"]):
+                        c.execute(
+                            "UPDATE Inventory SET price = %s WHERE inventory_id = %s AND seller_id = %s",
+                            (float(new_price), int(choice), user_id)
+                        )
+                    if int(new_stock) != int(current_row["Stock"]):
+                        c.execute(
+                            "UPDATE Inventory SET stock_quantity = %s WHERE inventory_id = %s AND seller_id = %s",
+                            (int(new_stock), int(choice), user_id)
+                        )
+                    connection.commit()
+                    services.invalidate_offers(_listing_products(c, choice))
+                except Exception as e:
+                    connection.rollback()
+                    st.error(f"Error updating listing: {e}")
+                else:
+                    # The other tabs show this listing too, so refresh the whole menu
+                    _flash("update_listing", "✅ Listing updated!")
+                    st.rerun()
+    finally:
+        c.close()
+
+@st.fragment
+@metrics.timed_fragment("seller_menu")
+def _remove_listing_tab(connection, user_id):
+    c = connection.cursor()
+    try:
+        st.markdown("### 🗑️ Remove Listing")
+        _show_flash("remove_listing")
+        rows = _take_prefetched("seller_prefetch", "remove_listing")
+        if rows is None:
+            rows = _fetchall(c, SELLER_LISTINGS_SQL, (user_id,))
+        if not rows:
+            st.info("No listings to remove.")
+        else:
+            df = pd.DataFrame(rows, columns=["inventory_id", "Product", "Price", "Stock"])
+            listing_id = st.selectbox(
+                "Listing to remove",
+                options=df["inventory_id"],
+                format_func=lambda inv: f"#{int(inv)} — {df.loc[df['inventory_id']==inv, 'Product'].values[0]} (${df.loc[df['inventory_id']==inv, 'Price'].values[0]:.2f}, stock {int(df.loc[df['inventory_id']==inv, 'Stock'].values[0])})"
+            )
+            if st.button("Remove Listing"):
+                try:
+                    product_ids = _listing_products(c, listing_id)
+                    c.execute("DELETE FROM Inventory WHERE inventory_id = %s AND seller_id = %s", (int(listing_id), user_id))
+                    removed = c.rowcount > 0
+                    if removed:
+                        connection.commit()
+                        services.invalidate_offers(product_ids)
+                    else:
+                        st.info("Listing ID not found or you do not have permission to remove it.")
+                except Exception as e:
+                    connection.rollback()
+                    st.error(f"Error removing listing: {e}")
+                else:
+                    if removed:
+                        _flash("remove_listing", f"✅ Listing #{int(listing_id)} has been removed.")
+                        st.rerun()
+    finally:
+        c.close()
+
 def show_seller_menu(connection, user_id):
     """Streamlit seller menu (listings CRUD)."""
     st.subheader("💼 Seller Menu")
@@ -210,149 +466,38 @@ def show_seller_menu(connection, user_id):
         "Logout",
     ])
 
+    # My Listings, Update and Remove all show the same listings; load them once,
+    # together with the master catalog, in parallel
+    try:
+        results = fetch_parallel(connection, {
+            "listings": (SELLER_LISTINGS_SQL, (user_id,)),
+            "products": (CATALOG_SQL, None),
+        })
+        listings = results["listings"]
+        _store_prefetched("seller_prefetch", {
+            "my_listings": listings,
+            "update_listing": listings,
+            "remove_listing": listings,
+            "add_listing": results["products"],
+        })
+    except Exception:
+        _store_prefetched("seller_prefetch", {})
+
     # 1) View My Listings
     with tabs[0]:
-        c = connection.cursor()
-        try:
-            rows = _fetchall(c, """
-                SELECT i.inventory_id, p.product_name, i.price, i.stock_quantity
-                FROM Inventory AS i
-                JOIN Products AS p ON i.product_id = p.product_id
-                WHERE i.seller_id = %s
-                ORDER BY i.inventory_id DESC
-            """, (user_id,))
-            if rows:
-                df = pd.DataFrame(rows, columns=["Inventory ID", "Product", "Price", "Stock"])
-                st.dataframe(df, use_container_width=True)
-            else:
-                st.info("You have no listings yet.")
-        except Exception as e:
-            st.error(f"An error occurred: {e}")
-        finally:
-            c.close()
+        _my_listings_tab(connection, user_id)
 
     # 2) Add New Listing
     with tabs[1]:
-        c = connection.cursor()
-        try:
-            st.markdown("### ➕ Add New Listing")
-
-            # Pick from master products
-            prows = _fetchall(c, "SELECT product_id, product_name, brand FROM Products ORDER BY product_name ASC")
-            if not prows:
-                st.info("No products in the master catalog. Ask admin to add products first.")
-            else:
-                pdf = pd.DataFrame(prows, columns=["product_id", "product_name", "brand"])
-                with st.form("add_listing_form"):
-                    product_id = st.selectbox(
-                        "Master Product",
-                        options=pdf["product_id"],
-                        format_func=lambda pid: f"{int(pid)} — {pdf.loc[pdf['product_id']==pid, 'product_name'].values[0]} ({pdf.loc[pdf['product_id']==pid, 'brand'].values[0]})"
-                    )
-                    price = st.number_input("Price", min_value=0.0, step=0.01)
-                    stock = st.number_input("Stock quantity", min_value=0, step=1)
-                    submitted = st.form_submit_button("Create Listing")
-
-                if submitted:
-                    try:
-                        c.execute(
-                            "INSERT INTO Inventory (seller_id, product_id, price, stock_quantity) VALUES (%s, %s, %s, %s)",
-                            (user_id, int(product_id), float(price), int(stock))
-                        )
-                        connection.commit()
-                        st.success("✅ Listing added successfully!")
-                    except Exception as e:
-                        connection.rollback()
-                        st.error(f"Error adding listing: {e}")
-        finally:
-            c.close()
+        _add_listing_tab(connection, user_id)
 
     # 3) Update a Listing
     with tabs[2]:
-        c = connection.cursor()
-        try:
-            st.markdown("### ✏️ Update Listing (Stock/Price)")
-            # load seller listings
-            rows = _fetchall(c, """
-                SELECT i.inventory_id, p.product_name, i.price, i.stock_quantity
-                FROM Inventory AS i
-                JOIN Products AS p ON i.product_id = p.product_id
-                WHERE i.seller_id = %s
-                ORDER BY i.inventory_id DESC
-            """, (user_id,))
-            if not rows:
-                st.info("No listings to update.")
-            else:
-                df = pd.DataFrame(rows, columns=["inventory_id", "Product", "Price", "Stock"])
-                choice = st.selectbox(
-                    "Choose a listing",
-                    options=df["inventory_id"],
-                    format_func=lambda inv: f"#{int(inv)} — {df.loc[df['inventory_id']==inv, 'Product'].values[0]}"
-                )
-                current_row = df.loc[df["inventory_id"] == choice].iloc[0]
-                col1, col2 = st.columns(2)
-                with col1:
-                    new_price = st.number_input("New price (leave same to keep)", min_value=0.0, step=0.01, value=float(current_row["Price"]))
-                with col2:
-                    new_stock = st.number_input("New stock (leave same to keep)", min_value=0, step=1, value=int(current_row["Stock"]))
-
-                if st.button("Update Listing"):
-                    try:
-                        # Only update if changed
-                        if float(new_price) != float(current_row["Price"]):
-                            c.execute(
-                                "UPDATE Inventory SET price = %s WHERE inventory_id = %s AND seller_id = %s",
-                                (float(new_price), int(choice), user_id)
-                            )
-                        if int(new_stock) != int(current_row["Stock"]):
-                            c.execute(
-                                "UPDATE Inventory SET stock_quantity = %s WHERE inventory_id = %s AND seller_id = %s",
-                                (int(new_stock), int(choice), user_id)
-                            )
-                        connection.commit()
-                        st.success("✅ Listing updated!")
-                        st.experimental_rerun()
-                    except Exception as e:
-                        connection.rollback()
-                        st.error(f"Error updating listing: {e}")
-        finally:
-            c.close()
+        _update_listing_tab(connection, user_id)
 
     # 4) Remove a Listing
     with tabs[3]:
-        c = connection.cursor()
-        try:
-            st.markdown("### 🗑️ Remove Listing")
-            rows = _fetchall(c, """
-                SELECT i.inventory_id, p.product_name, i.price, i.stock_quantity
-                FROM Inventory AS i
-                JOIN Products AS p ON i.product_id = p.product_id
-                WHERE i.seller_id = %s
-                ORDER BY i.inventory_id DESC
-            """, (user_id,))
-            if not rows:
-                st.info("No listings to remove.")
-            else:
-                df = pd.DataFrame(rows, columns=["inventory_id", "Product", "Price", "Stock"])
-                listing_id = st.selectbox(
-                    "Listing to remove",
-                    options=df["inventory_id"],
-                    format_func=lambda inv: f"#{int(inv)} — {df.loc[df['inventory_id']==inv, 'Product'].values[0]} (${df.loc[df['inventory_id']==inv, 'Price'].values[0]:.2f}, stock {int(df.loc[df['inventory_id']==inv, 'Stock'])})"
-                )
-                if st.button("Remove Listing"):
-                    try:
-                        c.execute("DELETE FROM Inventory WHERE inventory_id = %s AND seller_id = %s", (int(listing_id), user_id))
-                        if c.rowcount > 0:
-                            connection.commit()
-                            st.success(f"✅ Listing #{int(listing_id)} has been removed.")
-                            st.experimental_rerun()
-                        else:
-                            st.info("Listing ID not found or you do not have permission to remove it.")
-                    except Exception as e:
-                        connection.rollback()
-                        st.error(f"Error removing listing: {e}")
-        finally:
-            c.close()
+        _remove_listing_tab(connection, user_id)
 
     # 5) Logout
     with tabs[4]:
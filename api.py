@@ -0,0 +1,242 @@
+# api.py — headless JSON API over the same service layer as the Streamlit app
+#
+#     uvicorn api:app --port 8000                       # one process
+#     python launch_workers.py --workers 0 --api-workers 4   # several, sharing sessions
+#     HYPECULTURE_DB=sqlite uvicorn api:app      # no MySQL server needed
+#
+# Handlers are async; the blocking DB work runs in Starlette's thread pool, each
+# request on its own pooled connection (db_connector.pooled_connection). So do the
+# session lookups, which are socket round trips with the shared cache tier.
+#
+# Sessions live in the shared cache. With the default HYPECULTURE_CACHE=local every
+# process has its own, so a plain `uvicorn --workers N` answers 401 to tokens another
+# worker issued; launch_workers.py starts the cache server and points the workers at
+# it. While that server is unreachable, a login is kept only in the worker that
+# handled it (SocketCache.set falls back to its in-process copy), so other workers
+# reject that token until the client logs in again.
+#
+#   POST  /api/login                        {"email", "password"} -> {"token", ...}
+#   GET   /api/categories
+#   GET   /api/categories/{category_id}/products
+#   GET   /api/products/{product_id}/sellers
+#   GET   /api/browse?category=&brand=&price=&availability=&sort=price|newest&after=&limit=
+#         (filters repeat for "any of"; pass the returned "next" as after= for the next page)
+#   GET   /api/cart                         (auth)
+#   POST  /api/cart                         (auth) {"inventory_id", "quantity"}
+#   PATCH /api/cart/{cart_id}               (auth) {"quantity"}   0 removes the line
+#   POST  /api/checkout                     (auth) {"address_line1", "city", "state", "postal_code"}
+#   GET   /api/orders[?include_archived=1]  (auth)
+#   GET   /api/orders/{order_id}            (auth)
+#   GET   /metrics                          Prometheus/OpenMetrics scrape endpoint
+# Authenticated calls send "Authorization: Bearer <token>".
+import json
+import secrets
+from datetime import date, datetime
+from decimal import Decimal
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+import metrics
+import services
+import shared_cache
+from db_connector import pooled_connection
+from services import NotFoundError, ServiceError
+
+# token -> (user_id, role, first_name), kept in the shared cache so that a token
+# issued by one worker process is accepted by all of them (see shared_cache.py)
+SESSION_TTL = 12 * 3600
+
+class AuthError(Exception):
+    pass
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+class APIResponse(JSONResponse):
+    """JSONResponse that also handles the Decimal and datetime values MySQL returns."""
+
+    def render(self, content):
+        return json.dumps(content, default=_json_default, separators=(",", ":")).encode("utf-8")
+
+def _records(columns, rows):
+    return [dict(zip(columns, row)) for row in rows]
+
+def _db(fn, *args):
+    """Run fn(connection, *args) in the thread pool on a borrowed connection."""
+    def work():
+        with pooled_connection() as connection:
+            return fn(connection, *args)
+    return run_in_threadpool(work)
+
+async def _customer(request):
+    header = request.headers.get("authorization", "")
+    token = header[7:] if header.lower().startswith("bearer ") else ""
+    session = await run_in_threadpool(shared_cache.get_cache().get, f"session/{token}") if token else None
+    if session is None:
+        raise AuthError("Missing or invalid token.")
+    user_id, role, _ = session
+    if role != "customer":
+        raise AuthError("Only customers can use the shopping API.")
+    return user_id
+
+async def _body(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        raise ServiceError("Request body must be JSON.")
+    if not isinstance(body, dict):
+        raise ServiceError("Request body must be a JSON object.")
+    return body
+
+def _int_field(body, name):
+    try:
+        return int(body[name])
+    except (KeyError, TypeError, ValueError):
+        raise ServiceError(f"'{name}' must be an integer.")
+
+# ---------- handlers ----------
+async def login(request):
+    body = await _body(request)
+    user = await _db(services.authenticate, body.get("email", ""), body.get("password", ""))
+    if not user:
+        raise AuthError("Invalid email or password.")
+    user_id, role, name = user
+    role = (role or "").strip().lower()
+    token = secrets.token_urlsafe(24)
+    await run_in_threadpool(shared_cache.get_cache().set, f"session/{token}", (user_id, role, name), SESSION_TTL)
+    return APIResponse({"token": token, "user_id": user_id, "role": role, "first_name": name})
+
+async def categories(request):
+    rows = await _db(services.list_categories)
+    return APIResponse(_records(services.CATEGORY_COLUMNS, rows))
+
+async def products(request):
+    rows = await _db(services.list_products, request.path_params["category_id"])
+    return APIResponse(_records(services.PRODUCT_COLUMNS, rows))
+
+async def sellers(request):
+    rows = await _db(services.list_sellers, request.path_params["product_id"])
+    return APIResponse(_records(services.SELLER_COLUMNS, rows))
+
+async def browse(request):
+    params = request.query_params
+    result = await _db(
+        services.browse, params.getlist("category"), params.getlist("brand"), params.getlist("price"),
+        params.getlist("availability"), params.get("sort", "price"), params.get("after"), params.get("limit"),
+    )
+    return APIResponse({
+        "items": _records(services.BROWSE_ITEM_COLUMNS, result["items"]),
+        "total": result["total"],
+        "next": result["next"],
+        "facets": {
+            name: [{"value": value, "label": label, "count": count} for value, label, count in values]
+            for name, values in result["facets"].items()
+        },
+    })
+
+async def get_cart(request):
+    rows = await _db(services.get_cart, await _customer(request))
+    items = _records(services.CART_COLUMNS, rows)
+    return APIResponse({"items": items, "total": round(sum(float(i["subtotal"]) for i in items), 2)})
+
+async def add_to_cart(request):
+    user_id = await _customer(request)
+    body = await _body(request)
+    cart_id, quantity = await _db(
+        services.add_to_cart, user_id, _int_field(body, "inventory_id"), _int_field(body, "quantity")
+    )
+    return APIResponse({"cart_id": cart_id, "quantity": quantity}, status_code=201)
+
+async def update_cart_item(request):
+    user_id = await _customer(request)
+    body = await _body(request)
+    quantity = _int_field(body, "quantity")
+    if quantity < 0:
+        raise ServiceError("'quantity' must not be negative.")
+    cart_id = request.path_params["cart_id"]
+    # Same path as the cart grid: stock is checked before the change is written
+    await _db(services.update_cart_items, user_id, {cart_id: quantity})
+    return APIResponse({"cart_id": cart_id, "quantity": quantity})
+
+async def checkout(request):
+    user_id = await _customer(request)
+    body = await _body(request)
+    order_id = await _db(
+        services.place_order, user_id, body.get("address_line1"), body.get("city"),
+        body.get("state"), body.get("postal_code"),
+    )
+    return APIResponse({"order_id": order_id}, status_code=201)
+
+async def orders(request):
+    include_archived = request.query_params.get("include_archived", "") in ("1", "true", "yes")
+    rows = await _db(services.order_history, await _customer(request), include_archived)
+    records = _records(services.ORDER_COLUMNS, rows)
+    for record in records:
+        record["archived"] = bool(record["archived"])
+    return APIResponse(records)
+
+async def order_detail(request):
+    user_id = await _customer(request)
+    order_id = request.path_params["order_id"]
+
+    def load(connection):
+        order_date, archived = services.find_order(connection, user_id, order_id)
+        return order_date, archived, services.order_items(connection, order_id, order_date, archived)
+
+    order_date, archived, rows = await _db(load)
+    return APIResponse({
+        "order_id": order_id,
+        "order_date": order_date,
+        "archived": archived,
+        "items": _records(services.ORDER_ITEM_COLUMNS, rows),
+    })
+
+async def metrics_endpoint(request):
+    openmetrics = metrics.wants_openmetrics(request.headers.get("accept"))
+    return Response(
+        metrics.render(openmetrics),
+        media_type=metrics.OPENMETRICS_CONTENT_TYPE if openmetrics else metrics.PROMETHEUS_CONTENT_TYPE,
+    )
+
+# ---------- errors ----------
+async def _auth_error(request, exc):
+    return APIResponse({"error": str(exc)}, status_code=401)
+
+async def _not_found(request, exc):
+    return APIResponse({"error": str(exc)}, status_code=404)
+
+async def _rejected(request, exc):
+    return APIResponse({"error": str(exc)}, status_code=400)
+
+# Also honours HYPECULTURE_METRICS_FILE (textfile collector) and _PORT. /metrics reports
+# only the process that took the request; with several workers, scrape their textfiles
+metrics.start_from_env()
+
+app = Starlette(
+    routes=[
+        Route("/api/login", login, methods=["POST"]),
+        Route("/api/categories", categories),
+        Route("/api/categories/{category_id:int}/products", products),
+        Route("/api/products/{product_id:int}/sellers", sellers),
+        Route("/api/browse", browse),
+        Route("/api/cart", get_cart, methods=["GET"]),
+        Route("/api/cart", add_to_cart, methods=["POST"]),
+        Route("/api/cart/{cart_id:int}", update_cart_item, methods=["PATCH"]),
+        Route("/api/checkout", checkout, methods=["POST"]),
+        Route("/api/orders", orders),
+        Route("/api/orders/{order_id:int}", order_detail),
+        Route("/metrics", metrics_endpoint),
+    ],
+    exception_handlers={
+        AuthError: _auth_error,
+        NotFoundError: _not_found,
+        ServiceError: _rejected,
+    },
+)
@@ -1,6 +1,8 @@
 # app.py — Streamlit
 import streamlit as st
+import metrics
 from db_connector import create_connection
+from services import authenticate, register_customer
 from customer_view import show_customer_menu
 from admin_seller_views import show_admin_menu, show_seller_menu
 
@@ -10,27 +12,8 @@ def get_connection():
     conn = create_connection()
     return conn
 
-def do_register(connection, first_name, last_name, email, password):
-    with connection.cursor() as cursor:
-        cursor.execute(
-            """
-            INSERT INTO Users (first_name, last_name, email, password_hash, user_role)
-            VALUES (%s, %s, %s, %s, %s)
-            """,
-            (first_name, last_name, email, password, 'customer')
-        )
-        connection.commit()
-        user_id = cursor.lastrowid
-    return (user_id, 'customer', first_name)
-
-def do_login(connection, email, password):
-    with connection.cursor() as cursor:
-        cursor.execute(
-            "SELECT user_id, user_role, first_name FROM Users WHERE email = %s AND password_hash = %s",
-            (email, password)
-        )
-        row = cursor.fetchone()
-    return row  # (user_id, user_role, first_name) or None
+# Exporters configured via HYPECULTURE_METRICS_PORT / _FILE; no-op after the first run
+metrics.start_from_env()
 
 # ---------- UI ----------
 st.set_page_config(page_title="HYPEculture", page_icon="👟", layout="wide")
@@ -51,7 +34,7 @@ if "user" not in st.session_state:
 if st.session_state.user:
     spacer, right = st.columns([10, 2])
     with right:
-        if st.button("🚪 Logout", use_container_width=True):
+        if st.button("🚪 Logout", width="stretch"):
             st.session_state.user = None
             st.rerun()
 
@@ -94,7 +77,7 @@ if not st.session_state.user:
                 st.warning("Please fill out all fields.")
             else:
                 try:
-                    user = do_register(connection, first_name, last_name, email, password)
+                    user = register_customer(connection, first_name, last_name, email, password)
                     uid, role, name = user
                     role = (role or "").strip().lower()
                     st.session_state.user = (uid, role, name)
@@ -111,7 +94,7 @@ if not st.session_state.user:
             submitted = st.form_submit_button("Log in")
         if submitted:
             try:
-                user = do_login(connection, email, password)
+                user = authenticate(connection, email, password)
                 if user:
                     uid, role, name = user
                     role = (role or "").strip().lower()
@@ -131,9 +114,11 @@ if st.session_state.user:
         if role == 'customer':
             show_customer_menu(connection, user_id)   # shopping/browse page
         elif role == 'seller':
-            show_seller_menu(connection, user_id)
+            with metrics.VIEW_SECONDS.time(view="seller_menu"):
+                show_seller_menu(connection, user_id)
         elif role == 'admin':
-            show_admin_menu(connection)
+            with metrics.VIEW_SECONDS.time(view="admin_menu"):
+                show_admin_menu(connection)
         else:
             st.info(f"Unknown role '{role}'. Please contact support.")
     except Exception as e:
@@ -0,0 +1,133 @@
+# benchmarks/bench_app.py — end-to-end render benchmarks on the SQLite backend
+#
+# Drives the real app.py through Streamlit's AppTest (no browser, no MySQL server)
+# and reports per-interaction latency and the number of SQL statements each one runs.
+#
+#     python benchmarks/bench_app.py                 # temp SQLite file, 20 repeats
+#     python benchmarks/bench_app.py --repeat 50 --db sqlite:/tmp/hype.db
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "app.py")
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark HYPECULTURE page renders on SQLite.")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per scenario")
+    parser.add_argument("--db", default=None,
+                        help="HYPECULTURE_DB value (default: a fresh temporary SQLite file)")
+    return parser.parse_args()
+
+class Recorder:
+    """Collects wall time and SQL statement counts per scenario."""
+
+    def __init__(self):
+        self.samples = {}
+
+    def measure(self, name, fn):
+        from sqlite_backend import statement_count
+        before = statement_count()
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        self.samples.setdefault(name, []).append((elapsed, statement_count() - before))
+        return result
+
+    def report(self):
+        print(f"{'scenario':<28}{'median ms':>11}{'p95 ms':>10}{'stmts':>8}")
+        for name, samples in self.samples.items():
+            times = sorted(t * 1000 for t, _ in samples)
+            p95 = times[min(len(times) - 1, int(round(0.95 * (len(times) - 1))))]
+            stmts = statistics.median(n for _, n in samples)
+            print(f"{name:<28}{statistics.median(times):>11.1f}{p95:>10.1f}{stmts:>8g}")
+
+def _button(at, label):
+    return next(b for b in at.button if b.label == label)
+
+def _login(email, password):
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(APP_PATH, default_timeout=60)
+    at.run()
+    at.text_input[0].input(email)
+    at.text_input[1].input(password)
+    _button(at, "Log in").click()
+    return at
+
+def _restock(connection):
+    c = connection.cursor()
+    c.execute("UPDATE Inventory SET stock_quantity = 1000")
+    connection.commit()
+    c.close()
+
+def run(repeat):
+    import customer_view
+    from db_connector import create_connection
+
+    # Checkout deliberately pauses a second behind a "Processing payment..." spinner;
+    # that is UI theatre, not work, so it is skipped here.
+    customer_view.time.sleep = lambda _seconds: None
+
+    admin_conn = create_connection()
+    _restock(admin_conn)
+    rec = Recorder()
+
+    at = _login("alice@email.com", "pass123")
+    rec.measure("customer login", at.run)
+    for _ in range(repeat):
+        rec.measure("browse rerun", at.run)
+        rec.measure("add to cart", _button(at, "Add to Cart").click().run)
+
+    at.radio(key="customer_view").set_value("My Cart").run()
+    for _ in range(repeat):
+        rec.measure("cart rerun", at.run)
+
+    for _ in range(repeat):
+        at.radio(key="customer_view").set_value("Browse Products").run()
+        _button(at, "Add to Cart").click().run()
+        at.radio(key="customer_view").set_value("Checkout").run()
+        fields = [t for t in at.text_input if t.label in ("Address Line 1", "City", "State", "Postal Code")]
+        for field, value in zip(fields, ("1 Sneaker St", "Portland", "OR", "97201")):
+            field.input(value)
+        rec.measure("checkout", _button(at, "Pay Now").click().run)
+        _restock(admin_conn)
+
+    at.radio(key="customer_view").set_value("Order History").run()
+    for _ in range(repeat):
+        rec.measure("order history rerun", at.run)
+
+    seller = _login("charlie@seller.com", "pass123")
+    rec.measure("seller login", seller.run)
+    for _ in range(repeat):
+        rec.measure("seller menu rerun", seller.run)
+
+    admin = _login("admin@hypeculture.com", "adminpass")
+    rec.measure("admin login", admin.run)
+    for _ in range(repeat):
+        rec.measure("admin menu rerun", admin.run)
+
+    admin_conn.close()
+    rec.report()
+
+def main():
+    args = _parse_args()
+    tmpdir = None
+    if args.db is None:
+        tmpdir = tempfile.TemporaryDirectory()
+        args.db = "sqlite:" + os.path.join(tmpdir.name, "bench.db")
+    if not args.db.startswith("sqlite"):
+        raise SystemExit("The benchmarks run on the SQLite backend (--db sqlite[:path]).")
+    # db_connector reads the backend at import time
+    os.environ["HYPECULTURE_DB"] = args.db
+    sys.path.insert(0, ROOT)
+    try:
+        run(args.repeat)
+    finally:
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+if __name__ == "__main__":
+    main()
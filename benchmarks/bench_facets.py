@@ -0,0 +1,171 @@
+# benchmarks/bench_facets.py — faceted browse: in-memory index vs. querying per click
+#
+# Fills a temporary SQLite file with datagen.py (or uses --db), then replays random
+# filter clicks two ways:
+#   * naive: per click, one page query plus one GROUP BY per facet over Products x Inventory
+#   * index: facets.FacetIndex (facet-count cube + sorted keys, keyset pages)
+# and times the index's initial build and its incremental refresh after listing changes.
+#
+#     python benchmarks/bench_facets.py                       # scale 10: ~200k listings
+#     python benchmarks/bench_facets.py --scale 30 --clicks 200
+#     python benchmarks/bench_facets.py --db sqlite:/tmp/hype.db
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the faceted browse index.")
+    parser.add_argument("--scale", type=float, default=10.0, help="datagen scale for the temporary database")
+    parser.add_argument("--db", default=None, help="use this HYPECULTURE_DB instead of generating one")
+    parser.add_argument("--clicks", type=int, default=100, help="random filter combinations to replay")
+    parser.add_argument("--changes", type=int, default=50, help="listings changed per refresh round")
+    parser.add_argument("--rounds", type=int, default=10, help="change-then-refresh rounds")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+# What a per-click implementation would run: the page and one count query per facet
+NAIVE_BASE = """
+    FROM Products p JOIN (
+        SELECT product_id,
+               COALESCE(MIN(CASE WHEN stock_quantity > 0 THEN price END), MIN(price)) AS price,
+               SUM(CASE WHEN stock_quantity > 0 THEN 1 ELSE 0 END) AS offers
+        FROM Inventory GROUP BY product_id
+    ) s ON s.product_id = p.product_id
+"""
+
+def _naive_where(f, skip=None):
+    import facets
+    clauses, params = [], []
+    if f["category_ids"] and skip != "category":
+        clauses.append(f"p.category_id IN ({', '.join(['%s'] * len(f['category_ids']))})")
+        params += f["category_ids"]
+    if f["brands"] and skip != "brand":
+        clauses.append(f"p.brand IN ({', '.join(['%s'] * len(f['brands']))})")
+        params += f["brands"]
+    if f["price_bands"] and skip != "price":
+        edges = (0, *facets.PRICE_EDGES, 10**9)
+        clauses.append("(" + " OR ".join("(s.price >= %s AND s.price < %s)" for _ in f["price_bands"]) + ")")
+        for band in f["price_bands"]:
+            params += [edges[band], edges[band + 1]]
+    if f["availability"] and skip != "availability":
+        clauses.append("s.offers > 0" if f["availability"] == ["in_stock"] else "s.offers = 0")
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+def naive_click(connection, f):
+    c = connection.cursor()
+    try:
+        where, params = _naive_where(f)
+        c.execute(f"SELECT p.product_id, p.product_name, s.price {NAIVE_BASE} {where} "
+                  f"ORDER BY s.price, p.product_id LIMIT 25", params)
+        c.fetchall()
+        for facet, column in (("category", "p.category_id"), ("brand", "p.brand"),
+                              ("availability", "s.offers > 0")):
+            where, params = _naive_where(f, skip=facet)
+            c.execute(f"SELECT {column}, COUNT(*) {NAIVE_BASE} {where} GROUP BY {column}", params)
+            c.fetchall()
+        where, params = _naive_where(f, skip="price")
+        c.execute(f"SELECT s.price {NAIVE_BASE} {where}", params)  # bands are bucketed client-side
+        c.fetchall()
+    finally:
+        c.close()
+
+def _random_filters(rng, brands):
+    import facets
+    return {
+        "category_ids": rng.sample([1, 2, 3], rng.randint(0, 2)),
+        "brands": rng.sample(brands, rng.randint(0, 3)),
+        "price_bands": rng.sample(range(len(facets.PRICE_EDGES) + 1), rng.randint(0, 2)),
+        "availability": rng.sample(list(facets.AVAILABILITY), rng.randint(0, 1)),
+    }
+
+def _median_ms(fn, items):
+    samples = []
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000, max(samples) * 1000
+
+def run(args):
+    import facets
+    from db_connector import create_connection
+
+    connection = create_connection()
+    c = connection.cursor()
+    c.execute("SELECT COUNT(*) FROM Inventory")
+    listings = c.fetchone()[0]
+    c.execute("SELECT COUNT(*) FROM Products")
+    products = c.fetchone()[0]
+    c.close()
+    print(f"{products:,} products, {listings:,} listings")
+
+    index = facets.FacetIndex()
+    start = time.perf_counter()
+    index.sync(connection)
+    print(f"index build:       {(time.perf_counter() - start) * 1000:9.1f} ms  (one Inventory scan)")
+
+    rng = random.Random(args.seed)
+    brands = [b for b, _, _ in index.search(connection)["facets"]["brand"]]
+    clicks = [_random_filters(rng, brands) for _ in range(args.clicks)]
+
+    med, worst = _median_ms(lambda f: naive_click(connection, f), clicks[: max(10, args.clicks // 10)])
+    print(f"naive click:       {med:9.2f} ms median, {worst:8.2f} ms max  (page + facet GROUP BYs)")
+    med, worst = _median_ms(lambda f: index.search(connection, **f), clicks)
+    print(f"index click:       {med:9.3f} ms median, {worst:8.3f} ms max  (page + all facet counts)")
+
+    # Keyset paging through a broad filter
+    pages, after = 0, None
+    start = time.perf_counter()
+    while pages < 50:
+        page = index.search(connection, availability=["in_stock"], after=after)
+        pages += 1
+        after = page["next"]
+        if after is None:
+            break
+    print(f"keyset page:       {(time.perf_counter() - start) / pages * 1000:9.3f} ms per page over {pages} pages")
+
+    # Change some listings, then time the incremental refresh on the next search
+    samples, reread = [], []
+    for _ in range(args.rounds):
+        c = connection.cursor()
+        changed = set()
+        for _ in range(args.changes):
+            inventory_id = rng.randint(1, listings)
+            c.execute("UPDATE Inventory SET price = price * 0.9, stock_quantity = %s WHERE inventory_id = %s",
+                      (rng.choice([0, 5]), inventory_id))
+            c.execute("SELECT product_id FROM Inventory WHERE inventory_id = %s", (inventory_id,))
+            row = c.fetchone()
+            if row:
+                changed.add(int(row[0]))
+        connection.commit()
+        c.close()
+        index.note_invalidation([f"offers/{pid}" for pid in changed], ())
+        start = time.perf_counter()
+        index.sync(connection)
+        samples.append(time.perf_counter() - start)
+        reread.append(len(changed))
+    print(f"incremental sync:  {statistics.median(samples) * 1000:9.2f} ms median "
+          f"({statistics.median(reread):g} products re-read per round, {args.rounds} rounds)")
+    connection.close()
+
+def main():
+    args = _parse_args()
+    sys.path.insert(0, ROOT)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        if args.db:
+            os.environ["HYPECULTURE_DB"] = args.db
+        else:
+            os.environ["HYPECULTURE_DB"] = "sqlite:" + os.path.join(tmpdir, "facets.db")
+            import subprocess
+            subprocess.run([sys.executable, os.path.join(ROOT, "datagen.py"), "--scale", str(args.scale)],
+                           check=True, stdout=subprocess.DEVNULL)
+        run(args)
+
+if __name__ == "__main__":
+    main()
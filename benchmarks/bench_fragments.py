@@ -0,0 +1,202 @@
+# benchmarks/bench_fragments.py — full-page vs fragment reruns, per interaction
+#
+# The views wrap their interactive parts in st.fragment, so in the browser a click
+# inside one reruns only that fragment. AppTest always reruns the whole script, so
+# each interaction is measured twice on the SQLite backend:
+#   full      - AppTest as is (what every interaction cost before the fragments)
+#   fragment  - the same interaction with the rerun scoped to the fragment that owns
+#               the widget, as Streamlit's server does for a browser session
+#
+# It also times saving an edited cart (three quantity changes and a removal) as one
+# transaction, as the cart grid does, against one statement per row, as the
+# per-row Update buttons it replaced did.
+#
+#     python benchmarks/bench_fragments.py
+#     python benchmarks/bench_fragments.py --repeat 50 --db sqlite:/tmp/hype.db
+import argparse
+import contextlib
+import functools
+import os
+import statistics
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_app import ROOT, Recorder, _button, _login, _restock  # noqa: E402
+
+# Grid position -> new quantity: three changes and a removal
+CART_EDITS = {0: 3, 1: 2, 2: 5, 3: 0}
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Compare full and fragment reruns on SQLite.")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per interaction and mode")
+    parser.add_argument("--db", default=None,
+                        help="HYPECULTURE_DB value (default: a fresh temporary SQLite file)")
+    return parser.parse_args()
+
+def _fragment_id(at, function_name):
+    """Id under which AppTest stored the fragment that runs `function_name`."""
+    for fragment_id, fragment in at._fragment_storage._fragments.items():
+        pending = [fragment]
+        while pending:
+            fn = pending.pop()
+            if getattr(getattr(fn, "__code__", None), "co_name", None) == function_name:
+                return fragment_id
+            for cell in getattr(fn, "__closure__", None) or ():
+                with contextlib.suppress(ValueError):
+                    if callable(cell.cell_contents):
+                        pending.append(cell.cell_contents)
+    raise LookupError(f"no fragment for {function_name}() in the last run")
+
+@contextlib.contextmanager
+def _scoped_to(at, function_name):
+    """Make AppTest's next runs rerun only the given fragment."""
+    from streamlit.runtime.scriptrunner import RerunData
+    from streamlit.testing.v1 import local_script_runner
+    fragment_id = _fragment_id(at, function_name)
+    local_script_runner.RerunData = functools.partial(RerunData, fragment_id_queue=[fragment_id])
+    try:
+        yield
+    finally:
+        local_script_runner.RerunData = RerunData
+
+class Comparison(Recorder):
+    def report(self):
+        print(f"{'interaction':<30}{'full stmts':>11}{'frag stmts':>11}{'full ms':>9}{'frag ms':>9}")
+        names = dict.fromkeys(name for name, _ in self.samples)
+        for name in names:
+            full, frag = self.samples[(name, "full")], self.samples[(name, "fragment")]
+            print(f"{name:<30}"
+                  f"{statistics.median(n for _, n in full):>11g}{statistics.median(n for _, n in frag):>11g}"
+                  f"{statistics.median(t for t, _ in full) * 1000:>9.1f}"
+                  f"{statistics.median(t for t, _ in frag) * 1000:>9.1f}")
+
+def _compare(rec, repeat, at, name, fragment, interaction):
+    """Run `interaction` (which returns the AppTest run to time) in both modes."""
+    for _ in range(repeat):
+        rec.measure((name, "full"), interaction())
+    at.run()
+    with _scoped_to(at, fragment):
+        for _ in range(repeat):
+            rec.measure((name, "fragment"), interaction())
+    at.run()
+
+def _fill_cart(connection, email):
+    """Reset the customer's cart to one of each of the first len(CART_EDITS) listings.
+
+    Returns (user_id, cart_ids in grid order).
+    """
+    c = connection.cursor()
+    c.execute("SELECT user_id FROM Users WHERE email = %s", (email,))
+    user_id = c.fetchone()[0]
+    c.execute("DELETE FROM Cart WHERE customer_id = %s", (user_id,))
+    c.execute("SELECT inventory_id FROM Inventory ORDER BY inventory_id LIMIT %s", (len(CART_EDITS),))
+    c.executemany("INSERT INTO Cart (customer_id, inventory_id, quantity) VALUES (%s, %s, 1)",
+                  [(user_id, inventory_id) for (inventory_id,) in c.fetchall()])
+    connection.commit()
+    c.execute("SELECT cart_id FROM Cart WHERE customer_id = %s ORDER BY cart_id", (user_id,))
+    cart_ids = [int(r[0]) for r in c.fetchall()]
+    c.close()
+    return user_id, cart_ids
+
+def _save_per_row(connection, user_id, quantities):
+    """The cart before the grid: one UPDATE or DELETE, and one commit, per changed row."""
+    c = connection.cursor()
+    try:
+        for cart_id, qty in quantities.items():
+            if qty == 0:
+                c.execute("DELETE FROM Cart WHERE cart_id = %s AND customer_id = %s", (cart_id, user_id))
+            else:
+                c.execute("UPDATE Cart SET quantity = %s WHERE cart_id = %s AND customer_id = %s",
+                          (qty, cart_id, user_id))
+            connection.commit()
+    finally:
+        c.close()
+
+def compare_cart_saves(repeat, connection, email):
+    """Save CART_EDITS batched (services.update_cart_items) and row by row."""
+    import services
+    rec = Recorder()
+    for _ in range(repeat):
+        for name, save in (("batched (one transaction)", services.update_cart_items),
+                           ("one statement per row", _save_per_row)):
+            user_id, cart_ids = _fill_cart(connection, email)
+            quantities = {cart_ids[position]: qty for position, qty in CART_EDITS.items()}
+            rec.measure(name, lambda: save(connection, user_id, quantities))
+    print(f"\nsaving {len(CART_EDITS) - 1} quantity changes + 1 removal:")
+    rec.report()
+
+def run(repeat):
+    import customer_view
+    from db_connector import create_connection
+
+    customer_view.time.sleep = lambda _seconds: None
+    admin_conn = create_connection()
+    _restock(admin_conn)
+    rec = Comparison()
+
+    at = _login("alice@email.com", "pass123")
+    at.run()
+    _compare(rec, repeat, at, "browse: change quantity", "_seller_picker",
+             lambda: at.number_input[0].increment().run)
+    _compare(rec, repeat, at, "browse: add to cart", "_seller_picker",
+             lambda: _button(at, "Add to Cart").click().run)
+    _restock(admin_conn)
+
+    at.radio(key="customer_view").set_value("My Cart").run()
+    _compare(rec, repeat, at, "cart: save (no edits)", "view_cart",
+             lambda: _button(at, "Save cart").click().run)
+
+    def save_edits():
+        # Untimed: a fresh cart, drawn, with the edits a user would make in the grid
+        _fill_cart(admin_conn, "alice@email.com")
+        at.run()
+        rev = at.session_state["cart_editor_rev"] if "cart_editor_rev" in at.session_state else 0
+        at.session_state[f"cart_editor_{rev}"] = {
+            "edited_rows": {position: {"Qty": qty} for position, qty in CART_EDITS.items()},
+            "added_rows": [], "deleted_rows": [],
+        }
+        return _button(at, "Save cart").click().run
+    _compare(rec, repeat, at, "cart: save 3 edits + 1 removal", "view_cart", save_edits)
+    c = admin_conn.cursor()
+    c.execute("SELECT c.quantity FROM Cart c JOIN Users u ON u.user_id = c.customer_id "
+              "WHERE u.email = %s ORDER BY c.cart_id", ("alice@email.com",))
+    assert [q for (q,) in c.fetchall()] == [q for q in CART_EDITS.values() if q], "the edits were not saved"
+    c.close()
+
+    seller = _login("charlie@seller.com", "pass123")
+    seller.run()
+
+    def pick_listing():
+        box = next(s for s in seller.selectbox if s.label == "Choose a listing")
+        return box.select_index(1 - box.index).run
+    _compare(rec, repeat, seller, "seller: pick listing to update", "_update_listing_tab", pick_listing)
+
+    admin = _login("admin@hypeculture.com", "adminpass")
+    admin.run()
+    _compare(rec, repeat, admin, "admin: toggle archived orders", "_all_orders_tab",
+             lambda: admin.checkbox(key="admin_include_archived").set_value(
+                 not admin.checkbox(key="admin_include_archived").value).run)
+
+    rec.report()
+    compare_cart_saves(repeat, admin_conn, "alice@email.com")
+    admin_conn.close()
+
+def main():
+    args = _parse_args()
+    tmpdir = None
+    if args.db is None:
+        tmpdir = tempfile.TemporaryDirectory()
+        args.db = "sqlite:" + os.path.join(tmpdir.name, "bench.db")
+    if not args.db.startswith("sqlite"):
+        raise SystemExit("The benchmarks run on the SQLite backend (--db sqlite[:path]).")
+    os.environ["HYPECULTURE_DB"] = args.db
+    sys.path.insert(0, ROOT)
+    try:
+        run(args.repeat)
+    finally:
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# benchmarks/bench_recommendations.py — co-occurrence index build, refresh and lookup
+#
+# Synthetic order lines (Zipf-popular products, small baskets) are fed straight to
+# recommendations.Recommender, so no database is needed:
+#
+#     python benchmarks/bench_recommendations.py                      # 2M order lines
+#     python benchmarks/bench_recommendations.py --lines 10000000 --products 50000
+#
+# With --db the index is also loaded from a real database (e.g. one filled by
+# datagen.py), timing the full path including the OrderItems query:
+#
+#     python benchmarks/bench_recommendations.py --db sqlite:/tmp/hype.db
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the 'customers also bought' index.")
+    parser.add_argument("--lines", type=int, default=2_000_000, help="order lines to build from")
+    parser.add_argument("--products", type=int, default=20_000)
+    parser.add_argument("--basket", type=float, default=2.5, help="mean lines per order")
+    parser.add_argument("--zipf", type=float, default=1.1, help="product popularity skew")
+    parser.add_argument("--refresh-orders", type=int, default=1_000,
+                        help="new orders folded in by the incremental refresh")
+    parser.add_argument("--lookups", type=int, default=200_000)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", default=None, help="also time Recommender.load() on this HYPECULTURE_DB")
+    return parser.parse_args()
+
+def synthetic_lines(rng, n_lines, n_products, basket_mean, exponent, first_order_id=1):
+    """(order_ids, product_ids) for about n_lines lines in orders of 1 + Poisson items."""
+    from datagen import zipf_weights
+    sizes = 1 + rng.poisson(basket_mean - 1, size=int(n_lines / basket_mean) + 1)
+    sizes = sizes[np.cumsum(sizes) <= n_lines]
+    order_ids = np.repeat(np.arange(first_order_id, first_order_id + len(sizes), dtype=np.int64), sizes)
+    product_ids = 1 + rng.choice(n_products, size=len(order_ids), p=zipf_weights(n_products, exponent))
+    return order_ids, product_ids.astype(np.int64)
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+def run(args):
+    from recommendations import Recommender
+
+    rng = np.random.default_rng(args.seed)
+    gen_s, (order_ids, product_ids) = _timed(
+        synthetic_lines, rng, args.lines, args.products, args.basket, args.zipf)
+    print(f"{len(order_ids):,} lines in {order_ids[-1]:,} orders over {args.products:,} products "
+          f"(generated in {gen_s:.1f}s)")
+
+    rec = Recommender(k=args.k)
+    build_s, _ = _timed(rec.build, order_ids, product_ids)
+    nnz = len(rec._keys)
+    print(f"build:    {build_s * 1000:10.1f} ms  ({nnz:,} co-occurring pairs, "
+          f"{(rec._keys.nbytes + rec._counts.nbytes) / 2**20:.1f} MiB, {len(rec._top):,} products ranked)")
+
+    new_orders, new_products = synthetic_lines(
+        rng, int(args.refresh_orders * args.basket), args.products, args.basket, args.zipf,
+        first_order_id=int(order_ids[-1]) + 1)
+    refresh_s, _ = _timed(rec.add_orders, new_orders, new_products)
+    print(f"refresh:  {refresh_s * 1000:10.1f} ms  ({len(new_orders):,} new lines in "
+          f"{len(np.unique(new_orders)):,} orders)")
+
+    # Lookups for product ids drawn like page views: popular products more often
+    probe = product_ids[rng.integers(0, len(product_ids), size=args.lookups)].tolist()
+    also_bought = rec.also_bought
+    samples = []
+    for chunk in range(0, len(probe), 1000):
+        batch = probe[chunk:chunk + 1000]
+        start = time.perf_counter()
+        for pid in batch:
+            also_bought(pid)
+        samples.append((time.perf_counter() - start) / len(batch))
+    print(f"lookup:   {statistics.median(samples) * 1e6:10.2f} us median per call")
+
+    if args.db:
+        from db_connector import create_connection
+        connection = create_connection()
+        try:
+            db_rec = Recommender(k=args.k)
+            load_s, _ = _timed(db_rec.load, connection)
+            print(f"db load:  {load_s * 1000:10.1f} ms  ({len(db_rec._keys):,} pairs from {args.db})")
+        finally:
+            connection.close()
+
+def main():
+    args = _parse_args()
+    if args.db:
+        # db_connector reads the backend at import time
+        os.environ["HYPECULTURE_DB"] = args.db
+    sys.path.insert(0, ROOT)
+    run(args)
+
+if __name__ == "__main__":
+    main()
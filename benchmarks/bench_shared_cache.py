@@ -0,0 +1,141 @@
+# benchmarks/bench_shared_cache.py — multi-process cache tier: latency and coherence
+#
+# Starts a shared cache server and several worker processes on one SQLite file, then
+#   1. times catalog lookups from the database, the shared server (L2) and the
+#      worker's local copy (L1);
+#   2. has one worker change a listing and checks how long until every other worker
+#      serves the new offers (the cross-process invalidation broadcast).
+#
+#     python benchmarks/bench_shared_cache.py --workers 4
+import argparse
+import multiprocessing
+import os
+import secrets
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the shared cache tier across processes.")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=20, help="invalidation rounds")
+    return parser.parse_args()
+
+def _median_us(fn, n):
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1e6
+
+def worker(index, args, db_url, socket_path, ready, commands, results):
+    os.environ["HYPECULTURE_DB"] = db_url
+    os.environ["HYPECULTURE_CACHE"] = f"unix:{socket_path}"
+    sys.path.insert(0, ROOT)
+    import services
+    import shared_cache
+    from db_connector import create_connection
+
+    connection = create_connection()
+    cache = shared_cache.get_cache()
+    product_id = 1
+    services.list_sellers(connection, product_id)
+    time.sleep(0.2)  # let the invalidation subscriber connect
+    ready.put(index)
+
+    while True:
+        command = commands.get()
+        if command == "stop":
+            break
+        if command == "latency":
+            key, sql, params, ttl = services._catalog_query("sellers", product_id)
+            db = _median_us(lambda: services._fetchall(connection, sql, params), args.lookups)
+            l2 = _median_us(lambda: (cache._l1.invalidate(keys=[key]), cache.get(key)), args.lookups)
+            l1 = _median_us(lambda: cache.get(key), args.lookups)
+            results.put((index, "latency", (db, l2, l1)))
+        elif command[0] == "write":
+            # Change the cheapest offer's price and broadcast the invalidation
+            price = command[1]
+            c = connection.cursor()
+            c.execute("UPDATE Inventory SET price = %s WHERE product_id = %s", (price, product_id))
+            connection.commit()
+            c.close()
+            services.invalidate_offers([product_id])
+            results.put((index, "written", time.perf_counter()))
+        elif command[0] == "watch":
+            # Spin until this worker's cached offers show the new price
+            price, deadline = command[1], time.perf_counter() + 5
+            while time.perf_counter() < deadline:
+                rows = services.list_sellers(connection, product_id)
+                if rows and float(rows[0][3]) == price:
+                    results.put((index, "seen", time.perf_counter()))
+                    break
+                time.sleep(0.0002)
+            else:
+                results.put((index, "seen", None))
+
+def run(args, tmpdir):
+    db_url = "sqlite:" + os.path.join(tmpdir, "bench.db")
+    socket_path = os.path.join(tmpdir, "cache.sock")
+    os.environ["HYPECULTURE_DB"] = db_url
+    os.environ["HYPECULTURE_CACHE_KEY"] = secrets.token_hex(32)  # inherited by the server and workers
+    sys.path.insert(0, ROOT)
+    from db_connector import create_connection
+    create_connection().close()  # create the schema before the workers race for it
+
+    server = subprocess.Popen([sys.executable, os.path.join(ROOT, "shared_cache.py"), "--socket", socket_path],
+                              stdout=subprocess.DEVNULL)
+    while not os.path.exists(socket_path):
+        time.sleep(0.05)
+    ctx = multiprocessing.get_context("spawn")
+    ready, results = ctx.Queue(), ctx.Queue()
+    commands = [ctx.Queue() for _ in range(args.workers)]
+    procs = [ctx.Process(target=worker, args=(i, args, db_url, socket_path, ready, commands[i], results))
+             for i in range(args.workers)]
+    try:
+        for p in procs:
+            p.start()
+        for _ in procs:
+            ready.get(timeout=60)
+
+        commands[0].put("latency")
+        _, _, (db, l2, l1) = results.get(timeout=120)
+        print(f"offers lookup, median: database {db:8.1f} us | shared server (L2) {l2:6.1f} us | "
+              f"local copy (L1) {l1:5.2f} us")
+
+        lags, stale = [], 0
+        for r in range(args.rounds):
+            price = 100.0 + r
+            for i in range(1, args.workers):
+                commands[i].put(("watch", price))
+            commands[0].put(("write", price))
+            events = [results.get(timeout=30) for _ in range(args.workers)]
+            written = next(t for _, kind, t in events if kind == "written")
+            for _, kind, t in events:
+                if kind == "seen":
+                    if t is None:
+                        stale += 1
+                    else:
+                        lags.append(t - written)
+        print(f"invalidation -> other workers serve the new offers: median {statistics.median(lags) * 1000:.2f} ms, "
+              f"max {max(lags) * 1000:.2f} ms over {len(lags)} observations; {stale} still stale after 5 s")
+    finally:
+        for q in commands:
+            q.put("stop")
+        for p in procs:
+            p.join(timeout=10)
+        server.terminate()
+
+def main():
+    args = _parse_args()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        run(args, tmpdir)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# benchmarks/loadtest_api.py — closed-loop load test for the JSON API (api.py)
+#
+# Start the API first, then point this at it:
+#     HYPECULTURE_DB=sqlite:/tmp/hype.db uvicorn api:app --port 8000
+#     python benchmarks/loadtest_api.py --url http://127.0.0.1:8000 --clients 16 --seconds 20
+#
+# Each client logs in once, then loops over a browse -> sellers -> add to cart ->
+# view cart mix and records per-endpoint latency. Only the stdlib is needed.
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+
+class Client:
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+        self.token = None
+
+    def call(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method)
+        request.add_header("Content-Type", "application/json")
+        if self.token:
+            request.add_header("Authorization", f"Bearer {self.token}")
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                return response.status, json.loads(response.read() or b"null")
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read() or b"null")
+
+def _percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))]
+
+def run(url, clients, seconds, email, password, seed):
+    stats = {}
+    errors = {}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def record(name, started, status):
+        elapsed = time.perf_counter() - started
+        with lock:
+            stats.setdefault(name, []).append(elapsed)
+            if status >= 400:
+                errors[name] = errors.get(name, 0) + 1
+
+    def timed(client, name, method, path, body=None):
+        started = time.perf_counter()
+        status, payload = client.call(method, path, body)
+        record(name, started, status)
+        return status, payload
+
+    def worker(n):
+        rng = random.Random(seed + n)
+        client = Client(url)
+        status, payload = timed(client, "POST /api/login", "POST", "/api/login",
+                                {"email": email, "password": password})
+        if status != 200:
+            raise SystemExit(f"login failed: {payload}")
+        client.token = payload["token"]
+        _, cats = timed(client, "GET /api/categories", "GET", "/api/categories")
+        while time.perf_counter() < deadline:
+            category = rng.choice(cats)["category_id"]
+            _, prods = timed(client, "GET products", "GET", f"/api/categories/{category}/products")
+            if not prods:
+                continue
+            product = rng.choice(prods)["product_id"]
+            _, offers = timed(client, "GET sellers", "GET", f"/api/products/{product}/sellers")
+            if offers:
+                timed(client, "POST /api/cart", "POST", "/api/cart",
+                      {"inventory_id": offers[0]["inventory_id"], "quantity": 1})
+            timed(client, "GET /api/cart", "GET", "/api/cart")
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(clients)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    total = sum(len(v) for v in stats.values())
+    print(f"{total:,} requests in {elapsed:.1f}s with {clients} clients: {total / elapsed:,.0f} req/s")
+    print(f"{'endpoint':<22}{'count':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    for name, values in stats.items():
+        values.sort()
+        print(f"{name:<22}{len(values):>8}{statistics.median(values) * 1000:>9.2f}"
+              f"{_percentile(values, 0.95) * 1000:>9.2f}{_percentile(values, 0.99) * 1000:>9.2f}"
+              f"{errors.get(name, 0):>8}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the HYPECULTURE JSON API.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent simulated clients")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--email", default="alice@email.com")
+    parser.add_argument("--password", default="pass123")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    run(args.url, args.clients, args.seconds, args.email, args.password, args.seed)
+
+if __name__ == "__main__":
+    main()
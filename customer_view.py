@@ -1,11 +1,13 @@
 # customer_view.py — Streamlit version (fixed)
+import os
 import time
 import streamlit as st
 import pandas as pd
-
-def _fetchall(cursor, query, params=None):
-    cursor.execute(query, params or ())
-    return cursor.fetchall()
+import facets
+import metrics
+import recommendations
+import services
+from services import ServiceError
 
 def _safe_default_index(options_list, stored_value):
     """Return the index of stored_value in options_list if present, else 0."""
@@ -24,9 +26,9 @@ def show_customer_menu(connection, user_id):
 
     view = st.radio(
         "Go to",
-        ["Browse Products", "My Cart", "Checkout", "Order History", "Logout"],
+        ["Browse Products", "Filter Products", "My Cart", "Checkout", "Order History", "Logout"],
         index=_safe_default_index(
-            ["Browse Products", "My Cart", "Checkout", "Order History", "Logout"],
+            ["Browse Products", "Filter Products", "My Cart", "Checkout", "Order History", "Logout"],
             st.session_state["customer_view"]
         ),
         horizontal=True,
@@ -34,13 +36,20 @@ def show_customer_menu(connection, user_id):
     )
 
     if view == "Browse Products":
-        browse_products(connection, user_id)
+        with metrics.VIEW_SECONDS.time(view="browse_products"):
+            browse_products(connection, user_id)
+    elif view == "Filter Products":
+        with metrics.VIEW_SECONDS.time(view="filter_products"):
+            filter_products(connection)
     elif view == "My Cart":
-        view_cart(connection, user_id)
+        with metrics.VIEW_SECONDS.time(view="cart"):
+            view_cart(connection, user_id)
     elif view == "Checkout":
-        checkout(connection, user_id)
+        with metrics.VIEW_SECONDS.time(view="checkout"):
+            checkout(connection, user_id)
     elif view == "Order History":
-        view_order_history(connection, user_id)
+        with metrics.VIEW_SECONDS.time(view="order_history"):
+            view_order_history(connection, user_id)
     elif view == "Logout":
         st.info("Logging out...")
         if st.button("Confirm Log out"):
@@ -49,13 +58,18 @@ def show_customer_menu(connection, user_id):
 
 def browse_products(connection, user_id):
     """Browse categories → products → sellers, add to cart."""
-    c = connection.cursor()
+    # The product and seller lists depend on the selections, but those almost always
+    # match the previous rerun, so load all three lists for them up front (from the
+    # shared cache, or in parallel from the database) and only look up again below
+    # when the user picked something else.
+    stored_category_id = st.session_state.get("chosen_category_id")
+    stored_product_id = st.session_state.get("chosen_product_id")
+    prefetched = services.load_catalog(connection, stored_category_id, stored_product_id)
 
     # Categories
-    categories = _fetchall(c, "SELECT category_id, category_name FROM Categories")
+    categories = prefetched["categories"]
     if not categories:
         st.warning("No categories found.")
-        c.close()
         return
 
     cat_df = pd.DataFrame(categories, columns=["category_id", "category_name"])
@@ -73,12 +87,10 @@ def browse_products(connection, user_id):
     st.session_state["chosen_category_id"] = int(cat_choice)
 
     # Products in selected category
-    products = _fetchall(
-        c,
-        "SELECT product_id, product_name FROM Products WHERE category_id = %s",
-        (st.session_state["chosen_category_id"],),
-    )
-    c.close()
+    if "products" in prefetched and st.session_state["chosen_category_id"] == stored_category_id:
+        products = prefetched["products"]
+    else:
+        products = services.list_products(connection, st.session_state["chosen_category_id"])
 
     if not products:
         st.info("No products in this category yet.")
@@ -98,22 +110,14 @@ def browse_products(connection, user_id):
     st.session_state["chosen_product_id"] = int(prod_choice)
 
     # Sellers for product (cheapest first)
-    c = connection.cursor()
-    sellers = _fetchall(
-        c,
-        """
-        SELECT sp.inventory_id, u.first_name, u.last_name, sp.price, sp.stock_quantity
-        FROM Inventory sp
-        JOIN Users u ON sp.seller_id = u.user_id
-        WHERE sp.product_id = %s AND sp.stock_quantity > 0
-        ORDER BY sp.price ASC
-        """,
-        (st.session_state["chosen_product_id"],),
-    )
-    c.close()
+    if "sellers" in prefetched and st.session_state["chosen_product_id"] == stored_product_id:
+        sellers = prefetched["sellers"]
+    else:
+        sellers = services.list_sellers(connection, st.session_state["chosen_product_id"])
 
     if not sellers:
         st.warning("Sorry, this product is currently out of stock or not sold.")
+        _also_bought(connection, st.session_state["chosen_product_id"])
         return
 
     sellers_df = pd.DataFrame(
@@ -137,13 +141,123 @@ def browse_products(connection, user_id):
                     "stock": "Stock",
                 }
             ),
-            use_container_width=True,
+            width="stretch",
         )
 
+    _seller_picker(connection, user_id, prod_name_by_id[int(prod_choice)], sellers_df)
+    _also_bought(connection, st.session_state["chosen_product_id"])
+
+# ---------- recommendations ----------
+# One co-occurrence index per process, shared by all sessions. It picks up orders
+# placed since the last look at most every HYPECULTURE_RECS_REFRESH seconds.
+RECS_MAX_AGE = float(os.environ.get("HYPECULTURE_RECS_REFRESH", "60"))
+
+@st.cache_resource(show_spinner=False)
+def _recommender():
+    return recommendations.Recommender()
+
+def _choose_product(category_id, product_id):
+    st.session_state["chosen_category_id"] = category_id
+    st.session_state["chosen_product_id"] = product_id
+
+def _also_bought(connection, product_id):
+    """"Customers also bought" links for the product page, served from memory."""
+    recommender = _recommender()
+    try:
+        recommender.refresh_if_stale(connection, RECS_MAX_AGE)
+    except Exception:
+        return  # recommendations are a nice-to-have; never break browsing over them
+    picks = [(pid, recommender.product(pid)) for pid in recommender.also_bought(product_id)]
+    picks = [(pid, info) for pid, info in picks if info is not None]
+    if not picks:
+        return
+
+    st.markdown("#### Customers also bought")
+    for col, (pid, (name, category_id)) in zip(st.columns(len(picks)), picks):
+        col.button(
+            name,
+            key=f"also_bought_{pid}",
+            on_click=_choose_product,
+            args=(category_id, pid),
+            width="stretch",
+        )
+
+# ---------- faceted browse ----------
+# The whole catalog filtered by category, brand, price band and availability, served
+# from the in-memory facet index (facets.py) through services.browse(). Pages are
+# keyset cursors kept on a stack in session_state, so "Previous" is a pop.
+FACETS = (("category", "Category"), ("brand", "Brand"), ("price", "Price"), ("availability", "Availability"))
+SORT_LABELS = {"price": "Price: low to high", "newest": "Newest"}
+
+def _open_product(category_id, product_id):
+    _choose_product(category_id, product_id)
+    st.session_state["customer_view"] = "Browse Products"
+
+def _turn_page(cursor):
+    """Go to the page after `cursor`, or back one page when it is None."""
+    pages = st.session_state["facet_pages"]
+    if cursor is None:
+        pages.pop()
+    else:
+        pages.append(cursor)
+
+@st.fragment
+@metrics.timed_fragment("filter_products")
+def filter_products(connection):
+    """Faceted browse; a filter click reruns only this view."""
+    # The filter widgets show counts from this search, so read their values first
+    selected = {name: list(st.session_state.get(f"facet_{name}", [])) for name, _ in FACETS}
+    sort = st.session_state.get("facet_sort", "price")
+    signature = (tuple(tuple(values) for values in selected.values()), sort)
+    if st.session_state.get("facet_signature") != signature:
+        st.session_state["facet_signature"] = signature
+        st.session_state["facet_pages"] = [None]
+    pages = st.session_state["facet_pages"]
+    try:
+        result = services.browse(
+            connection, selected["category"], selected["brand"], selected["price"],
+            selected["availability"], sort, pages[-1],
+        )
+    except ServiceError as e:
+        st.error(str(e))
+        return
+
+    st.markdown("#### Filter Products")
+    filter_col, results_col = st.columns([1, 3])
+    with filter_col:
+        for name, label in FACETS:
+            labels = {value: f"{text} ({count:,})" for value, text, count in result["facets"][name]}
+            # A brand can drop out of the index when its last listing goes
+            st.session_state[f"facet_{name}"] = [v for v in selected[name] if v in labels]
+            st.multiselect(label, options=list(labels), format_func=labels.get, key=f"facet_{name}")
+        st.selectbox("Sort by", options=list(facets.SORTS), format_func=SORT_LABELS.get, key="facet_sort")
+
+    with results_col:
+        st.caption(f"{result['total']:,} products")
+        if not result["items"]:
+            st.info("No products match these filters.")
+        for product_id, name, brand, category_id, price, offers in result["items"]:
+            name_col, price_col, open_col = st.columns([4, 2, 1])
+            name_col.markdown(f"**{name}**  \n{brand or facets.NO_BRAND}")
+            price_col.markdown(f"${price:,.2f}  \n" + (f"{offers} seller(s)" if offers else "Sold out"))
+            if open_col.button("View", key=f"facet_open_{product_id}",
+                               on_click=_open_product, args=(category_id, product_id)):
+                st.rerun()  # the product page is outside this fragment
+
+        prev_col, page_col, next_col = st.columns([1, 2, 1])
+        prev_col.button("← Previous", disabled=len(pages) == 1, on_click=_turn_page, args=(None,))
+        page_col.caption(f"Page {len(pages)}")
+        next_col.button("Next →", disabled=result["next"] is None, on_click=_turn_page, args=(result["next"],))
+
+# Picking a seller or a quantity and adding to the cart only touch this part of the
+# page, so it reruns on its own instead of re-querying categories/products/sellers.
+@st.fragment
+@metrics.timed_fragment("browse_products")
+def _seller_picker(connection, user_id, product_name, sellers_df):
     st.markdown("#### Add to Cart")
     add_mode = st.radio("Choose seller", ["Best Price", "Pick from list"], horizontal=True)
     if add_mode == "Best Price":
-        inventory_id = int(best["inventory_id"])
+        chosen = sellers_df.iloc[0]
     else:
         # Use a clean Python list of row indices
         seller_row_indices = [int(i) for i in range(len(sellers_df))]
@@ -155,95 +269,101 @@ def browse_products(connection, user_id):
                 f"${sellers_df.loc[idx, 'price']:.2f} (Stock: {int(sellers_df.loc[idx, 'stock'])})"
             ),
         )
-        inventory_id = int(sellers_df.loc[seller_choice, "inventory_id"])
+        chosen = sellers_df.loc[seller_choice]
+    inventory_id = int(chosen["inventory_id"])
 
     qty = st.number_input("Quantity", min_value=1, step=1, value=1)
 
     if st.button("Add to Cart"):
-        _add_to_cart(connection, user_id, inventory_id, qty)
-
-def _add_to_cart(connection, user_id, inventory_id, quantity):
-    """Adds/updates item in Cart table."""
-    try:
-        c = connection.cursor()
-        # Validate stock
-        c.execute("SELECT stock_quantity FROM Inventory WHERE inventory_id = %s", (inventory_id,))
-        row = c.fetchone()
-        if not row:
-            st.error("Selected inventory item not found.")
-            c.close()
+        item = (product_name, chosen["seller_first"], chosen["price"])
+        _add_to_cart(connection, user_id, inventory_id, qty, item=item)
+
+# ---------- cart cache ----------
+# The cart is kept in st.session_state and updated write-through by _add_to_cart and
+# _save_cart_edits, so view_cart does not re-run the four-table join on every rerun.
+# A cheap aggregate over Cart/Inventory acts as the version: if it no longer matches
+# the cached rows (another tab edited the cart, a seller changed a price, ...) the
+# cart is reloaded from the database.
+
+def _cached_cart(user_id):
+    cache = st.session_state.get("cart_cache")
+    if cache and cache["user_id"] == user_id:
+        return cache
+    return None
+
+def _store_cart(user_id, rows):
+    st.session_state["cart_cache"] = {
+        "user_id": user_id,
+        "rows": rows,
+        "version": services.cart_version_of(rows),
+    }
+
+def _invalidate_cart():
+    st.session_state.pop("cart_cache", None)
+
+def _load_cart(connection, user_id):
+    """Return the user's cart rows, re-running the full join only on a version mismatch."""
+    cache = _cached_cart(user_id)
+    if cache is not None and services.cart_version(connection, user_id) == cache["version"]:
+        metrics.CART_CACHE.inc(result="hit")
+        return cache["rows"]
+    metrics.CART_CACHE.inc(result="miss")
+    rows = services.get_cart(connection, user_id)
+    _store_cart(user_id, rows)
+    return rows
+
+def _write_through_cart(cart_id, new_qty, user_id=None, item=None):
+    """Apply a committed cart change to the cached rows (or drop the cache if we can't)."""
+    cache = _cached_cart(user_id) if user_id is not None else st.session_state.get("cart_cache")
+    if cache is None:
+        return
+    rows = [r for r in cache["rows"] if int(r[5]) != int(cart_id)]
+    existing = [r for r in cache["rows"] if int(r[5]) == int(cart_id)]
+    if new_qty > 0:
+        if existing:
+            product_name, seller_name, price = existing[0][:3]
+        elif item is not None:
+            product_name, seller_name, price = item
+        else:
+            _invalidate_cart()
             return
+        rows.append((product_name, seller_name, price, int(new_qty), price * int(new_qty), int(cart_id)))
+        rows.sort(key=lambda r: int(r[5]))
+    _store_cart(cache["user_id"], rows)
 
-        stock = int(row[0])
-        if quantity <= 0:
-            st.warning("Quantity must be positive.")
-            c.close()
-            return
-        if quantity > stock:
-            st.warning(f"Only {stock} left in stock.")
-            c.close()
-            return
+def _add_to_cart(connection, user_id, inventory_id, quantity, item=None):
+    """Adds/updates item in Cart table.
 
-        # Upsert-like behavior
-        c.execute(
-            "SELECT cart_id, quantity FROM Cart WHERE customer_id = %s AND inventory_id = %s",
-            (user_id, inventory_id),
-        )
-        existing = c.fetchone()
-        if existing:
-            cart_id, current_qty = existing
-            new_qty = int(current_qty) + int(quantity)
-            if new_qty > stock:
-                st.warning(
-                    f"Adding {quantity} would exceed stock ({stock}). "
-                    f"You currently have {current_qty} in cart."
-                )
-                c.close()
-                return
-            c.execute("UPDATE Cart SET quantity = %s WHERE cart_id = %s", (new_qty, cart_id))
-        else:
-            c.execute(
-                "INSERT INTO Cart (customer_id, inventory_id, quantity) VALUES (%s, %s, %s)",
-                (user_id, inventory_id, int(quantity)),
-            )
-        connection.commit()
+    `item` is the (product name, seller name, price) being added; when given, a new
+    cart row is written through to the cached cart instead of forcing a reload.
+    """
+    try:
+        cart_id, new_qty = services.add_to_cart(connection, user_id, inventory_id, quantity)
+        _write_through_cart(cart_id, new_qty, user_id=user_id, item=item)
         st.success("Item added to cart successfully!")
+    except services.NotFoundError as e:
+        st.error(str(e))
+    except ServiceError as e:
+        st.warning(str(e))
     except Exception as e:
-        connection.rollback()
         st.error(f"An error occurred: {e}")
-    finally:
-        try:
-            c.close()
-        except Exception:
-            pass
 
+@st.fragment
+@metrics.timed_fragment("cart")
 def view_cart(connection, user_id):
-    """Displays the contents of the user's cart."""
-    c = connection.cursor()
-    query = """
-    SELECT
-        p.product_name,
-        u.first_name AS seller_name,
-        i.price,
-        c.quantity,
-        (i.price * c.quantity) AS subtotal,
-        c.cart_id
-    FROM
-        Cart AS c
-    JOIN
-        Inventory AS i ON c.inventory_id = i.inventory_id
-    JOIN
-        Products AS p ON i.product_id = p.product_id
-    JOIN
-        Users AS u ON i.seller_id = u.user_id
-    WHERE
-        c.customer_id = %s;
+    """Displays the contents of the user's cart.
+
+    Quantities are edited in a grid inside a form, so a whole edit session is one
+    submit: one transaction (services.update_cart_items) and one fragment rerun.
     """
     try:
-        c.execute(query, (user_id,))
-        rows = c.fetchall()
+        rows = _load_cart(connection, user_id)
 
         st.markdown("#### 🛒 Your Shopping Cart")
+        notice = st.session_state.pop("cart_notice", None)
+        if notice:
+            kind, message = notice
+            (st.success if kind == "success" else st.error)(message)
         if not rows:
             st.info("Your cart is empty.")
             return
@@ -253,76 +373,66 @@ def view_cart(connection, user_id):
         )
         total = float(df["Subtotal"].sum())
 
-        st.dataframe(df[["Product", "Seller", "Price", "Qty", "Subtotal"]], use_container_width=True)
-        st.markdown(f"**TOTAL:** ${total:.2f}")
-
-        with st.expander("Update quantities / remove items"):
-            for _, r in df.iterrows():
-                col1, col2, col3 = st.columns([3, 2, 2])
-                with col1:
-                    st.write(f"{r['Product']} (by {r['Seller']})")
-                with col2:
-                    new_qty = st.number_input(
-                        f"Qty for cart #{int(r['cart_id'])}",
-                        min_value=0,
-                        step=1,
-                        value=int(r["Qty"]),
-                        key=f"qty_{int(r['cart_id'])}",
-                    )
-                with col3:
-                    if st.button("Update", key=f"upd_{int(r['cart_id'])}"):
-                        _update_cart_item(connection, int(r["cart_id"]), int(new_qty))
-                        st.rerun()
+        # A new key after each save starts the grid from the saved rows
+        editor_key = f"cart_editor_{st.session_state.get('cart_editor_rev', 0)}"
+        with st.form("cart_form", border=False):
+            st.data_editor(
+                df,
+                key=editor_key,
+                hide_index=True,
+                num_rows="fixed",
+                column_order=["Product", "Seller", "Price", "Qty", "Subtotal"],
+                disabled=["Product", "Seller", "Price", "Subtotal", "cart_id"],
+                column_config={
+                    "Price": st.column_config.NumberColumn(format="$%.2f"),
+                    "Qty": st.column_config.NumberColumn(
+                        "Qty", min_value=0, step=1, help="Set to 0 to remove the item"
+                    ),
+                    "Subtotal": st.column_config.NumberColumn(format="$%.2f"),
+                },
+                width="stretch",
+            )
+            st.markdown(f"**TOTAL:** ${total:.2f}")
+            st.form_submit_button(
+                "Save cart",
+                on_click=_save_cart_edits,
+                args=(connection, user_id, editor_key, [int(cid) for cid in df["cart_id"]]),
+            )
 
     except Exception as e:
         st.error(f"An error occurred while viewing cart: {e}")
-    finally:
-        c.close()
 
-def _update_cart_item(connection, cart_id, new_qty):
+def _save_cart_edits(connection, user_id, editor_key, cart_ids):
+    """Save-cart callback; the outcome is shown by view_cart on the rerun."""
+    edited_rows = st.session_state.get(editor_key, {}).get("edited_rows", {})
+    quantities = {}
+    for position, changes in edited_rows.items():
+        if changes.get("Qty") is not None:
+            quantities[cart_ids[int(position)]] = int(changes["Qty"])
+    if not quantities:
+        st.session_state["cart_notice"] = ("success", "No changes to save.")
+        return
     try:
-        c = connection.cursor()
-        if int(new_qty) == 0:
-            c.execute("DELETE FROM Cart WHERE cart_id = %s", (cart_id,))
-        else:
-            c.execute("UPDATE Cart SET quantity = %s WHERE cart_id = %s", (int(new_qty), cart_id))
-        connection.commit()
-        st.success("Cart updated.")
+        updated, removed = services.update_cart_items(connection, user_id, quantities)
+        for cart_id, qty in quantities.items():
+            _write_through_cart(cart_id, qty, user_id=user_id)
+        st.session_state["cart_editor_rev"] = st.session_state.get("cart_editor_rev", 0) + 1
+        st.session_state["cart_notice"] = ("success", f"Cart updated ({updated} changed, {removed} removed).")
     except Exception as e:
-        connection.rollback()
-        st.error(f"Could not update cart: {e}")
-    finally:
-        try:
-            c.close()
-        except Exception:
-            pass
+        st.session_state["cart_notice"] = ("error", f"Could not update cart: {e}")
 
 def checkout(connection, user_id):
     """Checkout flow using a single transaction."""
-    c = connection.cursor()
-    c.execute(
-        """
-        SELECT c.inventory_id, c.quantity, i.price, i.stock_quantity
-        FROM Cart c JOIN Inventory i ON c.inventory_id = i.inventory_id
-        WHERE c.customer_id = %s;
-        """,
-        (user_id,),
-    )
-    cart_items = c.fetchall()
-    c.close()
-
     st.markdown("#### 💳 Checkout")
+    try:
+        cart_items, total_amount = services.checkout_items(connection, user_id)
+    except ServiceError as e:
+        st.error(str(e))
+        return
     if not cart_items:
         st.info("Your cart is empty. Add items before checking out.")
         return
 
-    total_amount = 0.0
-    for inv_id, qty, price, stock in cart_items:
-        if int(qty) > int(stock):
-            st.error(f"Not enough stock for item ID {inv_id}. Only {stock} left.")
-            return
-        total_amount += int(qty) * float(price)
-
     st.write(f"**Order Total:** ${total_amount:.2f}")
 
     with st.form("shipping_form"):
@@ -338,91 +448,42 @@ def checkout(connection, user_id):
             st.warning("All fields are required.")
             return
 
-        cur = connection.cursor(buffered=True)
         try:
-            cur.execute(
-                "INSERT INTO Addresses (user_id, address_line1, city, state, postal_code) VALUES (%s, %s, %s, %s, %s)",
-                (user_id, address_line, city, state, postal_code),
-            )
-            address_id = cur.lastrowid
-
-            cur.execute(
-                "INSERT INTO Orders (customer_id, address_id, total_amount) VALUES (%s, %s, %s)",
-                (user_id, address_id, total_amount),
+            order_id = services.place_order(
+                connection, user_id, address_line, city, state, postal_code, items=cart_items
             )
-            order_id = cur.lastrowid
-
-            for inv_id, qty, price, stock in cart_items:
-                cur.execute(
-                    "INSERT INTO OrderItems (order_id, inventory_id, quantity, price_per_unit) VALUES (%s, %s, %s, %s)",
-                    (order_id, inv_id, int(qty), float(price)),
-                )
-                new_stock = int(stock) - int(qty)
-                cur.execute(
-                    "UPDATE Inventory SET stock_quantity = %s WHERE inventory_id = %s",
-                    (new_stock, inv_id),
-                )
-
-            cur.execute("DELETE FROM Cart WHERE customer_id = %s", (user_id,))
-            connection.commit()
+            _invalidate_cart()
 
             with st.spinner("Processing payment..."):
                 time.sleep(1)
             st.success(f"Payment successful! Your order #{order_id} has been placed.")
         except Exception as e:
-            connection.rollback()
             st.error(f"An error occurred during checkout: {e}. Transaction rolled back.")
-        finally:
-            cur.close()
 
 def view_order_history(connection, user_id):
-    """Displays past orders and their items."""
-    c = connection.cursor()
+    """Displays past orders and their items (archived orders only on request)."""
+    include_archived = st.checkbox("Include archived orders", value=False, key="history_include_archived")
     try:
-        c.execute(
-            """
-            SELECT o.order_id, o.order_date, o.total_amount, a.address_line1, a.city
-            FROM Orders o JOIN Addresses a ON o.address_id = a.address_id
-            WHERE o.customer_id = %s
-            ORDER BY o.order_date DESC;
-            """,
-            (user_id,),
-        )
-        orders = c.fetchall()
+        orders = services.order_history(connection, user_id, include_archived)
 
         st.markdown("#### 📜 Your Order History")
         if not orders:
             st.info("You have no past orders.")
             return
 
-        for (order_id, order_date, total, address, city) in orders:
+        for (order_id, order_date, total, address, city, archived) in orders:
             with st.expander(
-                f"Order #{order_id} — {order_date.strftime('%Y-%m-%d')} — Total: ${float(total):.2f}",
+                f"Order #{order_id} — {order_date.strftime('%Y-%m-%d')} — Total: ${float(total):.2f}"
+                + (" (archived)" if archived else ""),
                 expanded=False,
             ):
                 st.caption(f"Shipped to: {address}, {city}")
 
-                item_c = connection.cursor()
-                item_c.execute(
-                    """
-                    SELECT p.product_name, u.first_name AS seller_name, oi.quantity, oi.price_per_unit
-                    FROM OrderItems oi
-                    JOIN Inventory i ON oi.inventory_id = i.inventory_id
-                    JOIN Products p ON i.product_id = p.product_id
-                    JOIN Users u ON i.seller_id = u.user_id
-                    WHERE oi.order_id = %s;
-                    """,
-                    (order_id,),
-                )
-                items = item_c.fetchall()
-                item_c.close()
-
+                items = services.order_items(connection, order_id, order_date, archived)
                 if items:
                     df = pd.DataFrame(items, columns=["Product", "Seller", "Qty", "Price per unit"])
-                    st.dataframe(df, use_container_width=True)
+                    st.dataframe(df, width="stretch")
                 else:
                     st.write("_No items found for this order._")
     except Exception as e:
         st.error(f"An error occurred while fetching order history: {e}")
-    finally:
-        c.close()
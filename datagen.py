@@ -0,0 +1,340 @@
+# datagen.py — deterministic synthetic marketplace data for scale and benchmark runs
+#
+# Generates skewed, realistic-looking data on top of whatever is already in the
+# database (the hypeculture.sql seed, usually) and bulk-loads it:
+#   * product popularity follows a Zipf law, and hyped products attract many sellers
+#   * a few power sellers own a large share of listings
+#   * buyers are heavy-tailed: most have a couple of orders, a few have hundreds
+#   * order dates skew recent, spread over --days of history
+# The same --seed always produces the same rows (for the same starting database):
+# history ends on END_DATE unless --end-date moves it, e.g. to today for order and
+# cart ages that look current to order_archive.py and maintenance.py.
+#
+#     python datagen.py                       # scale 1: 10k users, 30k orders
+#     python datagen.py --scale 100 --seed 7  # 1M users, 3M orders, ~5M order lines
+#     HYPECULTURE_DB=sqlite:/tmp/hype.db python datagen.py --scale 10
+import argparse
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import numpy as np
+
+from db_connector import create_connection, using_sqlite
+from services import address_hash
+
+# Row counts at --scale 1
+BASE_COUNTS = {
+    "users": 10_000,
+    "products": 2_000,
+    "listings": 20_000,
+    "orders": 30_000,
+    "carts": 2_000,
+}
+SELLER_SHARE = 0.02  # fraction of generated users who are sellers
+CHUNK_SIZE = 5_000  # rows per executemany / commit
+# Last day of generated history; fixed, so a seed means the same rows on any day
+END_DATE = datetime(2025, 1, 1)
+# Rounds of redrawing a cart line that repeats one of its owner's listings
+CART_REDRAWS = 100
+
+FIRST_NAMES = ["Ava", "Ben", "Chloe", "Dev", "Elif", "Finn", "Grace", "Hiro", "Isla", "Jai",
+               "Kai", "Lena", "Mo", "Nia", "Omar", "Priya", "Quinn", "Rosa", "Sam", "Tariq"]
+LAST_NAMES = ["Adams", "Brooks", "Chen", "Diaz", "Evans", "Fischer", "Garcia", "Hughes", "Ito",
+              "Jones", "Kim", "Lopez", "Miller", "Nakamura", "Okafor", "Patel", "Rossi", "Singh"]
+BRANDS = ["Nike", "Adidas", "New Balance", "Asics", "Puma", "Converse", "Vans", "Reebok",
+          "Salomon", "Timberland", "Dr. Martens", "Hoka"]
+MODELS = ["Air Max", "Dunk", "Jordan", "Samba", "Gazelle", "550", "990", "Gel-Kayano", "Suede",
+          "Chuck 70", "Old Skool", "Club C", "XT-6", "6-Inch", "1460", "Clifton"]
+CITIES = [("Portland", "OR", "97201"), ("Austin", "TX", "73301"), ("Chicago", "IL", "60601"),
+          ("Brooklyn", "NY", "11201"), ("Seattle", "WA", "98101"), ("Denver", "CO", "80202"),
+          ("Atlanta", "GA", "30301"), ("Oakland", "CA", "94601")]
+
+def zipf_weights(n, exponent):
+    """Normalized Zipf probabilities for ranks 1..n."""
+    weights = 1.0 / np.arange(1, n + 1, dtype=np.float64) ** exponent
+    return weights / weights.sum()
+
+def _max_id(cursor, table, column):
+    cursor.execute(f"SELECT COALESCE(MAX({column}), 0) FROM {table}")
+    return int(cursor.fetchone()[0])
+
+def _bulk_insert(connection, table, columns, rows, chunk_size=CHUNK_SIZE, verbose=False):
+    """executemany() in chunks, one commit per chunk. `rows` yields lists of tuples."""
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+    c = connection.cursor()
+    total = 0
+    started = time.perf_counter()
+    try:
+        for chunk in rows:
+            c.executemany(sql, chunk)
+            connection.commit()
+            total += len(chunk)
+    finally:
+        c.close()
+    elapsed = time.perf_counter() - started
+    if verbose:
+        print(f"  {table:<12} {total:>10,} rows  {elapsed:7.1f}s  ({total / max(elapsed, 1e-9):,.0f} rows/s)")
+    return total
+
+def _chunks(n, chunk_size=CHUNK_SIZE):
+    for start in range(0, n, chunk_size):
+        yield start, min(n, start + chunk_size)
+
+def generate(counts, seed, days, offsets, category_ids, end=None):
+    """Build every table's columns as NumPy arrays. Deterministic for a given seed and offsets.
+
+    Ids are absolute: each table continues after the `offsets` (its current max id).
+    Order and cart dates run up to `end` (default: END_DATE).
+    """
+    rng = np.random.default_rng(seed)
+    ds = SimpleNamespace()
+    end = end or END_DATE
+    now = end.timestamp()
+
+    # Users: the first SELLER_SHARE of the generated ids are sellers
+    n_users = counts["users"]
+    n_sellers = max(1, int(n_users * SELLER_SHARE))
+    ds.user_ids = offsets["users"] + 1 + np.arange(n_users)
+    ds.seller_ids = ds.user_ids[:n_sellers]
+    ds.customer_ids = ds.user_ids[n_sellers:]
+    ds.first_names = rng.integers(0, len(FIRST_NAMES), n_users)
+    ds.last_names = rng.integers(0, len(LAST_NAMES), n_users)
+
+    # Products: popularity rank is a random permutation, so ids don't give it away
+    n_products = counts["products"]
+    ds.product_ids = offsets["products"] + 1 + np.arange(n_products)
+    popularity = zipf_weights(n_products, 1.1)[rng.permutation(n_products)]
+    ds.product_brand = rng.integers(0, len(BRANDS), n_products)
+    ds.product_model = rng.integers(0, len(MODELS), n_products)
+    ds.product_category = np.asarray(category_ids)[
+        rng.choice(len(category_ids), n_products, p=zipf_weights(len(category_ids), 1.0))
+    ]
+    base_price = np.round(rng.lognormal(np.log(140), 0.45, n_products), 2)
+
+    # Listings: at least one per product, the rest follow popularity (hyped shoes get
+    # many sellers); sellers themselves are Zipf-distributed (power sellers)
+    n_listings = max(counts["listings"], n_products)
+    extra = rng.multinomial(n_listings - n_products, 0.8 * popularity + 0.2 / n_products)
+    listings_per_product = 1 + extra
+    ds.listing_product_idx = np.repeat(np.arange(n_products), listings_per_product)
+    ds.inventory_ids = offsets["inventory"] + 1 + np.arange(n_listings)
+    ds.listing_seller = ds.seller_ids[rng.choice(n_sellers, n_listings, p=zipf_weights(n_sellers, 0.9))]
+    hype = 1.0 + 2.0 * (popularity / popularity.max()) ** 0.5  # resale premium on hot products
+    ds.listing_price = np.round(
+        base_price[ds.listing_product_idx] * hype[ds.listing_product_idx]
+        * rng.uniform(0.9, 1.25, n_listings), 2
+    )
+    listing_start = np.concatenate(([0], np.cumsum(listings_per_product)[:-1]))
+
+    # Orders: heavy-tailed buyers, dates skewed towards the present, ids in date order
+    n_orders = counts["orders"]
+    buyer_rank = rng.choice(len(ds.customer_ids), n_orders, p=zipf_weights(len(ds.customer_ids), 0.85))
+    buyer_perm = rng.permutation(len(ds.customer_ids))
+    ds.order_customer = ds.customer_ids[buyer_perm[buyer_rank]]
+    order_ts = np.sort(now - days * 86400 * (1.0 - rng.power(2.0, n_orders)))
+    ds.order_ts = np.floor(order_ts)
+    ds.order_ids = offsets["orders"] + 1 + np.arange(n_orders)
+
+    # Order lines: 1 + geometric items per order, products by popularity, a uniformly
+    # chosen listing of that product, mostly quantity 1
+    items_per_order = rng.geometric(0.55, n_orders)
+    n_items = int(items_per_order.sum())
+    ds.item_order_idx = np.repeat(np.arange(n_orders), items_per_order)
+    item_product = rng.choice(n_products, n_items, p=popularity)
+    ds.item_listing_idx = listing_start[item_product] + np.floor(
+        rng.random(n_items) * listings_per_product[item_product]
+    ).astype(np.int64)
+    ds.item_qty = rng.geometric(0.85, n_items)
+    ds.item_price = ds.listing_price[ds.item_listing_idx]
+    ds.order_item_ids = offsets["order_items"] + 1 + np.arange(n_items)
+    ds.order_total = np.round(
+        np.bincount(ds.item_order_idx, weights=ds.item_qty * ds.item_price, minlength=n_orders), 2
+    )
+
+    # AfterOrderItemInsert subtracts every order line from stock, so start each listing
+    # with its remaining stock plus everything it will have sold
+    sold = np.bincount(ds.item_listing_idx, weights=ds.item_qty, minlength=n_listings).astype(np.int64)
+    ds.listing_stock = rng.integers(0, 40, n_listings) + sold
+
+    # One shipping address per distinct buyer
+    ds.address_users, order_address_idx = np.unique(ds.order_customer, return_inverse=True)
+    ds.address_ids = offsets["addresses"] + 1 + np.arange(len(ds.address_users))
+    ds.order_address = ds.address_ids[order_address_idx]
+    ds.address_city = rng.integers(0, len(CITIES), len(ds.address_users))
+    ds.address_number = rng.integers(1, 9999, len(ds.address_users))
+
+    # Open carts, some of them long abandoned
+    def draw_listings(n):
+        product = rng.choice(n_products, n, p=popularity)
+        return listing_start[product] + np.floor(rng.random(n) * listings_per_product[product]).astype(np.int64)
+
+    n_carts = counts["carts"]
+    cart_customer = ds.customer_ids[rng.integers(0, len(ds.customer_ids), n_carts)]
+    cart_listing = draw_listings(n_carts)
+    # The app keeps one Cart row per (customer, listing): redraw repeats, and drop
+    # the few left when a customer's lines outnumber what can be drawn
+    for _ in range(CART_REDRAWS):
+        repeat = _repeats((cart_customer << 32) | cart_listing)
+        if not repeat.any():
+            break
+        cart_listing[repeat] = draw_listings(int(repeat.sum()))
+    keep = ~_repeats((cart_customer << 32) | cart_listing)
+    ds.cart_customer = cart_customer[keep]
+    ds.cart_listing = ds.inventory_ids[cart_listing[keep]]
+    n_carts = len(ds.cart_customer)
+    ds.cart_qty = rng.geometric(0.8, n_carts)
+    # A cart's lines are added within a few hours of each other, before its owner's
+    # last visit; many owners never came back (see maintenance.py)
+    cart_owners, cart_owner_idx = np.unique(ds.cart_customer, return_inverse=True)
+    last_visit = now - 86400 * rng.exponential(30.0, len(cart_owners))
+    ds.cart_ts = np.floor(last_visit[cart_owner_idx] - 3600 * rng.exponential(2.0, n_carts))
+    return ds
+
+def _repeats(keys):
+    """True where a key already occurred earlier in `keys`."""
+    repeat = np.ones(len(keys), dtype=bool)
+    repeat[np.unique(keys, return_index=True)[1]] = False
+    return repeat
+
+def _fmt_ts(values):
+    return [datetime.fromtimestamp(v) for v in values.tolist()]
+
+def load(connection, ds, verbose=False):
+    """Bulk-insert the generated columns, parents before children; `verbose` prints rates."""
+    def users():
+        roles = np.where(np.isin(ds.user_ids, ds.seller_ids), "seller", "customer")
+        for lo, hi in _chunks(len(ds.user_ids)):
+            yield [
+                (uid, FIRST_NAMES[f], LAST_NAMES[l], f"user{uid}@synthetic.hypeculture", "pass123", role)
+                for uid, f, l, role in zip(ds.user_ids[lo:hi].tolist(), ds.first_names[lo:hi].tolist(),
+                                           ds.last_names[lo:hi].tolist(), roles[lo:hi].tolist())
+            ]
+
+    def products():
+        for lo, hi in _chunks(len(ds.product_ids)):
+            yield [
+                (pid, f"{BRANDS[b]} {MODELS[m]} #{pid}", BRANDS[b], cat)
+                for pid, b, m, cat in zip(ds.product_ids[lo:hi].tolist(), ds.product_brand[lo:hi].tolist(),
+                                          ds.product_model[lo:hi].tolist(), ds.product_category[lo:hi].tolist())
+            ]
+
+    def inventory():
+        product_ids = ds.product_ids[ds.listing_product_idx]
+        for lo, hi in _chunks(len(ds.inventory_ids)):
+            yield list(zip(ds.inventory_ids[lo:hi].tolist(), ds.listing_seller[lo:hi].tolist(),
+                           product_ids[lo:hi].tolist(), ds.listing_price[lo:hi].tolist(),
+                           ds.listing_stock[lo:hi].tolist()))
+
+    def addresses():
+        for lo, hi in _chunks(len(ds.address_ids)):
+            yield [
+                (aid, uid, f"{num} Market St", *CITIES[city], address_hash(f"{num} Market St", *CITIES[city]))
+                for aid, uid, num, city in zip(ds.address_ids[lo:hi].tolist(), ds.address_users[lo:hi].tolist(),
+                                               ds.address_number[lo:hi].tolist(), ds.address_city[lo:hi].tolist())
+            ]
+
+    def orders():
+        for lo, hi in _chunks(len(ds.order_ids)):
+            yield list(zip(ds.order_ids[lo:hi].tolist(), ds.order_customer[lo:hi].tolist(),
+                           ds.order_address[lo:hi].tolist(), _fmt_ts(ds.order_ts[lo:hi]),
+                           ds.order_total[lo:hi].tolist()))
+
+    def order_items():
+        order_ids = ds.order_ids[ds.item_order_idx]
+        order_ts = ds.order_ts[ds.item_order_idx]
+        inventory_ids = ds.inventory_ids[ds.item_listing_idx]
+        for lo, hi in _chunks(len(ds.order_item_ids)):
+            yield list(zip(ds.order_item_ids[lo:hi].tolist(), order_ids[lo:hi].tolist(),
+                           _fmt_ts(order_ts[lo:hi]), inventory_ids[lo:hi].tolist(),
+                           ds.item_qty[lo:hi].tolist(), ds.item_price[lo:hi].tolist()))
+
+    def carts():
+        for lo, hi in _chunks(len(ds.cart_customer)):
+            yield list(zip(ds.cart_customer[lo:hi].tolist(), ds.cart_listing[lo:hi].tolist(),
+                           ds.cart_qty[lo:hi].tolist(), _fmt_ts(ds.cart_ts[lo:hi])))
+
+    def insert(table, columns, rows):
+        _bulk_insert(connection, table, columns, rows, verbose=verbose)
+
+    insert("Users",
+           ["user_id", "first_name", "last_name", "email", "password_hash", "user_role"], users())
+    insert("Products", ["product_id", "product_name", "brand", "category_id"], products())
+    insert("Inventory",
+           ["inventory_id", "seller_id", "product_id", "price", "stock_quantity"], inventory())
+    insert("Addresses",
+           ["address_id", "user_id", "address_line1", "city", "state", "postal_code", "address_hash"],
+           addresses())
+    insert("Orders",
+           ["order_id", "customer_id", "address_id", "order_date", "total_amount"], orders())
+    insert("OrderItems",
+           ["order_item_id", "order_id", "order_date", "inventory_id", "quantity", "price_per_unit"],
+           order_items())
+    insert("Cart", ["customer_id", "inventory_id", "quantity", "added_date"], carts())
+
+def _prepare_session(connection):
+    """Session settings that make bulk loading much faster on each backend."""
+    c = connection.cursor()
+    if using_sqlite():
+        c.execute("PRAGMA synchronous = OFF")
+    else:
+        c.execute("SET SESSION unique_checks = 0")
+        c.execute("SET SESSION foreign_key_checks = 0")
+    c.close()
+
+def populate(connection, counts, seed=42, days=730, end=None, verbose=False):
+    """Generate `counts` rows after the ids already in the database and load them.
+
+    Returns the generated dataset.
+    """
+    c = connection.cursor()
+    offsets = {
+        "users": _max_id(c, "Users", "user_id"),
+        "products": _max_id(c, "Products", "product_id"),
+        "inventory": _max_id(c, "Inventory", "inventory_id"),
+        "addresses": _max_id(c, "Addresses", "address_id"),
+        # ids continue after archived orders too, so archiving never sees duplicates
+        "orders": max(_max_id(c, "Orders", "order_id"), _max_id(c, "OrdersArchive", "order_id")),
+        "order_items": max(_max_id(c, "OrderItems", "order_item_id"),
+                           _max_id(c, "OrderItemsArchive", "order_item_id")),
+    }
+    c.execute("SELECT category_id FROM Categories ORDER BY category_id")
+    category_ids = [int(r[0]) for r in c.fetchall()]
+    c.close()
+    if not category_ids:
+        raise ValueError("No categories found; load hypeculture.sql first.")
+
+    ds = generate(counts, seed, days, offsets, category_ids, end)
+    _prepare_session(connection)
+    load(connection, ds, verbose)
+    return ds
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate and bulk-load synthetic marketplace data.")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplier for all row counts")
+    parser.add_argument("--seed", type=int, default=42, help="random seed (same seed, same data)")
+    parser.add_argument("--days", type=int, default=730, help="days of order history")
+    parser.add_argument("--end-date", type=datetime.fromisoformat, default=None,
+                        help=f"last day of generated history, YYYY-MM-DD (default: {END_DATE:%Y-%m-%d})")
+    for name, base in BASE_COUNTS.items():
+        parser.add_argument(f"--{name}", type=int, default=None, help=f"override row count (scale 1: {base:,})")
+    args = parser.parse_args()
+    counts = {
+        name: getattr(args, name) if getattr(args, name) is not None else max(1, int(base * args.scale))
+        for name, base in BASE_COUNTS.items()
+    }
+
+    connection = create_connection()
+    if not connection:
+        raise SystemExit("Could not connect to the database.")
+    try:
+        started = time.perf_counter()
+        ds = populate(connection, counts, args.seed, args.days, args.end_date, verbose=True)
+        print(f"Loaded {len(ds.order_item_ids):,} order lines in {time.perf_counter() - started:.1f}s.")
+    except ValueError as e:
+        raise SystemExit(str(e))
+    finally:
+        connection.close()
+
+if __name__ == "__main__":
+    main()
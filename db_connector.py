@@ -1,20 +1,232 @@
 # db_connector.py
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
 import mysql.connector
-from mysql.connector import Error
+from mysql.connector import ClientFlag, Error, pooling
+
+import metrics
+
+# "mysql" (default), or "sqlite" / "sqlite:<path>" for the server-less SQLite backend
+# (in-memory unless a database file is given), e.g. HYPECULTURE_DB=sqlite:hype.db
+DB_BACKEND = os.environ.get("HYPECULTURE_DB", "mysql")
+
+DB_CONFIG = {
+    "host": "localhost",
+    "user": "manoj",  # <-- CHANGE THIS to your MySQL username
+    "password": "ssdiblr",  # <-- CHANGE THIS to your MySQL password
+    "database": "hypeculture_db",
+    # rowcount of an UPDATE counts matched rows (as on SQLite), not only changed ones
+    "client_flags": [ClientFlag.FOUND_ROWS],
+}
+
+# Pooled connections per process; fetch_parallel and pooled_connection share them
+POOL_SIZE = int(os.environ.get("HYPECULTURE_POOL_SIZE", "8"))
+# Seconds before trying again to create a pool that failed (e.g. MySQL is down)
+POOL_RETRY_DELAY = float(os.environ.get("HYPECULTURE_POOL_RETRY", "30"))
+
+_pool = None
+_pool_lock = threading.Lock()
+_pool_retry_at = 0.0
+_pool_failing = False  # the failure has been reported; stay quiet until the pool comes up
+# MySQLConnectionPool raises instead of waiting when it runs dry, so borrowers queue here
+_pool_slots = threading.BoundedSemaphore(POOL_SIZE)
+_executor = None
+_shared_sqlite = None
+# How many pooled connections the current thread has borrowed (see fetch_parallel)
+_borrowed = threading.local()
+
+def using_sqlite():
+    return DB_BACKEND.startswith("sqlite")
+
+def now_sql():
+    """SQL for the database's current time, on the clock the DEFAULT timestamps use."""
+    # SQLite's CURRENT_TIMESTAMP is UTC, while sqlite_schema.sql defaults to local time
+    return "datetime('now', 'localtime')" if using_sqlite() else "CURRENT_TIMESTAMP"
+
+# ---------- instrumentation ----------
+# Connections handed out by this module time every statement into the
+# hypeculture_db_query_duration_seconds histogram (see metrics.py).
+_STATEMENT_TYPES = {"SELECT", "INSERT", "UPDATE", "DELETE"}
+
+def _statement_type(query):
+    verb = query.lstrip(" \t\r\n(").split(None, 1)[:1]
+    verb = verb[0].upper() if verb else ""
+    return verb.lower() if verb in _STATEMENT_TYPES else "other"
+
+class MeteredCursor:
+    """Cursor wrapper recording the duration (and failures) of each execute."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def _timed(self, method, query, params):
+        statement = _statement_type(query)
+        start = time.perf_counter()
+        try:
+            return method(query, params)
+        except Exception:
+            metrics.DB_QUERY_ERRORS.inc(statement=statement)
+            raise
+        finally:
+            metrics.DB_QUERY_SECONDS.observe(time.perf_counter() - start, statement=statement)
+
+    def execute(self, query, params=()):
+        return self._timed(self._cursor.execute, query, params)
+
+    def executemany(self, query, seq_of_params):
+        return self._timed(self._cursor.executemany, query, seq_of_params)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cursor.close()
+
+class MeteredConnection:
+    """Connection wrapper whose cursors are MeteredCursors; everything else passes through."""
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    def cursor(self, *args, **kwargs):
+        return MeteredCursor(self._connection.cursor(*args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
 
 def create_connection():
-    """ Create a database connection to the MySQL database """
+    """ Create a database connection to the configured (MySQL or SQLite) database """
+    if using_sqlite():
+        from sqlite_backend import create_sqlite_connection
+        connection = create_sqlite_connection(DB_BACKEND.partition(":")[2] or ":memory:")
+        metrics.DB_CONNECTIONS.inc(result="ok")
+        return MeteredConnection(connection)
+
     connection = None
     try:
-        connection = mysql.connector.connect(
-            host="localhost",
-            user="manoj",  # <-- CHANGE THIS to your MySQL username
-            password="ssdiblr",  # <-- CHANGE THIS to your MySQL password
-            database="hypeculture_db"
-        )
+        connection = mysql.connector.connect(**DB_CONFIG)
         if connection.is_connected():
             # print("Successfully connected to the database")
             pass
+        metrics.DB_CONNECTIONS.inc(result="ok")
+        connection = MeteredConnection(connection)
     except Error as e:
+        metrics.DB_CONNECTIONS.inc(result="error")
         print(f"Error while connecting to MySQL: {e}")
     return connection
+
+def get_pool():
+    """ Return the shared connection pool, creating it on first use (None if unavailable)
+
+    After a failed attempt the pool is not retried for POOL_RETRY_DELAY seconds, so
+    pages fall back to their own connection instead of each waiting out a connect
+    timeout; the failure is printed once, not on every attempt.
+    """
+    global _pool, _executor, _pool_retry_at, _pool_failing
+    if using_sqlite():
+        return None  # SQLite serializes writers anyway; reads stay on the page connection
+    with _pool_lock:
+        if _pool is None and time.monotonic() >= _pool_retry_at:
+            try:
+                _pool = pooling.MySQLConnectionPool(
+                    pool_name="hypeculture", pool_size=POOL_SIZE, **DB_CONFIG
+                )
+                # Never run more queries at once than there are pooled connections
+                _executor = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="db-fetch")
+                metrics.DB_POOL_SIZE.set(POOL_SIZE)
+                if _pool_failing:
+                    print("MySQL connection pool created.")
+                _pool_failing = False
+            except Error as e:
+                _pool_retry_at = time.monotonic() + POOL_RETRY_DELAY
+                if not _pool_failing:
+                    print(f"Error while creating MySQL connection pool (retrying every {POOL_RETRY_DELAY:g}s): {e}")
+                _pool_failing = True
+        return _pool
+
+@contextmanager
+def _borrow(pool):
+    start = time.perf_counter()
+    with _pool_slots:
+        connection = pool.get_connection()
+        metrics.DB_POOL_WAIT_SECONDS.observe(time.perf_counter() - start)
+        metrics.DB_POOL_IN_USE.inc()
+        _borrowed.count = getattr(_borrowed, "count", 0) + 1
+        try:
+            yield MeteredConnection(connection)
+        finally:
+            _borrowed.count -= 1
+            metrics.DB_POOL_IN_USE.dec()
+            connection.close()  # returns the connection to the pool
+
+@contextmanager
+def pooled_connection():
+    """ Borrow a connection for one unit of work (e.g. one API request).
+
+    On MySQL this is a pooled connection, waiting for a free one if all are in use.
+    On SQLite all borrowers share one connection and take turns, since SQLite only
+    allows a single writer anyway.
+    """
+    global _shared_sqlite
+    if using_sqlite():
+        with _pool_lock:
+            if _shared_sqlite is None:
+                _shared_sqlite = create_connection()
+        with _shared_sqlite._lock:
+            yield _shared_sqlite
+        return
+
+    pool = get_pool()
+    if pool is None:
+        raise Error("No database connection pool available")
+    with _borrow(pool) as connection:
+        yield connection
+
+def _fetch_pooled(pool, query, params):
+    with _borrow(pool) as connection:
+        cursor = connection.cursor()
+        try:
+            cursor.execute(query, params or ())
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+def fetch_parallel(connection, queries):
+    """ Run independent read queries concurrently and wait for all of them.
+
+    `queries` maps a name to a (sql, params) pair; the result maps the same names
+    to the fetched rows. Each query runs on its own pooled connection, so a page
+    waits roughly as long as its slowest query. Falls back to running the queries
+    one after another on `connection` when no pool is available.
+
+    A caller that already borrowed a pooled connection (inside pooled_connection(),
+    e.g. an API request) gets the sequential path on that connection too: waiting
+    for more slots while holding one deadlocks once every slot is held that way.
+    """
+    pool = get_pool() if len(queries) > 1 and not getattr(_borrowed, "count", 0) else None
+    if pool is None:
+        results = {}
+        cursor = connection.cursor()
+        try:
+            for name, (query, params) in queries.items():
+                cursor.execute(query, params or ())
+                results[name] = cursor.fetchall()
+        finally:
+            cursor.close()
+        return results
+
+    futures = {
+        name: _executor.submit(_fetch_pooled, pool, query, params)
+        for name, (query, params) in queries.items()
+    }
+    return {name: future.result() for name, future in futures.items()}
@@ -0,0 +1,340 @@
+# facets.py — faceted product browse: filters, facet counts and keyset pages in memory
+#
+# Filtering the whole catalog by brand, category, price band and availability would
+# mean aggregating all of Inventory on every click. Instead every product with at
+# least one listing is one row of a few NumPy arrays (its facet codes and cheapest
+# offer), and the facet counts live in a small dense cube
+#     counts[category, brand, price band, availability]
+# so the counts for any combination of filters are sums over cube slices, whatever
+# the catalog size. Results sit in sorted key arrays (by price, by newest) and are
+# paged with keyset cursors: a page starts right after the last key of the previous one.
+#
+# The index is built from one Inventory scan and then maintained incrementally.
+# Writers already call services.invalidate_offers(product_ids); shared_cache passes
+# that on to every worker process, and the next search re-reads only those products'
+# listings and moves them to their new cube cells and sorted positions.
+import os
+import threading
+import time
+
+import numpy as np
+
+import shared_cache
+
+# Upper edges of the price bands; the last band is open-ended
+PRICE_EDGES = (100, 150, 200, 300, 500)
+AVAILABILITY = ("in_stock", "sold_out")
+AVAILABILITY_LABELS = ("In stock", "Sold out")
+SORTS = ("price", "newest")
+PAGE_SIZE = 24
+NO_BRAND = "(no brand)"
+# Rebuilt from scratch this often anyway, in case an invalidation was ever missed
+REBUILD_AFTER = float(os.environ.get("HYPECULTURE_FACETS_REBUILD", "900"))
+# Product ids per incremental refresh query
+REFRESH_CHUNK = 500
+
+# One row per product that has listings: its cheapest in-stock price, its cheapest
+# price overall (shown while sold out) and how many listings have stock
+FACET_ROWS_SQL = """
+    SELECT p.product_id, p.product_name, p.brand, p.category_id,
+           MIN(CASE WHEN i.stock_quantity > 0 THEN i.price END), MIN(i.price),
+           SUM(CASE WHEN i.stock_quantity > 0 THEN 1 ELSE 0 END)
+    FROM Products p JOIN Inventory i ON i.product_id = p.product_id
+    {where}
+    GROUP BY p.product_id, p.product_name, p.brand, p.category_id
+"""
+CATEGORIES_SQL = "SELECT category_id, category_name FROM Categories"
+
+ITEM_COLUMNS = ("product_id", "product_name", "brand", "category_id", "price", "offers")
+
+def price_band_labels():
+    edges = (0, *PRICE_EDGES)
+    labels = [f"Under ${PRICE_EDGES[0]}"]
+    labels += [f"${lo}–{hi}" for lo, hi in zip(edges[1:], edges[2:])]
+    return labels + [f"${PRICE_EDGES[-1]}+"]
+
+def _price_key(price, product_id):
+    """Sortable int64 of (price, product_id): whole cents in the high bits."""
+    cents = np.minimum(np.round(np.asarray(price) * 100), 0x7FFFFFFF).astype(np.int64)
+    return (cents << 32) | np.asarray(product_id, dtype=np.int64)
+
+def _fetchall(connection, query, params=()):
+    c = connection.cursor()
+    try:
+        c.execute(query, params)
+        return c.fetchall()
+    finally:
+        c.close()
+
+class FacetIndex:
+    """In-memory faceted browse over Products x Inventory; safe to share between threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()  # guards the arrays below
+        self._sync_lock = threading.Lock()  # one database refresh at a time
+        self._pending_lock = threading.Lock()  # guards _dirty/_stale, set by listeners
+        self._dirty = set()
+        self._stale = True
+        self._built_at = 0.0
+        self._reset()
+
+    def _reset(self):
+        self._row_of = {}  # product_id -> row in the arrays
+        self._n = 0
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._cat = np.zeros(0, dtype=np.int32)
+        self._brand = np.zeros(0, dtype=np.int32)
+        self._band = np.zeros(0, dtype=np.int8)
+        self._avail = np.zeros(0, dtype=np.int8)
+        self._price = np.zeros(0, dtype=np.float64)
+        self._offers = np.zeros(0, dtype=np.int32)
+        self._live = np.zeros(0, dtype=bool)
+        self._names = []
+        self._categories = []  # code -> (category_id, category_name)
+        self._category_code = {}
+        self._brands = []  # code -> brand (None for products without one)
+        self._brand_code = {}
+        self._cube = np.zeros((0, 0, len(PRICE_EDGES) + 1, len(AVAILABILITY)), dtype=np.int64)
+        # Live rows in result order, as parallel (sorted key, row) arrays
+        self._price_keys = np.zeros(0, dtype=np.int64)
+        self._price_rows = np.zeros(0, dtype=np.int64)
+        self._id_keys = np.zeros(0, dtype=np.int64)
+        self._id_rows = np.zeros(0, dtype=np.int64)
+
+    # ---------- keeping up with the database ----------
+    def note_invalidation(self, keys, prefixes):
+        """shared_cache listener: remember which products' offers changed."""
+        changed = {int(k[7:]) for k in keys if k.startswith("offers/") and k[7:].isdigit()}
+        everything = any("offers/".startswith(p) or p.startswith("offers/") for p in prefixes)
+        with self._pending_lock:
+            self._dirty.update(changed)
+            self._stale = self._stale or everything
+
+    def sync(self, connection):
+        """Rebuild, or re-read just the products whose offers changed since the last sync."""
+        with self._sync_lock:
+            with self._pending_lock:
+                rebuild = self._stale or time.monotonic() - self._built_at >= REBUILD_AFTER
+                dirty, self._dirty = self._dirty, set()
+                self._stale = False
+            try:
+                if rebuild:
+                    self._rebuild(connection)
+                elif dirty:
+                    self._refresh(connection, sorted(dirty))
+            except Exception:
+                with self._pending_lock:
+                    self._dirty.update(dirty)
+                    self._stale = self._stale or rebuild
+                raise
+
+    def _rebuild(self, connection):
+        categories = _fetchall(connection, CATEGORIES_SQL)
+        rows = _fetchall(connection, FACET_ROWS_SQL.format(where=""))
+        with self._lock:
+            self._reset()
+            self._add_categories(categories)
+            self._apply(rows, [int(r[0]) for r in rows])
+            self._built_at = time.monotonic()
+
+    def _refresh(self, connection, product_ids):
+        rows = []
+        for start in range(0, len(product_ids), REFRESH_CHUNK):
+            chunk = product_ids[start:start + REFRESH_CHUNK]
+            marks = ", ".join(["%s"] * len(chunk))
+            rows += _fetchall(connection, FACET_ROWS_SQL.format(where=f"WHERE p.product_id IN ({marks})"), chunk)
+        categories = None
+        if any(int(r[3]) not in self._category_code for r in rows if r[3] is not None):
+            categories = _fetchall(connection, CATEGORIES_SQL)
+        with self._lock:
+            if categories:
+                self._add_categories(categories)
+            self._apply(rows, product_ids)
+
+    # ---------- incremental maintenance (callers hold self._lock) ----------
+    def _add_categories(self, categories):
+        new = [(int(cid), name) for cid, name in categories if int(cid) not in self._category_code]
+        for cid, name in new:
+            self._category_code[cid] = len(self._categories)
+            self._categories.append((cid, name))
+        if new:
+            self._cube = np.pad(self._cube, ((0, len(new)), (0, 0), (0, 0), (0, 0)))
+
+    def _code_for_brand(self, brand):
+        code = self._brand_code.get(brand)
+        if code is None:
+            code = self._brand_code[brand] = len(self._brands)
+            self._brands.append(brand)
+            self._cube = np.pad(self._cube, ((0, 0), (0, 1), (0, 0), (0, 0)))
+        return code
+
+    def _new_row(self, product_id):
+        row = self._n
+        if row == len(self._ids):
+            size = max(1024, 2 * row)
+            for name in ("_ids", "_cat", "_brand", "_band", "_avail", "_price", "_offers", "_live"):
+                grown = np.zeros(size, dtype=getattr(self, name).dtype)
+                grown[:row] = getattr(self, name)
+                setattr(self, name, grown)
+        self._n += 1
+        self._row_of[product_id] = row
+        self._ids[row] = product_id
+        self._names.append(None)
+        return row
+
+    def _apply(self, rows, product_ids):
+        """Set `product_ids` to their current `rows` (a product with no row has no listings)."""
+        rows_by_id = {int(r[0]): r for r in rows}
+        old = [self._row_of[pid] for pid in product_ids if pid in self._row_of]
+        old = np.array([r for r in old if self._live[r]], dtype=np.int64)
+        if len(old):
+            np.subtract.at(self._cube, (self._cat[old], self._brand[old], self._band[old], self._avail[old]), 1)
+            self._live[old] = False
+            self._price_keys, self._price_rows = _remove_sorted(
+                self._price_keys, self._price_rows, _price_key(self._price[old], self._ids[old]))
+            self._id_keys, self._id_rows = _remove_sorted(self._id_keys, self._id_rows, self._ids[old])
+
+        new = []
+        for pid, name, brand, category_id, in_stock_price, any_price, offers in rows_by_id.values():
+            if category_id is None or int(category_id) not in self._category_code:
+                continue  # an uncategorized product can't be browsed by facet
+            row = self._row_of.get(int(pid))
+            if row is None:
+                row = self._new_row(int(pid))
+            in_stock = int(offers or 0) > 0
+            price = float(in_stock_price if in_stock else any_price)
+            self._names[row] = name
+            self._cat[row] = self._category_code[int(category_id)]
+            self._brand[row] = self._code_for_brand(brand or None)
+            self._band[row] = np.searchsorted(PRICE_EDGES, price, side="right")
+            self._avail[row] = 0 if in_stock else 1
+            self._price[row] = price
+            self._offers[row] = int(offers or 0)
+            new.append(row)
+        new = np.array(new, dtype=np.int64)
+        if len(new):
+            np.add.at(self._cube, (self._cat[new], self._brand[new], self._band[new], self._avail[new]), 1)
+            self._live[new] = True
+            self._price_keys, self._price_rows = _insert_sorted(
+                self._price_keys, self._price_rows, _price_key(self._price[new], self._ids[new]), new)
+            self._id_keys, self._id_rows = _insert_sorted(self._id_keys, self._id_rows, self._ids[new], new)
+
+    # ---------- searching ----------
+    def search(self, connection, category_ids=(), brands=(), price_bands=(), availability=(),
+               sort="price", after=None, limit=PAGE_SIZE):
+        """One page of products matching every given filter, plus the facet counts.
+
+        Within a facet the values are alternatives (brand A or B); across facets all
+        must hold. Each facet's counts apply the other facets' filters but not its own,
+        so they say how many products picking that value would add. `after` is the
+        "next" cursor of the previous page. Returns a dict with "items" (tuples of
+        ITEM_COLUMNS), "total", "next" (None on the last page) and "facets"
+        ({name: [(value, label, count)]} for category, brand, price and availability).
+        """
+        self.sync(connection)
+        with self._lock:
+            allowed = self._allowed(category_ids, brands, price_bands, availability)
+            facets, total = self._facet_counts(allowed)
+            items, next_cursor = self._page(allowed, sort, after, limit)
+        return {"items": items, "total": total, "next": next_cursor, "facets": facets}
+
+    def _allowed(self, category_ids, brands, price_bands, availability):
+        """Per axis of the cube, a boolean mask of the selected values (None: no filter)."""
+        def mask(size, codes, selected):
+            if not selected:
+                return None
+            allowed = np.zeros(size, dtype=bool)
+            for value in selected:
+                code = codes(value)
+                if code is not None and 0 <= code < size:
+                    allowed[code] = True
+            return allowed
+
+        return (
+            mask(len(self._categories), lambda v: self._category_code.get(int(v)), category_ids),
+            mask(len(self._brands), lambda v: self._brand_code.get(None if v == NO_BRAND else v), brands),
+            mask(len(PRICE_EDGES) + 1, int, price_bands),
+            mask(len(AVAILABILITY), lambda v: AVAILABILITY.index(v) if v in AVAILABILITY else None, availability),
+        )
+
+    def _facet_counts(self, allowed):
+        def counts(axis):
+            sub = self._cube
+            for other, mask in enumerate(allowed):
+                if other != axis and mask is not None:
+                    sub = np.compress(mask, sub, axis=other)
+            return sub.sum(axis=tuple(a for a in range(4) if a != axis)).tolist()
+
+        by_category, by_brand, by_band, by_avail = (counts(axis) for axis in range(4))
+        total = sum(n for code, n in enumerate(by_category) if allowed[0] is None or allowed[0][code])
+        # Brands by name, products without one last
+        brands = sorted(range(len(self._brands)),
+                        key=lambda code: (self._brands[code] is None, (self._brands[code] or "").lower()))
+        facets = {
+            "category": sorted(((cid, name, by_category[code]) for code, (cid, name) in enumerate(self._categories)),
+                               key=lambda f: f[1].lower()),
+            "brand": [(self._brands[code] or NO_BRAND, self._brands[code] or NO_BRAND, by_brand[code])
+                      for code in brands],
+            "price": [(band, label, by_band[band]) for band, label in enumerate(price_band_labels())],
+            "availability": [(value, label, by_avail[code])
+                             for code, (value, label) in enumerate(zip(AVAILABILITY, AVAILABILITY_LABELS))],
+        }
+        return facets, int(total)
+
+    def _page(self, allowed, sort, after, limit):
+        """Up to `limit` matching items after the cursor, and the cursor after them."""
+        if sort == "price":
+            keys, rows = self._price_keys, self._price_rows
+            start = 0 if after is None else int(np.searchsorted(keys, int(after), side="right"))
+            step = 1
+        else:  # newest first: walk the ascending product ids backwards
+            keys, rows = self._id_keys, self._id_rows
+            start = len(keys) - 1 if after is None else int(np.searchsorted(keys, int(after), side="left")) - 1
+            step = -1
+
+        picked = []
+        chunk = max(4 * limit, 256)
+        while len(picked) <= limit and 0 <= start < len(keys):
+            stop = start + step * chunk
+            idx = np.arange(start, min(stop, len(keys)) if step > 0 else max(stop, -1), step)
+            candidates = rows[idx]
+            ok = np.ones(len(idx), dtype=bool)
+            for mask, codes in zip(allowed, (self._cat, self._brand, self._band, self._avail)):
+                if mask is not None:
+                    ok &= mask[codes[candidates]]
+            picked.extend(idx[ok][:limit + 1 - len(picked)].tolist())
+            start = stop
+            chunk *= 2
+
+        more = len(picked) > limit
+        picked = picked[:limit]
+        items = []
+        for i in picked:
+            row = rows[i]
+            category_id = self._categories[self._cat[row]][0]
+            items.append((int(self._ids[row]), self._names[row], self._brands[self._brand[row]],
+                          category_id, round(float(self._price[row]), 2), int(self._offers[row])))
+        next_cursor = int(keys[picked[-1]]) if more else None
+        return items, next_cursor
+
+def _remove_sorted(keys, rows, doomed):
+    positions = np.searchsorted(keys, np.sort(doomed))
+    return np.delete(keys, positions), np.delete(rows, positions)
+
+def _insert_sorted(keys, rows, new_keys, new_rows):
+    order = np.argsort(new_keys, kind="stable")
+    new_keys, new_rows = new_keys[order], new_rows[order]
+    positions = np.searchsorted(keys, new_keys)
+    return np.insert(keys, positions, new_keys), np.insert(rows, positions, new_rows)
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_index():
+    """The process-wide index, kept current by the shared cache's invalidations."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = FacetIndex()
+            shared_cache.add_invalidation_listener(_index.note_invalidation)
+        return _index
@@ -51,33 +51,82 @@ CREATE TABLE Addresses (
     city VARCHAR(100) NOT NULL,
     state VARCHAR(100) NOT NULL,
     postal_code VARCHAR(20) NOT NULL,
-    FOREIGN KEY (user_id) REFERENCES Users(user_id)
+    -- SHA-256 of the normalized address (services.address_hash), so checkout can
+    -- reuse a customer's existing row instead of inserting one per order
+    address_hash CHAR(64),
+    FOREIGN KEY (user_id) REFERENCES Users(user_id),
+    KEY idx_addresses_hash (user_id, address_hash)
 );
 
 -- Orders Table: Stores overall order information
+-- Range-partitioned by month of order_date so history queries only touch recent
+-- partitions. MySQL requires the partition column in every unique key and does not
+-- allow foreign keys on partitioned tables, hence the composite keys and no FKs here.
+-- order_archive.py adds upcoming month partitions and moves old orders to the archive.
 CREATE TABLE Orders (
-    order_id INT AUTO_INCREMENT PRIMARY KEY,
+    order_id INT AUTO_INCREMENT,
     customer_id INT,
     address_id INT,
-    order_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    order_date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     total_amount DECIMAL(10, 2),
     order_status VARCHAR(20) DEFAULT 'Placed',
-    FOREIGN KEY (customer_id) REFERENCES Users(user_id),
-    FOREIGN KEY (address_id) REFERENCES Addresses(address_id)
+    PRIMARY KEY (order_id, order_date),
+    KEY idx_orders_customer (customer_id, order_date)
+)
+PARTITION BY RANGE (UNIX_TIMESTAMP(order_date)) (
+    PARTITION p_hist VALUES LESS THAN (UNIX_TIMESTAMP('2026-10-01 00:00:00')),
+    PARTITION p202610 VALUES LESS THAN (UNIX_TIMESTAMP('2026-11-01 00:00:00')),
+    PARTITION p202611 VALUES LESS THAN (UNIX_TIMESTAMP('2026-12-01 00:00:00')),
+    PARTITION p202612 VALUES LESS THAN (UNIX_TIMESTAMP('2027-01-01 00:00:00')),
+    PARTITION pmax VALUES LESS THAN MAXVALUE
 );
 
 -- OrderItems Table: A junction table for items within an order
+-- Carries its order's order_date so it can be partitioned the same way as Orders.
 CREATE TABLE OrderItems (
-    order_item_id INT AUTO_INCREMENT PRIMARY KEY,
-    order_id INT,
+    order_item_id INT AUTO_INCREMENT,
+    order_id INT NOT NULL,
+    order_date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    inventory_id INT,
+    quantity INT NOT NULL,
+    price_per_unit DECIMAL(10, 2) NOT NULL,
+    PRIMARY KEY (order_item_id, order_date),
+    KEY idx_order_items_order (order_id),
+    KEY idx_order_items_inventory (inventory_id)
+)
+PARTITION BY RANGE (UNIX_TIMESTAMP(order_date)) (
+    PARTITION p_hist VALUES LESS THAN (UNIX_TIMESTAMP('2026-10-01 00:00:00')),
+    PARTITION p202610 VALUES LESS THAN (UNIX_TIMESTAMP('2026-11-01 00:00:00')),
+    PARTITION p202611 VALUES LESS THAN (UNIX_TIMESTAMP('2026-12-01 00:00:00')),
+    PARTITION p202612 VALUES LESS THAN (UNIX_TIMESTAMP('2027-01-01 00:00:00')),
+    PARTITION pmax VALUES LESS THAN MAXVALUE
+);
+
+-- Archive tier: orders older than the archive horizon, moved here by order_archive.py
+CREATE TABLE OrdersArchive (
+    order_id INT PRIMARY KEY,
+    customer_id INT,
+    address_id INT,
+    order_date TIMESTAMP NOT NULL,
+    total_amount DECIMAL(10, 2),
+    order_status VARCHAR(20),
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    KEY idx_orders_archive_customer (customer_id, order_date)
+);
+
+CREATE TABLE OrderItemsArchive (
+    order_item_id INT PRIMARY KEY,
+    order_id INT NOT NULL,
+    order_date TIMESTAMP NOT NULL,
     inventory_id INT,
     quantity INT NOT NULL,
     price_per_unit DECIMAL(10, 2) NOT NULL,
-    FOREIGN KEY (order_id) REFERENCES Orders(order_id),
-    FOREIGN KEY (inventory_id) REFERENCES Inventory(inventory_id)
+    KEY idx_order_items_archive_order (order_id)
 );
 
 -- Cart Table: To hold items before checkout
+-- added_date is bumped whenever the line's quantity changes; maintenance.py purges
+-- carts whose newest line is older than the abandonment TTL.
 CREATE TABLE Cart (
     cart_id INT AUTO_INCREMENT PRIMARY KEY,
     customer_id INT,
@@ -85,7 +134,9 @@ CREATE TABLE Cart (
     quantity INT NOT NULL,
     added_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (customer_id) REFERENCES Users(user_id),
-    FOREIGN KEY (inventory_id) REFERENCES Inventory(inventory_id)
+    FOREIGN KEY (inventory_id) REFERENCES Inventory(inventory_id),
+    KEY idx_cart_customer (customer_id, added_date),
+    KEY idx_cart_added (added_date)
 );
 
 -- ---------------------------------
@@ -137,9 +188,10 @@ BEGIN
     WHERE customer_id = p_customer_id AND inventory_id = p_inventory_id;
 
     IF existing_quantity > 0 THEN
-        -- Update quantity if item is already in cart
+        -- Update quantity if item is already in cart; touching a line keeps the cart
+        -- from being purged as abandoned (see maintenance.py)
         UPDATE Cart
-        SET quantity = quantity + p_quantity
+        SET quantity = quantity + p_quantity, added_date = NOW()
         WHERE customer_id = p_customer_id AND inventory_id = p_inventory_id;
     ELSE
         -- Insert new item into cart
@@ -163,7 +215,9 @@ CREATE PROCEDURE PlaceOrder(
 )
 BEGIN
     DECLARE v_address_id INT;
+    DECLARE v_address_hash CHAR(64);
     DECLARE v_order_id INT;
+    DECLARE v_order_date TIMESTAMP DEFAULT NOW();
     DECLARE v_total_amount DECIMAL(10, 2) DEFAULT 0;
     DECLARE finished INTEGER DEFAULT 0;
     DECLARE v_inventory_id INT;
@@ -179,10 +233,20 @@ BEGIN
         
     DECLARE CONTINUE HANDLER FOR NOT FOUND SET finished = 1;
 
-    -- Add or get address
-    INSERT INTO Addresses(user_id, address_line1, city, state, postal_code)
-    VALUES(p_customer_id, p_address_line1, p_city, p_state, p_postal_code);
-    SET v_address_id = LAST_INSERT_ID();
+    -- Add or get address (same normalization and hash as services.address_hash)
+    SET v_address_hash = SHA2(CONCAT_WS(CHAR(31),
+        TRIM(REGEXP_REPLACE(LOWER(p_address_line1), '[[:space:]]+', ' ')),
+        TRIM(REGEXP_REPLACE(LOWER(p_city), '[[:space:]]+', ' ')),
+        TRIM(REGEXP_REPLACE(LOWER(p_state), '[[:space:]]+', ' ')),
+        TRIM(REGEXP_REPLACE(LOWER(p_postal_code), '[[:space:]]+', ' '))), 256);
+    SELECT MIN(address_id) INTO v_address_id
+    FROM Addresses
+    WHERE user_id = p_customer_id AND address_hash = v_address_hash;
+    IF v_address_id IS NULL THEN
+        INSERT INTO Addresses(user_id, address_line1, city, state, postal_code, address_hash)
+        VALUES(p_customer_id, p_address_line1, p_city, p_state, p_postal_code, v_address_hash);
+        SET v_address_id = LAST_INSERT_ID();
+    END IF;
     
     -- Update user's name if it's different (optional)
     UPDATE Users SET first_name = p_first_name, last_name = p_last_name WHERE user_id = p_customer_id;
@@ -194,8 +258,8 @@ BEGIN
     WHERE c.customer_id = p_customer_id;
 
     -- Create a new order
-    INSERT INTO Orders (customer_id, address_id, total_amount)
-    VALUES (p_customer_id, v_address_id, v_total_amount);
+    INSERT INTO Orders (customer_id, address_id, order_date, total_amount)
+    VALUES (p_customer_id, v_address_id, v_order_date, v_total_amount);
     SET v_order_id = LAST_INSERT_ID();
 
     -- Open the cursor to move cart items to order items
@@ -208,8 +272,8 @@ BEGIN
         END IF;
 
         -- Insert into OrderItems
-        INSERT INTO OrderItems (order_id, inventory_id, quantity, price_per_unit)
-        VALUES (v_order_id, v_inventory_id, v_quantity, v_price_per_unit);
+        INSERT INTO OrderItems (order_id, order_date, inventory_id, quantity, price_per_unit)
+        VALUES (v_order_id, v_order_date, v_inventory_id, v_quantity, v_price_per_unit);
     END LOOP get_cart_item;
     
     CLOSE cart_cursor;
@@ -0,0 +1,172 @@
+# launch_workers.py — run HYPECULTURE as several worker processes on one machine
+#
+#     python launch_workers.py --workers 4                     # http://localhost:8501
+#     python launch_workers.py --workers 4 --api-workers 4     # + JSON API on :8000
+#     python launch_workers.py --workers 0 --api-workers 4     # JSON API only
+#     HYPECULTURE_DB=sqlite:/tmp/hype.db python launch_workers.py --workers 2
+#
+# Starts the shared cache server (shared_cache.py), N Streamlit workers on ports
+# --base-port.. and a small TCP balancer on --port that hands each new connection to
+# the next live worker. A Streamlit session lives on one websocket, so per-connection
+# round robin keeps every session on one worker. All workers share catalog/offer data
+# and invalidations through the cache server. Its socket goes in a fresh private
+# directory (under $XDG_RUNTIME_DIR when set) and every run gets a new random
+# HYPECULTURE_CACHE_KEY, passed to the server and workers through the environment.
+# Ctrl+C stops everything.
+#
+# Behind a real load balancer, start with --no-balancer and point it at the workers.
+#
+# Metrics are per process: every worker labels its series worker="streamlit-<i>" or
+# "api-<pid>", gets its own --metrics-base-port + i, and with HYPECULTURE_METRICS_FILE
+# set writes its own <file>-<worker>.prom next to it.
+import argparse
+import asyncio
+import itertools
+import os
+import secrets
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Run several HYPECULTURE worker processes.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Streamlit worker processes")
+    parser.add_argument("--port", type=int, default=8501, help="port of the built-in balancer")
+    parser.add_argument("--base-port", type=int, default=8601, help="first worker port")
+    parser.add_argument("--host", default="127.0.0.1", help="address the balancer listens on")
+    parser.add_argument("--no-balancer", action="store_true", help="only start the workers")
+    parser.add_argument("--api-workers", type=int, default=0, help="also run the JSON API with this many workers")
+    parser.add_argument("--api-port", type=int, default=8000)
+    parser.add_argument("--socket", default=None,
+                        help="shared cache socket, in a directory with mode 0700 (default: a fresh private one)")
+    parser.add_argument("--metrics-base-port", type=int, default=None,
+                        help="give worker i a metrics endpoint on this port + i")
+    return parser.parse_args()
+
+def _worker_env(args, worker, index=None, cookie_secret=None):
+    env = dict(os.environ, HYPECULTURE_CACHE=f"unix:{args.socket}", HYPECULTURE_CACHE_KEY=args.cache_key,
+               HYPECULTURE_METRICS_WORKER=worker)
+    if cookie_secret:
+        env["STREAMLIT_SERVER_COOKIE_SECRET"] = cookie_secret
+    if args.metrics_base_port is not None and index is not None:
+        env["HYPECULTURE_METRICS_PORT"] = str(args.metrics_base_port + index)
+    else:
+        env.pop("HYPECULTURE_METRICS_PORT", None)  # one port can't be shared
+    if os.environ.get("HYPECULTURE_METRICS_FILE"):
+        # Nor can one file: the workers would overwrite each other's
+        root, ext = os.path.splitext(os.environ["HYPECULTURE_METRICS_FILE"])
+        env["HYPECULTURE_METRICS_FILE"] = f"{root}-{worker}{ext}"
+    return env
+
+def start_processes(args):
+    procs = [subprocess.Popen([sys.executable, os.path.join(ROOT, "shared_cache.py"), "--socket", args.socket],
+                              env=_worker_env(args, "cache"))]
+    # Wait for the socket so workers don't start with a cold, unreachable tier
+    deadline = time.monotonic() + 10
+    while not os.path.exists(args.socket) and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    # Same cookie secret everywhere, so a browser may hit any worker
+    cookie_secret = secrets.token_hex(16)
+    for i in range(args.workers):
+        procs.append(subprocess.Popen(
+            [sys.executable, "-m", "streamlit", "run", os.path.join(ROOT, "app.py"),
+             "--server.port", str(args.base_port + i), "--server.address", "127.0.0.1",
+             "--server.headless", "true"],
+            env=_worker_env(args, f"streamlit-{i}", i, cookie_secret), cwd=ROOT,
+        ))
+    if args.api_workers:
+        procs.append(subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "api:app", "--host", args.host, "--port", str(args.api_port),
+             "--workers", str(args.api_workers)],
+            env=_worker_env(args, "api-{pid}"), cwd=ROOT,  # uvicorn's workers share one environment
+        ))
+    return procs
+
+# ---------- balancer ----------
+async def _pipe(reader, writer):
+    try:
+        while data := await reader.read(65536):
+            writer.write(data)
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+def balancer(backends):
+    """Connection handler proxying each client to the next worker that accepts it."""
+    rotation = itertools.cycle(backends)
+
+    async def handle(client_reader, client_writer):
+        for _ in range(len(backends)):
+            host, port = next(rotation)
+            try:
+                upstream_reader, upstream_writer = await asyncio.open_connection(host, port)
+                break
+            except OSError:
+                continue  # worker down or still starting; try the next one
+        else:
+            client_writer.close()
+            return
+        await asyncio.gather(_pipe(client_reader, upstream_writer), _pipe(upstream_reader, client_writer))
+
+    return handle
+
+async def _serve_balancer(args):
+    backends = [("127.0.0.1", args.base_port + i) for i in range(args.workers)]
+    server = await asyncio.start_server(balancer(backends), args.host, args.port)
+    print(f"balancing http://{args.host}:{args.port} over {len(backends)} workers "
+          f"(ports {args.base_port}-{args.base_port + args.workers - 1})")
+    async with server:
+        await server.serve_forever()
+
+def main():
+    args = _parse_args()
+    backend = os.environ.get("HYPECULTURE_DB", "mysql")
+    if backend == "sqlite" or backend == "sqlite::memory:":
+        raise SystemExit("An in-memory SQLite database can't be shared by workers; "
+                         "use HYPECULTURE_DB=sqlite:<file> or MySQL.")
+
+    # Anyone who can reach the socket with the key can make every worker unpickle
+    # what they send, so both stay private to this run
+    args.cache_key = secrets.token_hex(32)
+    runtime_dir = None
+    if args.socket is None:
+        runtime_dir = tempfile.mkdtemp(prefix="hypeculture-", dir=os.environ.get("XDG_RUNTIME_DIR"))
+        args.socket = os.path.join(runtime_dir, "cache.sock")
+
+    procs = start_processes(args)
+
+    def stop(*_):
+        for p in procs:
+            if p.poll() is None:
+                p.terminate()
+        for p in procs:
+            try:
+                p.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                p.kill()
+        if runtime_dir:
+            shutil.rmtree(runtime_dir, ignore_errors=True)
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        if args.no_balancer or not args.workers:
+            while all(p.poll() is None for p in procs):
+                time.sleep(1)
+            print("a worker process exited; stopping")
+        else:
+            asyncio.run(_serve_balancer(args))
+    except KeyboardInterrupt:
+        pass
+    stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+# maintenance.py — purge abandoned carts, merge duplicate addresses, drop orphaned ones
+#
+# Meant to run on a schedule (e.g. nightly from cron), like order_archive.py:
+#     python maintenance.py --cart-ttl-days 30 --batch-size 500
+#
+# Every step works in small batches, each in its own short transaction, so locks are
+# held briefly and the job can be interrupted and re-run at any point. It prints the
+# rows reclaimed and the row counts / on-disk sizes of the tables before and after.
+# Databases created before address hashing need maintenance.sql applied first.
+import argparse
+from datetime import datetime, timedelta
+
+from db_connector import create_connection, now_sql, using_sqlite
+from services import address_hash
+
+DEFAULT_CART_TTL_DAYS = 30
+DEFAULT_BATCH_SIZE = 500
+
+REPORTED_TABLES = ("Cart", "Addresses")
+
+def _marks(values):
+    return ", ".join(["%s"] * len(values))
+
+def purge_abandoned_carts(connection, ttl_days=DEFAULT_CART_TTL_DAYS, batch_size=DEFAULT_BATCH_SIZE):
+    """Delete the carts of customers who haven't touched any cart line for `ttl_days`.
+
+    A cart counts as active while its newest line is younger than the TTL (changing a
+    line's quantity bumps its added_date), so one recent addition keeps the whole
+    cart. Deletes `batch_size` lines per transaction, oldest first. Returns the
+    number of cart lines deleted.
+    """
+    deleted = 0
+    last_key = (datetime.min, 0)
+    c = connection.cursor()
+    try:
+        # added_date is stamped by the database, so the cutoff comes from its clock too
+        c.execute(f"SELECT {now_sql()}")
+        now = c.fetchone()[0]
+        cutoff = (datetime.fromisoformat(now) if isinstance(now, str) else now) - timedelta(days=ttl_days)
+        while True:
+            # Walks idx_cart_added from the oldest line, so only lines past the TTL are read
+            c.execute(
+                """
+                SELECT c.added_date, c.cart_id FROM Cart c
+                WHERE c.added_date < %s AND (c.added_date, c.cart_id) > (%s, %s)
+                  AND NOT EXISTS (SELECT 1 FROM Cart r WHERE r.customer_id = c.customer_id AND r.added_date >= %s)
+                ORDER BY c.added_date, c.cart_id LIMIT %s
+                """,
+                (cutoff, *last_key, cutoff, int(batch_size)),
+            )
+            rows = c.fetchall()
+            if not rows:
+                break
+            last_key = tuple(rows[-1])
+            cart_ids = [int(cart_id) for _, cart_id in rows]
+            try:
+                # Re-check the whole cart, so a line added or updated since the SELECT
+                # keeps all of its customer's lines. MySQL can't read the table it
+                # deletes from in a subquery, hence the (materialized) derived table.
+                c.execute(
+                    f"""
+                    DELETE FROM Cart WHERE cart_id IN ({_marks(cart_ids)}) AND added_date < %s
+                      AND NOT EXISTS (
+                          SELECT 1 FROM (SELECT DISTINCT customer_id FROM Cart WHERE added_date >= %s) active
+                          WHERE active.customer_id = Cart.customer_id)
+                    """,
+                    (*cart_ids, cutoff, cutoff),
+                )
+                deleted += c.rowcount
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+    finally:
+        c.close()
+    return deleted
+
+def hash_addresses(connection, batch_size=DEFAULT_BATCH_SIZE):
+    """Fill in address_hash for rows written before checkout started hashing them.
+
+    Returns the number of rows hashed.
+    """
+    hashed = 0
+    last_id = 0
+    c = connection.cursor()
+    try:
+        while True:
+            c.execute(
+                """
+                SELECT address_id, address_line1, city, state, postal_code FROM Addresses
+                WHERE address_id > %s AND address_hash IS NULL
+                ORDER BY address_id LIMIT %s
+                """,
+                (last_id, int(batch_size)),
+            )
+            rows = c.fetchall()
+            if not rows:
+                break
+            last_id = int(rows[-1][0])
+            try:
+                c.executemany(
+                    "UPDATE Addresses SET address_hash = %s WHERE address_id = %s",
+                    [(address_hash(*fields), address_id) for address_id, *fields in rows],
+                )
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+            hashed += len(rows)
+    finally:
+        c.close()
+    return hashed
+
+def merge_duplicate_addresses(connection, batch_size=DEFAULT_BATCH_SIZE):
+    """Point every order at the oldest of its customer's identical addresses.
+
+    Duplicates are rows with the same (user_id, address_hash); checkout reuses the
+    lowest address_id, so that one is kept. The other rows are left unreferenced for
+    purge_orphaned_addresses(). Handles `batch_size` duplicate groups per transaction.
+    Returns (groups_merged, orders_repointed).
+    """
+    groups_merged = orders_repointed = 0
+    last_key = (0, "")
+    c = connection.cursor()
+    try:
+        while True:
+            c.execute(
+                """
+                SELECT user_id, address_hash FROM Addresses
+                WHERE (user_id, address_hash) > (%s, %s)
+                GROUP BY user_id, address_hash HAVING COUNT(*) > 1
+                ORDER BY user_id, address_hash LIMIT %s
+                """,
+                (*last_key, int(batch_size)),
+            )
+            groups = c.fetchall()
+            if not groups:
+                break
+            last_key = tuple(groups[-1])
+            try:
+                for user_id, digest in groups:
+                    c.execute(
+                        "SELECT address_id FROM Addresses WHERE user_id = %s AND address_hash = %s ORDER BY address_id",
+                        (user_id, digest),
+                    )
+                    keeper, *duplicates = [int(r[0]) for r in c.fetchall()]
+                    if not duplicates:
+                        continue
+                    # Orders carry the customer, so both updates stay on idx_*_customer
+                    for table in ("Orders", "OrdersArchive"):
+                        c.execute(
+                            f"UPDATE {table} SET address_id = %s "
+                            f"WHERE customer_id = %s AND address_id IN ({_marks(duplicates)})",
+                            (keeper, user_id, *duplicates),
+                        )
+                        orders_repointed += c.rowcount
+                    groups_merged += 1
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+    finally:
+        c.close()
+    return groups_merged, orders_repointed
+
+# An address is only ever written for its owner's order, so looking for references
+# among that customer's orders is enough (and uses the customer indexes)
+UNREFERENCED_SQL = """
+    NOT EXISTS (SELECT 1 FROM Orders o WHERE o.customer_id = {a}.user_id AND o.address_id = {a}.address_id)
+    AND NOT EXISTS (SELECT 1 FROM OrdersArchive o WHERE o.customer_id = {a}.user_id AND o.address_id = {a}.address_id)
+"""
+
+def purge_orphaned_addresses(connection, batch_size=DEFAULT_BATCH_SIZE):
+    """Delete addresses no live or archived order refers to. Returns the rows deleted."""
+    deleted = 0
+    last_id = 0
+    c = connection.cursor()
+    try:
+        while True:
+            c.execute(
+                f"""
+                SELECT a.address_id FROM Addresses a
+                WHERE a.address_id > %s AND {UNREFERENCED_SQL.format(a="a")}
+                ORDER BY a.address_id LIMIT %s
+                """,
+                (last_id, int(batch_size)),
+            )
+            address_ids = [int(r[0]) for r in c.fetchall()]
+            if not address_ids:
+                break
+            last_id = address_ids[-1]
+            try:
+                # Re-checked in the DELETE: a checkout may have reused one meanwhile
+                c.execute(
+                    f"DELETE FROM Addresses WHERE address_id IN ({_marks(address_ids)}) "
+                    f"AND {UNREFERENCED_SQL.format(a='Addresses')}",
+                    address_ids,
+                )
+                deleted += c.rowcount
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+    finally:
+        c.close()
+    return deleted
+
+def table_sizes(connection, tables=REPORTED_TABLES):
+    """{table: (rows, bytes)} with bytes covering data and indexes (None if unknown)."""
+    sizes = {}
+    c = connection.cursor()
+    try:
+        for table in tables:
+            c.execute(f"SELECT COUNT(*) FROM {table}")
+            rows = int(c.fetchone()[0])
+            try:
+                if using_sqlite():
+                    # dbstat is compiled into most SQLite builds, but not all
+                    c.execute(
+                        "SELECT SUM(pgsize) FROM dbstat "
+                        "WHERE name IN (SELECT name FROM sqlite_master WHERE tbl_name = %s)",
+                        (table,),
+                    )
+                else:
+                    c.execute(
+                        """
+                        SELECT data_length + index_length FROM information_schema.TABLES
+                        WHERE table_schema = DATABASE() AND table_name = %s
+                        """,
+                        (table,),
+                    )
+                row = c.fetchone()
+                size = int(row[0]) if row and row[0] is not None else None
+            except Exception:
+                size = None
+            sizes[table] = (rows, size)
+    finally:
+        c.close()
+    return sizes
+
+def _fmt_bytes(size):
+    if size is None:
+        return "?"
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+def main():
+    parser = argparse.ArgumentParser(description="Purge abandoned carts and duplicate/orphaned addresses.")
+    parser.add_argument("--cart-ttl-days", type=float, default=DEFAULT_CART_TTL_DAYS,
+                        help="carts untouched for this many days are deleted")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="rows (or duplicate groups) per transaction")
+    parser.add_argument("--skip-carts", action="store_true", help="leave carts alone")
+    parser.add_argument("--skip-addresses", action="store_true", help="leave addresses alone")
+    args = parser.parse_args()
+
+    connection = create_connection()
+    if not connection:
+        raise SystemExit("Could not connect to the database.")
+    try:
+        before = table_sizes(connection)
+        carts = hashed = groups = repointed = orphans = 0
+        if not args.skip_carts:
+            carts = purge_abandoned_carts(connection, args.cart_ttl_days, args.batch_size)
+        if not args.skip_addresses:
+            hashed = hash_addresses(connection, args.batch_size)
+            groups, repointed = merge_duplicate_addresses(connection, args.batch_size)
+            orphans = purge_orphaned_addresses(connection, args.batch_size)
+        after = table_sizes(connection)
+    finally:
+        connection.close()
+
+    print(f"Cart: purged {carts} abandoned lines (untouched for {args.cart_ttl_days:g}+ days).")
+    print(f"Addresses: hashed {hashed}, merged {groups} duplicate groups ({repointed} orders repointed), "
+          f"purged {orphans} orphaned rows.")
+    for table in before:
+        (rows_before, size_before), (rows_after, size_after) = before[table], after[table]
+        print(f"  {table:<10} {rows_before:>10,} -> {rows_after:>10,} rows   "
+              f"{_fmt_bytes(size_before):>10} -> {_fmt_bytes(size_after):>10}")
+
+if __name__ == "__main__":
+    main()
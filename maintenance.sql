@@ -0,0 +1,122 @@
+-- Migration for databases created from an older hypeculture.sql:
+-- adds what maintenance.py and the address reuse at checkout need.
+-- Fresh installs get the same layout straight from hypeculture.sql.
+-- Afterwards run `python maintenance.py` once to hash and merge the existing addresses.
+USE hypeculture_db;
+
+-- Checkout looks up a customer's address by its hash (services.address_hash);
+-- idx_addresses_hash also serves the user_id foreign key, replacing its own index
+ALTER TABLE Addresses
+    ADD COLUMN address_hash CHAR(64) NULL,
+    ADD KEY idx_addresses_hash (user_id, address_hash);
+ALTER TABLE Addresses DROP KEY user_id;
+
+-- The abandoned-cart purge walks carts by age and checks each owner's newest line;
+-- idx_cart_customer also serves the customer_id foreign key, replacing its own index
+ALTER TABLE Cart
+    ADD KEY idx_cart_added (added_date),
+    ADD KEY idx_cart_customer (customer_id, added_date);
+ALTER TABLE Cart DROP KEY customer_id;
+
+-- AddToCart bumps added_date when it adds to an existing line, like services.add_to_cart,
+-- so the purge doesn't take a cart the customer just touched for abandoned
+DROP PROCEDURE IF EXISTS AddToCart;
+DELIMITER $$
+CREATE PROCEDURE AddToCart(
+    IN p_customer_id INT,
+    IN p_inventory_id INT,
+    IN p_quantity INT
+)
+BEGIN
+    DECLARE existing_quantity INT DEFAULT 0;
+
+    SELECT quantity INTO existing_quantity
+    FROM Cart
+    WHERE customer_id = p_customer_id AND inventory_id = p_inventory_id;
+
+    IF existing_quantity > 0 THEN
+        UPDATE Cart
+        SET quantity = quantity + p_quantity, added_date = NOW()
+        WHERE customer_id = p_customer_id AND inventory_id = p_inventory_id;
+    ELSE
+        INSERT INTO Cart(customer_id, inventory_id, quantity)
+        VALUES (p_customer_id, p_inventory_id, p_quantity);
+    END IF;
+END$$
+DELIMITER ;
+
+-- PlaceOrder reuses an identical address instead of inserting one per order
+DROP PROCEDURE IF EXISTS PlaceOrder;
+DELIMITER $$
+CREATE PROCEDURE PlaceOrder(
+    IN p_customer_id INT,
+    IN p_first_name VARCHAR(50),
+    IN p_last_name VARCHAR(50),
+    IN p_address_line1 VARCHAR(255),
+    IN p_city VARCHAR(100),
+    IN p_state VARCHAR(100),
+    IN p_postal_code VARCHAR(20)
+)
+BEGIN
+    DECLARE v_address_id INT;
+    DECLARE v_address_hash CHAR(64);
+    DECLARE v_order_id INT;
+    DECLARE v_order_date TIMESTAMP DEFAULT NOW();
+    DECLARE v_total_amount DECIMAL(10, 2) DEFAULT 0;
+    DECLARE finished INTEGER DEFAULT 0;
+    DECLARE v_inventory_id INT;
+    DECLARE v_quantity INT;
+    DECLARE v_price_per_unit DECIMAL(10, 2);
+
+    DECLARE cart_cursor CURSOR FOR
+        SELECT c.inventory_id, c.quantity, i.price
+        FROM Cart c
+        JOIN Inventory i ON c.inventory_id = i.inventory_id
+        WHERE c.customer_id = p_customer_id;
+
+    DECLARE CONTINUE HANDLER FOR NOT FOUND SET finished = 1;
+
+    SET v_address_hash = SHA2(CONCAT_WS(CHAR(31),
+        TRIM(REGEXP_REPLACE(LOWER(p_address_line1), '[[:space:]]+', ' ')),
+        TRIM(REGEXP_REPLACE(LOWER(p_city), '[[:space:]]+', ' ')),
+        TRIM(REGEXP_REPLACE(LOWER(p_state), '[[:space:]]+', ' ')),
+        TRIM(REGEXP_REPLACE(LOWER(p_postal_code), '[[:space:]]+', ' '))), 256);
+    SELECT MIN(address_id) INTO v_address_id
+    FROM Addresses
+    WHERE user_id = p_customer_id AND address_hash = v_address_hash;
+    IF v_address_id IS NULL THEN
+        INSERT INTO Addresses(user_id, address_line1, city, state, postal_code, address_hash)
+        VALUES(p_customer_id, p_address_line1, p_city, p_state, p_postal_code, v_address_hash);
+        SET v_address_id = LAST_INSERT_ID();
+    END IF;
+
+    UPDATE Users SET first_name = p_first_name, last_name = p_last_name WHERE user_id = p_customer_id;
+
+    SELECT SUM(i.price * c.quantity) INTO v_total_amount
+    FROM Cart c
+    JOIN Inventory i ON c.inventory_id = i.inventory_id
+    WHERE c.customer_id = p_customer_id;
+
+    INSERT INTO Orders (customer_id, address_id, order_date, total_amount)
+    VALUES (p_customer_id, v_address_id, v_order_date, v_total_amount);
+    SET v_order_id = LAST_INSERT_ID();
+
+    OPEN cart_cursor;
+
+    get_cart_item: LOOP
+        FETCH cart_cursor INTO v_inventory_id, v_quantity, v_price_per_unit;
+        IF finished = 1 THEN
+            LEAVE get_cart_item;
+        END IF;
+
+        INSERT INTO OrderItems (order_id, order_date, inventory_id, quantity, price_per_unit)
+        VALUES (v_order_id, v_order_date, v_inventory_id, v_quantity, v_price_per_unit);
+    END LOOP get_cart_item;
+
+    CLOSE cart_cursor;
+
+    DELETE FROM Cart WHERE customer_id = p_customer_id;
+
+    SELECT v_order_id AS new_order_id;
+END$$
+DELIMITER ;
@@ -0,0 +1,290 @@
+# metrics.py — in-process operational metrics in the Prometheus / OpenMetrics text format
+#
+#     HYPECULTURE_METRICS_PORT=9108 streamlit run app.py   # scrape http://localhost:9108/metrics
+#     HYPECULTURE_METRICS_FILE=/var/lib/node_exporter/textfile/hypeculture.prom streamlit run app.py
+#
+# The JSON API (api.py) also serves GET /metrics itself. With HYPECULTURE_METRICS_FILE
+# the metrics are rewritten every HYPECULTURE_METRICS_INTERVAL seconds (default 15)
+# for node_exporter's textfile collector.
+#
+# Metrics are per process. With several workers, give each its own port or file and
+# a HYPECULTURE_METRICS_WORKER name, which is added to every series as a `worker`
+# label so they can be summed (launch_workers.py does this). "{pid}" in the worker
+# name or the file path is replaced by the process id -- needed for `uvicorn
+# --workers N`, whose processes share one environment, and the reason to prefer the
+# textfile there: GET /metrics only reports the worker that took the scrape.
+#
+# Counters, gauges and fixed-bucket histograms only: an update is a dict lookup and a
+# few additions under a per-metric lock, cheap enough for every SQL statement.
+import bisect
+import functools
+import math
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; fine-grained at the low end, where most queries and renders land
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry = []
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _per_process(value):
+    return value.replace("{pid}", str(os.getpid()))
+
+def _constant_labels():
+    worker = os.environ.get("HYPECULTURE_METRICS_WORKER")
+    return (("worker", _per_process(worker)),) if worker else ()
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    pairs += [f'{n}="{_escape(v)}"' for n, v in (*_constant_labels(), *extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value):
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        _registry.append(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _header(self, name):
+        return [f"# HELP {name} {self.documentation}", f"# TYPE {name} {self.kind}"]
+
+class Counter(_Metric):
+    """A monotonically increasing count; exposed as <name>_total."""
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def collect(self, openmetrics):
+        # OpenMetrics names the family without _total; the 0.0.4 text format wants
+        # the TYPE line to name the sample itself
+        lines = self._header(self.name if openmetrics else self.name + "_total")
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}_total{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+class Gauge(_Metric):
+    """A value that goes up and down (connections in use, pool size, ...)."""
+
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def collect(self, openmetrics):
+        lines = self._header(self.name)
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+class Histogram(_Metric):
+    """Observations counted into fixed buckets, plus their sum and count."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # per-bucket (non-cumulative) counts, with the last slot for +Inf
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the with-block, even when it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def collect(self, openmetrics):
+        lines = self._header(self.name)
+        with self._lock:
+            items = sorted((key, (list(s[0]), s[1], s[2])) for key, s in self._values.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (math.inf,), counts):
+                cumulative += n
+                le = (("le", "+Inf" if bound == math.inf else repr(float(bound))),)
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+def render(openmetrics=True):
+    """All registered metrics as exposition text (OpenMetrics, or Prometheus 0.0.4)."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.collect(openmetrics))
+    if openmetrics:
+        lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+def wants_openmetrics(accept_header):
+    return "application/openmetrics-text" in (accept_header or "")
+
+# ---------- the application's metrics ----------
+LOGINS = Counter("hypeculture_logins", "Login attempts by outcome (success, failure, error).", ["result"])
+CART_ADDS = Counter("hypeculture_cart_adds", "Add-to-cart attempts by outcome (ok, rejected, not_found, error).", ["result"])
+CHECKOUTS = Counter("hypeculture_checkouts", "Order placements by outcome (success, rejected, error).", ["result"])
+CHECKOUT_SECONDS = Histogram("hypeculture_checkout_duration_seconds", "Time to place an order, by outcome.", ["result"])
+VIEW_SECONDS = Histogram("hypeculture_view_render_seconds", "Time to render a page view.", ["view"])
+CART_CACHE = Counter("hypeculture_cart_cache_lookups", "Cached cart lookups by result (hit, miss).", ["result"])
+
+DB_QUERY_SECONDS = Histogram("hypeculture_db_query_duration_seconds", "SQL statement execution time, by statement type.", ["statement"])
+DB_QUERY_ERRORS = Counter("hypeculture_db_query_errors", "SQL statements that raised, by statement type.", ["statement"])
+DB_CONNECTIONS = Counter("hypeculture_db_connections_opened", "Direct database connections opened, by outcome (ok, error).", ["result"])
+DB_POOL_SIZE = Gauge("hypeculture_db_pool_size", "Connections in the MySQL connection pool.")
+DB_POOL_IN_USE = Gauge("hypeculture_db_pool_in_use", "Pooled connections currently borrowed.")
+DB_POOL_WAIT_SECONDS = Histogram("hypeculture_db_pool_wait_seconds", "Time spent waiting to borrow a pooled connection.")
+
+def timed_fragment(view):
+    """Decorator for an st.fragment body: its own reruns go into VIEW_SECONDS as `view`.
+
+    A click inside a fragment reruns only the fragment, skipping the timing around the
+    view that contains it. Full runs are still timed there, so they are not counted twice.
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            from streamlit.runtime.scriptrunner import get_script_run_ctx
+            ctx = get_script_run_ctx()
+            if ctx is None or not ctx.fragment_ids_this_run:
+                return fn(*args, **kwargs)
+            with VIEW_SECONDS.time(view=view):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+# ---------- exposition ----------
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        openmetrics = wants_openmetrics(self.headers.get("Accept"))
+        body = render(openmetrics).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", OPENMETRICS_CONTENT_TYPE if openmetrics else PROMETHEUS_CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass  # scrapes every few seconds would flood the app's log
+
+def serve(port, host="127.0.0.1"):
+    """Serve /metrics from a daemon thread; returns the server."""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+def write_textfile(path):
+    """Write the metrics atomically (temp file + rename), as the textfile collector expects."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".hypeculture-metrics-")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(render(openmetrics=False))
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+def _write_periodically(path, interval):
+    while True:
+        try:
+            write_textfile(path)
+        except OSError as e:
+            print(f"Error while writing metrics to {path}: {e}")
+        time.sleep(interval)
+
+_started = False
+_start_lock = threading.Lock()
+
+def start_from_env():
+    """Start the exporters configured in the environment, once per process.
+
+    Safe to call on every Streamlit rerun; later calls do nothing.
+    """
+    global _started
+    with _start_lock:
+        if _started:
+            return
+        _started = True
+        port = os.environ.get("HYPECULTURE_METRICS_PORT")
+        if port:
+            try:
+                serve(int(port), os.environ.get("HYPECULTURE_METRICS_HOST", "127.0.0.1"))
+            except OSError as e:
+                print(f"Error while starting the metrics server on port {port}: {e}")
+        path = os.environ.get("HYPECULTURE_METRICS_FILE")
+        if path:
+            path = _per_process(path)
+            interval = float(os.environ.get("HYPECULTURE_METRICS_INTERVAL", "15"))
+            threading.Thread(
+                target=_write_periodically, args=(path, interval), name="metrics-textfile", daemon=True
+            ).start()
@@ -0,0 +1,180 @@
+# order_archive.py — archival of old orders + partition upkeep for Orders/OrderItems
+#
+# Meant to run on a schedule (e.g. nightly from cron):
+#     python order_archive.py --horizon-days 365 --batch-size 500
+import argparse
+import re
+from datetime import datetime, timedelta
+
+from db_connector import create_connection, using_sqlite
+
+DEFAULT_HORIZON_DAYS = 365
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_MONTHS_AHEAD = 3
+
+PARTITIONED_TABLES = ("Orders", "OrderItems")
+
+def archive_old_orders(connection, horizon_days=DEFAULT_HORIZON_DAYS, batch_size=DEFAULT_BATCH_SIZE):
+    """Move orders older than the horizon (and their items) into the archive tables.
+
+    Works in batches of `batch_size` orders, each in its own short transaction, so
+    locks are held briefly and the job can be interrupted and re-run at any point.
+    Returns (orders_moved, items_moved).
+    """
+    cutoff = datetime.now() - timedelta(days=horizon_days)
+    orders_moved = items_moved = 0
+    c = connection.cursor()
+    try:
+        while True:
+            c.execute(
+                "SELECT order_id FROM Orders WHERE order_date < %s ORDER BY order_date, order_id LIMIT %s",
+                (cutoff, int(batch_size)),
+            )
+            order_ids = [int(r[0]) for r in c.fetchall()]
+            if not order_ids:
+                break
+
+            marks = ", ".join(["%s"] * len(order_ids))
+            # order_date is repeated in every predicate so MySQL prunes to the old partitions
+            params = (*order_ids, cutoff)
+            try:
+                c.execute(
+                    f"""
+                    INSERT INTO OrdersArchive (order_id, customer_id, address_id, order_date, total_amount, order_status)
+                    SELECT order_id, customer_id, address_id, order_date, total_amount, order_status
+                    FROM Orders WHERE order_id IN ({marks}) AND order_date < %s
+                    """,
+                    params,
+                )
+                c.execute(
+                    f"""
+                    INSERT INTO OrderItemsArchive (order_item_id, order_id, order_date, inventory_id, quantity, price_per_unit)
+                    SELECT order_item_id, order_id, order_date, inventory_id, quantity, price_per_unit
+                    FROM OrderItems WHERE order_id IN ({marks}) AND order_date < %s
+                    """,
+                    params,
+                )
+                batch_items = c.rowcount
+                c.execute(f"DELETE FROM OrderItems WHERE order_id IN ({marks}) AND order_date < %s", params)
+                c.execute(f"DELETE FROM Orders WHERE order_id IN ({marks}) AND order_date < %s", params)
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+            orders_moved += len(order_ids)
+            items_moved += batch_items
+    finally:
+        c.close()
+    return orders_moved, items_moved
+
+def _list_partitions(cursor, table):
+    cursor.execute(
+        """
+        SELECT PARTITION_NAME, PARTITION_DESCRIPTION
+        FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+        """,
+        (table,),
+    )
+    return cursor.fetchall()
+
+def _next_month(year, month):
+    return (year + 1, 1) if month == 12 else (year, month + 1)
+
+def ensure_partitions(connection, months_ahead=DEFAULT_MONTHS_AHEAD):
+    """Split `pmax` so each month up to `months_ahead` from now has its own partition.
+
+    Returns the names of the partitions added (none on SQLite, which has no partitions).
+    """
+    if using_sqlite():
+        return []
+    today = datetime.now()
+    target = (today.year, today.month)
+    for _ in range(months_ahead):
+        target = _next_month(*target)
+
+    added = []
+    c = connection.cursor()
+    try:
+        for table in PARTITIONED_TABLES:
+            months = [
+                (int(m.group(1)), int(m.group(2)))
+                for m in (re.fullmatch(r"p(\d{4})(\d{2})", name) for name, _ in _list_partitions(c, table))
+                if m
+            ]
+            month = _next_month(*max(months)) if months else (today.year, today.month)
+            new_parts = []
+            while month <= target:
+                upper = _next_month(*month)
+                new_parts.append(
+                    f"PARTITION p{month[0]}{month[1]:02d} VALUES LESS THAN "
+                    f"(UNIX_TIMESTAMP('{upper[0]}-{upper[1]:02d}-01 00:00:00'))"
+                )
+                month = upper
+            if not new_parts:
+                continue
+            c.execute(
+                f"ALTER TABLE {table} REORGANIZE PARTITION pmax INTO ("
+                + ", ".join(new_parts)
+                + ", PARTITION pmax VALUES LESS THAN MAXVALUE)"
+            )
+            added.extend(f"{table}.{part.split()[1]}" for part in new_parts)
+    finally:
+        c.close()
+    return added
+
+def drop_archived_partitions(connection, horizon_days=DEFAULT_HORIZON_DAYS):
+    """Drop partitions that lie entirely before the horizon and are already empty.
+
+    Run after archive_old_orders(); a partition that still holds rows is left alone.
+    Returns the names of the partitions dropped.
+    """
+    if using_sqlite():
+        return []
+    cutoff = datetime.now() - timedelta(days=horizon_days)
+    dropped = []
+    c = connection.cursor()
+    try:
+        c.execute("SELECT UNIX_TIMESTAMP(%s)", (cutoff,))
+        cutoff_ts = int(c.fetchone()[0])
+        for table in PARTITIONED_TABLES:
+            partitions = _list_partitions(c, table)
+            for name, upper in partitions[:-1]:  # always keep the newest (pmax) partition
+                if upper == "MAXVALUE" or int(upper) > cutoff_ts:
+                    break
+                c.execute(f"SELECT 1 FROM {table} PARTITION ({name}) LIMIT 1")
+                if c.fetchone():
+                    continue
+                c.execute(f"ALTER TABLE {table} DROP PARTITION {name}")
+                dropped.append(f"{table}.{name}")
+    finally:
+        c.close()
+    return dropped
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive old orders and maintain order partitions.")
+    parser.add_argument("--horizon-days", type=int, default=DEFAULT_HORIZON_DAYS,
+                        help="orders older than this many days are archived")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="orders moved per transaction")
+    parser.add_argument("--months-ahead", type=int, default=DEFAULT_MONTHS_AHEAD,
+                        help="future month partitions to keep ready")
+    args = parser.parse_args()
+
+    connection = create_connection()
+    if not connection:
+        raise SystemExit("Could not connect to the database.")
+    try:
+        added = ensure_partitions(connection, args.months_ahead)
+        orders, items = archive_old_orders(connection, args.horizon_days, args.batch_size)
+        dropped = drop_archived_partitions(connection, args.horizon_days)
+    finally:
+        connection.close()
+
+    print(f"Archived {orders} orders ({items} items).")
+    print(f"Partitions added: {', '.join(added) or 'none'}")
+    print(f"Partitions dropped: {', '.join(dropped) or 'none'}")
+
+if __name__ == "__main__":
+    main()
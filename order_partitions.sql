@@ -0,0 +1,136 @@
+-- Migration for databases created from an older hypeculture.sql:
+-- converts Orders / OrderItems to month-partitioned tables and adds the archive tier.
+-- Fresh installs get the same layout straight from hypeculture.sql.
+USE hypeculture_db;
+
+-- Partitioned InnoDB tables can't have (or be referenced by) foreign keys.
+-- These are the names MySQL generated for the constraints in the original schema.
+ALTER TABLE OrderItems DROP FOREIGN KEY OrderItems_ibfk_1, DROP FOREIGN KEY OrderItems_ibfk_2;
+ALTER TABLE Orders DROP FOREIGN KEY Orders_ibfk_1, DROP FOREIGN KEY Orders_ibfk_2;
+-- The indexes MySQL created for those keys stay behind: OrderItems' are renamed to the
+-- fresh-install names below, and Orders.customer_id is covered by idx_orders_customer.
+
+-- The partition column has to be part of every unique key
+ALTER TABLE Orders
+    MODIFY order_date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (order_id, order_date),
+    ADD KEY idx_orders_customer (customer_id, order_date),
+    DROP KEY customer_id;
+
+ALTER TABLE OrderItems
+    ADD COLUMN order_date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP AFTER order_id;
+
+UPDATE OrderItems oi
+JOIN Orders o ON oi.order_id = o.order_id
+SET oi.order_date = o.order_date;
+
+ALTER TABLE OrderItems
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (order_item_id, order_date),
+    RENAME KEY order_id TO idx_order_items_order,
+    RENAME KEY inventory_id TO idx_order_items_inventory;
+
+ALTER TABLE Orders
+PARTITION BY RANGE (UNIX_TIMESTAMP(order_date)) (
+    PARTITION p_hist VALUES LESS THAN (UNIX_TIMESTAMP('2026-10-01 00:00:00')),
+    PARTITION p202610 VALUES LESS THAN (UNIX_TIMESTAMP('2026-11-01 00:00:00')),
+    PARTITION p202611 VALUES LESS THAN (UNIX_TIMESTAMP('2026-12-01 00:00:00')),
+    PARTITION p202612 VALUES LESS THAN (UNIX_TIMESTAMP('2027-01-01 00:00:00')),
+    PARTITION pmax VALUES LESS THAN MAXVALUE
+);
+
+ALTER TABLE OrderItems
+PARTITION BY RANGE (UNIX_TIMESTAMP(order_date)) (
+    PARTITION p_hist VALUES LESS THAN (UNIX_TIMESTAMP('2026-10-01 00:00:00')),
+    PARTITION p202610 VALUES LESS THAN (UNIX_TIMESTAMP('2026-11-01 00:00:00')),
+    PARTITION p202611 VALUES LESS THAN (UNIX_TIMESTAMP('2026-12-01 00:00:00')),
+    PARTITION p202612 VALUES LESS THAN (UNIX_TIMESTAMP('2027-01-01 00:00:00')),
+    PARTITION pmax VALUES LESS THAN MAXVALUE
+);
+
+CREATE TABLE IF NOT EXISTS OrdersArchive (
+    order_id INT PRIMARY KEY,
+    customer_id INT,
+    address_id INT,
+    order_date TIMESTAMP NOT NULL,
+    total_amount DECIMAL(10, 2),
+    order_status VARCHAR(20),
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    KEY idx_orders_archive_customer (customer_id, order_date)
+);
+
+CREATE TABLE IF NOT EXISTS OrderItemsArchive (
+    order_item_id INT PRIMARY KEY,
+    order_id INT NOT NULL,
+    order_date TIMESTAMP NOT NULL,
+    inventory_id INT,
+    quantity INT NOT NULL,
+    price_per_unit DECIMAL(10, 2) NOT NULL,
+    KEY idx_order_items_archive_order (order_id)
+);
+
+-- PlaceOrder has to stamp OrderItems with the order's date
+DROP PROCEDURE IF EXISTS PlaceOrder;
+DELIMITER $$
+CREATE PROCEDURE PlaceOrder(
+    IN p_customer_id INT,
+    IN p_first_name VARCHAR(50),
+    IN p_last_name VARCHAR(50),
+    IN p_address_line1 VARCHAR(255),
+    IN p_city VARCHAR(100),
+    IN p_state VARCHAR(100),
+    IN p_postal_code VARCHAR(20)
+)
+BEGIN
+    DECLARE v_address_id INT;
+    DECLARE v_order_id INT;
+    DECLARE v_order_date TIMESTAMP DEFAULT NOW();
+    DECLARE v_total_amount DECIMAL(10, 2) DEFAULT 0;
+    DECLARE finished INTEGER DEFAULT 0;
+    DECLARE v_inventory_id INT;
+    DECLARE v_quantity INT;
+    DECLARE v_price_per_unit DECIMAL(10, 2);
+
+    DECLARE cart_cursor CURSOR FOR
+        SELECT c.inventory_id, c.quantity, i.price
+        FROM Cart c
+        JOIN Inventory i ON c.inventory_id = i.inventory_id
+        WHERE c.customer_id = p_customer_id;
+
+    DECLARE CONTINUE HANDLER FOR NOT FOUND SET finished = 1;
+
+    INSERT INTO Addresses(user_id, address_line1, city, state, postal_code)
+    VALUES(p_customer_id, p_address_line1, p_city, p_state, p_postal_code);
+    SET v_address_id = LAST_INSERT_ID();
+
+    UPDATE Users SET first_name = p_first_name, last_name = p_last_name WHERE user_id = p_customer_id;
+
+    SELECT SUM(i.price * c.quantity) INTO v_total_amount
+    FROM Cart c
+    JOIN Inventory i ON c.inventory_id = i.inventory_id
+    WHERE c.customer_id = p_customer_id;
+
+    INSERT INTO Orders (customer_id, address_id, order_date, total_amount)
+    VALUES (p_customer_id, v_address_id, v_order_date, v_total_amount);
+    SET v_order_id = LAST_INSERT_ID();
+
+    OPEN cart_cursor;
+
+    get_cart_item: LOOP
+        FETCH cart_cursor INTO v_inventory_id, v_quantity, v_price_per_unit;
+        IF finished = 1 THEN
+            LEAVE get_cart_item;
+        END IF;
+
+        INSERT INTO OrderItems (order_id, order_date, inventory_id, quantity, price_per_unit)
+        VALUES (v_order_id, v_order_date, v_inventory_id, v_quantity, v_price_per_unit);
+    END LOOP get_cart_item;
+
+    CLOSE cart_cursor;
+
+    DELETE FROM Cart WHERE customer_id = p_customer_id;
+
+    SELECT v_order_id AS new_order_id;
+END$$
+DELIMITER ;
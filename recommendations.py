@@ -0,0 +1,225 @@
+# recommendations.py — "Customers also bought" from a product co-occurrence matrix
+#
+# Two products co-occur when they are in the same order. The counts are kept as a
+# sparse matrix in two sorted NumPy arrays: packed keys (product_a << 32 | product_b)
+# and how many orders contained both. Each product's top-K partners are precomputed
+# into a dict, so serving a product page is a dict lookup.
+#
+# New orders are folded in incrementally (Recommender.refresh): only the pairs they
+# contain are merged into the arrays and only the products they touch are re-ranked.
+# Order ids are handed out before their checkout commits, so a lower id can become
+# visible after a higher one was read; refresh therefore re-reads the last
+# REREAD_WINDOW ids and skips the orders it has already folded in.
+#
+#     python benchmarks/bench_recommendations.py --lines 5000000   # build/refresh/lookup timings
+import threading
+import time
+
+import numpy as np
+
+DEFAULT_K = 5
+# Orders with more distinct products than this (bulk/wholesale orders) say little
+# about what goes together and would add size**2 pairs, so they are skipped
+MAX_BASKET = 50
+FETCH_CHUNK = 50_000
+# How far below the newest order id seen refresh() looks for late commits
+REREAD_WINDOW = 1000
+
+ORDER_LINES_SQL = """
+    SELECT oi.order_id, i.product_id
+    FROM OrderItems oi JOIN Inventory i ON oi.inventory_id = i.inventory_id
+    WHERE oi.order_id > %s
+"""
+ARCHIVED_ORDER_LINES_SQL = """
+    SELECT oi.order_id, i.product_id
+    FROM OrderItemsArchive oi JOIN Inventory i ON oi.inventory_id = i.inventory_id
+"""
+PRODUCT_INFO_SQL = "SELECT product_id, product_name, category_id FROM Products"
+
+def _sorted_counts(values):
+    """Sorted distinct values and their multiplicities (np.unique via a plain sort)."""
+    values = np.sort(values)
+    if not len(values):
+        return values, np.empty(0, dtype=np.int64)
+    starts = np.flatnonzero(np.r_[True, values[1:] != values[:-1]])
+    return values[starts], np.diff(np.r_[starts, len(values)])
+
+def _distinct_lines(order_ids, product_ids):
+    """(order_ids, product_ids) sorted by order, one row per product per order."""
+    # Ids fit in 32 bits, so one sort of packed (order, product) keys does both jobs
+    packed, _ = _sorted_counts((np.asarray(order_ids, dtype=np.int64) << 32) | np.asarray(product_ids, dtype=np.int64))
+    return packed >> 32, packed & 0xFFFFFFFF
+
+def pair_counts(order_ids, product_ids, max_basket=MAX_BASKET):
+    """Co-occurrence counts of the given order lines as (sorted packed keys, counts).
+
+    Every unordered pair {a, b} bought together is counted in both directions, so
+    row a of the matrix lists everything bought with a.
+    """
+    o, p = _distinct_lines(order_ids, product_ids)
+    if len(o):
+        starts = np.flatnonzero(np.r_[True, o[1:] != o[:-1]])
+        sizes = np.diff(np.r_[starts, len(o)])
+        keep = np.repeat(sizes <= max_basket, sizes)
+        o, p = o[keep], p[keep]
+
+    # Lines of one order are adjacent, so pairing each line with the one d places
+    # later (for d = 1, 2, ...) enumerates all pairs, one vectorized pass per d
+    chunks = []
+    d = 1
+    while d < len(o):
+        same = o[d:] == o[:-d]
+        if not same.any():
+            break
+        a, b = p[:-d][same], p[d:][same]
+        chunks.append((a << 32) | b)
+        chunks.append((b << 32) | a)
+        d += 1
+    if not chunks:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return _sorted_counts(np.concatenate(chunks))
+
+def _top_k(partners, counts, k):
+    """The k partners with the highest counts (ties: lower product id first)."""
+    order = np.lexsort((partners, -counts))[:k]
+    return tuple(int(x) for x in partners[order])
+
+class Recommender:
+    """In-memory "customers also bought" index; safe to share between threads."""
+
+    def __init__(self, k=DEFAULT_K, max_basket=MAX_BASKET):
+        self.k = k
+        self.max_basket = max_basket
+        self._keys = np.empty(0, dtype=np.int64)
+        self._counts = np.empty(0, dtype=np.int64)
+        self._top = {}
+        self._products = {}
+        self._last_order_id = 0
+        self._recent_orders = set()  # folded-in order ids within REREAD_WINDOW of the last
+        self._loaded = False
+        self._last_refresh = 0.0
+        self._lock = threading.Lock()
+
+    # ---------- serving ----------
+    def also_bought(self, product_id):
+        """Product ids most often bought together with `product_id`, best first."""
+        return self._top.get(int(product_id), ())
+
+    def product(self, product_id):
+        """(product_name, category_id) of a recommended product, or None."""
+        return self._products.get(int(product_id))
+
+    # ---------- building from arrays ----------
+    def build(self, order_ids, product_ids):
+        """Replace the index with one built from these order lines."""
+        keys, counts = pair_counts(order_ids, product_ids, self.max_basket)
+        rows, partners = keys >> 32, keys & 0xFFFFFFFF
+        # Re-sort by row, then count descending (ties keep partner order): each row's
+        # first k are its top k. The keys are already grouped by row, so a stable sort
+        # of (row, -count) packed into one int64 is cheap.
+        rank = (rows << 31) | (0x7FFFFFFF - np.minimum(counts, 0x7FFFFFFF))
+        idx = np.argsort(rank, kind="stable")
+        rows, partners = rows[idx], partners[idx]
+        starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]]) if len(rows) else np.empty(0, dtype=np.int64)
+        ends = np.r_[starts[1:], len(rows)]
+        top = {
+            int(rows[s]): tuple(partners[s:min(e, s + self.k)].tolist())
+            for s, e in zip(starts.tolist(), ends.tolist())
+        }
+        self._keys, self._counts, self._top = keys, counts, top
+
+    def add_orders(self, order_ids, product_ids):
+        """Fold in new orders (never seen before) and re-rank only the products they touch."""
+        new_keys, new_counts = pair_counts(order_ids, product_ids, self.max_basket)
+        if not len(new_keys):
+            return
+        pos = np.searchsorted(self._keys, new_keys)
+        hit = pos < len(self._keys)
+        hit[hit] = self._keys[pos[hit]] == new_keys[hit]
+        counts = self._counts.copy()
+        counts[pos[hit]] += new_counts[hit]
+        keys = np.insert(self._keys, pos[~hit], new_keys[~hit])
+        counts = np.insert(counts, pos[~hit], new_counts[~hit])
+
+        top = {}
+        for row in _sorted_counts(new_keys >> 32)[0].tolist():
+            lo, hi = np.searchsorted(keys, [row << 32, (row + 1) << 32])
+            top[row] = _top_k(keys[lo:hi] & 0xFFFFFFFF, counts[lo:hi], self.k)
+        self._keys, self._counts = keys, counts
+        self._top.update(top)
+
+    # ---------- loading from the database ----------
+    def load(self, connection):
+        """Build from every order (archived ones included) and the product catalog."""
+        with self._lock:
+            lines = _fetch_lines(connection, ARCHIVED_ORDER_LINES_SQL, ())
+            live = _fetch_lines(connection, ORDER_LINES_SQL, (0,))
+            order_ids = np.concatenate([lines[0], live[0]])
+            product_ids = np.concatenate([lines[1], live[1]])
+            self.build(order_ids, product_ids)
+            self._last_order_id = 0
+            self._recent_orders = set()
+            self._remember_orders(order_ids)
+            self._load_products(connection)
+            self._loaded = True
+            self._last_refresh = time.monotonic()
+
+    def refresh(self, connection):
+        """Fold in orders placed since the last load/refresh; returns how many lines."""
+        if not self._loaded:
+            self.load(connection)
+            return 0
+        with self._lock:
+            since = max(0, self._last_order_id - REREAD_WINDOW)
+            order_ids, product_ids = _fetch_lines(connection, ORDER_LINES_SQL, (since,))
+            self._last_refresh = time.monotonic()
+            # A checkout commits its order and lines together, so an order already
+            # folded in is complete and can be skipped as a whole
+            new = ~np.isin(order_ids, np.fromiter(self._recent_orders, dtype=np.int64))
+            order_ids, product_ids = order_ids[new], product_ids[new]
+            if not len(order_ids):
+                return 0
+            self.add_orders(order_ids, product_ids)
+            self._remember_orders(order_ids)
+            if any(int(p) not in self._products for p in np.unique(product_ids).tolist()):
+                self._load_products(connection)
+            return len(order_ids)
+
+    def _remember_orders(self, order_ids):
+        if len(order_ids):
+            self._last_order_id = max(self._last_order_id, int(order_ids.max()))
+        floor = self._last_order_id - REREAD_WINDOW
+        recent = order_ids[order_ids > floor].tolist()
+        self._recent_orders = {o for o in self._recent_orders if o > floor}
+        self._recent_orders.update(recent)
+
+    def refresh_if_stale(self, connection, max_age=60.0):
+        """refresh() at most every `max_age` seconds, so page reruns mostly cost nothing."""
+        if not self._loaded or time.monotonic() - self._last_refresh >= max_age:
+            self.refresh(connection)
+
+    def _load_products(self, connection):
+        c = connection.cursor()
+        try:
+            c.execute(PRODUCT_INFO_SQL)
+            self._products = {int(pid): (name, int(cid)) for pid, name, cid in c.fetchall()}
+        finally:
+            c.close()
+
+def _fetch_lines(connection, query, params):
+    """Run an (order_id, product_id) query into two int64 arrays, chunk by chunk."""
+    c = connection.cursor()
+    try:
+        c.execute(query, params)
+        chunks = []
+        while True:
+            rows = c.fetchmany(FETCH_CHUNK)
+            if not rows:
+                break
+            chunks.append(np.array(rows, dtype=np.int64))
+    finally:
+        c.close()
+    if not chunks:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    lines = np.concatenate(chunks)
+    return lines[:, 0], lines[:, 1]
@@ -0,0 +1,551 @@
+# services.py — UI-independent business logic for browsing, cart, checkout and orders
+#
+# Every function takes an open connection (MySQL or SQLite, see db_connector) and
+# returns plain rows/values or raises ServiceError; nothing here touches Streamlit.
+# The Streamlit views (customer_view.py) and the JSON API (api.py) both sit on top,
+# so the business metrics (logins, cart adds, checkouts; see metrics.py) are counted here.
+import hashlib
+import os
+import time
+from datetime import datetime
+
+import facets
+import metrics
+import shared_cache
+from db_connector import fetch_parallel, now_sql
+
+class ServiceError(Exception):
+    """A request the business rules reject (bad quantity, not enough stock, ...)."""
+
+class NotFoundError(ServiceError):
+    """The referenced row does not exist (or does not belong to the caller)."""
+
+# ---------- SQL ----------
+CATEGORIES_SQL = "SELECT category_id, category_name FROM Categories"
+PRODUCTS_SQL = "SELECT product_id, product_name FROM Products WHERE category_id = %s"
+SELLERS_SQL = """
+    SELECT sp.inventory_id, u.first_name, u.last_name, sp.price, sp.stock_quantity
+    FROM Inventory sp
+    JOIN Users u ON sp.seller_id = u.user_id
+    WHERE sp.product_id = %s AND sp.stock_quantity > 0
+    ORDER BY sp.price ASC
+"""
+
+CART_SQL = """
+    SELECT
+        p.product_name,
+        u.first_name AS seller_name,
+        i.price,
+        c.quantity,
+        (i.price * c.quantity) AS subtotal,
+        c.cart_id
+    FROM
+        Cart AS c
+    JOIN
+        Inventory AS i ON c.inventory_id = i.inventory_id
+    JOIN
+        Products AS p ON i.product_id = p.product_id
+    JOIN
+        Users AS u ON i.seller_id = u.user_id
+    WHERE
+        c.customer_id = %s
+    ORDER BY
+        c.cart_id;
+"""
+
+# A cheap aggregate that changes whenever the cart rows or their prices change
+CART_VERSION_SQL = """
+    SELECT COUNT(*), COALESCE(SUM(c.quantity), 0), COALESCE(SUM(i.price * c.quantity), 0),
+           COALESCE(SUM(c.cart_id * c.quantity), 0)
+    FROM Cart AS c JOIN Inventory AS i ON c.inventory_id = i.inventory_id
+    WHERE c.customer_id = %s;
+"""
+
+CHECKOUT_ITEMS_SQL = """
+    SELECT c.inventory_id, c.quantity, i.price, i.stock_quantity, c.cart_id
+    FROM Cart c JOIN Inventory i ON c.inventory_id = i.inventory_id
+    WHERE c.customer_id = %s;
+"""
+
+# Column names for the row tuples returned below (used by the JSON API)
+CATEGORY_COLUMNS = ("category_id", "category_name")
+PRODUCT_COLUMNS = ("product_id", "product_name")
+SELLER_COLUMNS = ("inventory_id", "seller_first", "seller_last", "price", "stock")
+CART_COLUMNS = ("product_name", "seller_name", "price", "quantity", "subtotal", "cart_id")
+ORDER_COLUMNS = ("order_id", "order_date", "total_amount", "address_line1", "city", "archived")
+ORDER_ITEM_COLUMNS = ("product_name", "seller_name", "quantity", "price_per_unit")
+BROWSE_ITEM_COLUMNS = facets.ITEM_COLUMNS
+
+def _fetchall(connection, query, params=None):
+    c = connection.cursor()
+    try:
+        c.execute(query, params or ())
+        return c.fetchall()
+    finally:
+        c.close()
+
+def _fetchone(connection, query, params=None):
+    c = connection.cursor()
+    try:
+        c.execute(query, params or ())
+        return c.fetchone()
+    finally:
+        c.close()
+
+# ---------- Accounts ----------
+def register_customer(connection, first_name, last_name, email, password):
+    """Create a customer account; returns (user_id, role, first_name)."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO Users (first_name, last_name, email, password_hash, user_role)
+            VALUES (%s, %s, %s, %s, %s)
+            """,
+            (first_name, last_name, email, password, 'customer')
+        )
+        connection.commit()
+        user_id = cursor.lastrowid
+    return (user_id, 'customer', first_name)
+
+def authenticate(connection, email, password):
+    """Return (user_id, user_role, first_name) for valid credentials, else None."""
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT user_id, user_role, first_name FROM Users WHERE email = %s AND password_hash = %s",
+                (email, password)
+            )
+            row = cursor.fetchone()
+    except Exception:
+        metrics.LOGINS.inc(result="error")
+        raise
+    metrics.LOGINS.inc(result="success" if row else "failure")
+    return row
+
+# ---------- Catalog ----------
+# Categories, products and offers (in-stock listings) are read far more often than
+# they change, so they go through the shared cache (shared_cache.py), which all
+# worker processes share. Writers call invalidate_catalog()/invalidate_offers().
+CATALOG_TTL = float(os.environ.get("HYPECULTURE_CATALOG_TTL", "300"))
+# Offers show stock, which every checkout changes; keep them short-lived as well
+OFFERS_TTL = float(os.environ.get("HYPECULTURE_OFFERS_TTL", "30"))
+
+def _catalog_query(name, key=None):
+    if name == "categories":
+        return "catalog/categories", CATEGORIES_SQL, None, CATALOG_TTL
+    if name == "products":
+        return f"catalog/products/{int(key)}", PRODUCTS_SQL, (int(key),), CATALOG_TTL
+    return f"offers/{int(key)}", SELLERS_SQL, (int(key),), OFFERS_TTL
+
+def load_catalog(connection, category_id=None, product_id=None):
+    """Categories, plus the products of `category_id` and the offers for `product_id`
+    when given, as {"categories": rows, "products": rows, "sellers": rows}.
+
+    Cached lists are served from the shared cache; the misses are read from the
+    database in one fetch_parallel() round and cached for the other workers.
+    """
+    wanted = {"categories": _catalog_query("categories")}
+    if category_id is not None:
+        wanted["products"] = _catalog_query("products", category_id)
+    if product_id is not None:
+        wanted["sellers"] = _catalog_query("sellers", product_id)
+
+    cache = shared_cache.get_cache()
+    version = cache.version()  # before reading, so a write racing the fetch wins
+    results, missing = {}, {}
+    for name, (key, sql, params, ttl) in wanted.items():
+        rows = cache.get(key)
+        if rows is None:
+            missing[name] = (sql, params)
+        else:
+            results[name] = rows
+    if missing:
+        for name, rows in fetch_parallel(connection, missing).items():
+            key, _, _, ttl = wanted[name]
+            rows = list(rows)
+            cache.set(key, rows, ttl, version)
+            results[name] = rows
+    return results
+
+def list_categories(connection):
+    return load_catalog(connection)["categories"]
+
+def list_products(connection, category_id):
+    key, sql, params, ttl = _catalog_query("products", category_id)
+    return _cached_rows(connection, key, sql, params, ttl)
+
+def list_sellers(connection, product_id):
+    """In-stock listings for a product, cheapest first."""
+    key, sql, params, ttl = _catalog_query("sellers", product_id)
+    return _cached_rows(connection, key, sql, params, ttl)
+
+def _cached_rows(connection, key, sql, params, ttl):
+    cache = shared_cache.get_cache()
+    version = cache.version()
+    rows = cache.get(key)
+    if rows is None:
+        rows = list(_fetchall(connection, sql, params))
+        cache.set(key, rows, ttl, version)
+    return rows
+
+def invalidate_catalog():
+    """Call after adding/changing products or categories (all workers drop them)."""
+    shared_cache.get_cache().invalidate(prefixes=("catalog/",))
+
+def invalidate_offers(product_ids=None):
+    """Call after listing, price or stock changes; None drops every product's offers."""
+    if product_ids is None:
+        shared_cache.get_cache().invalidate(prefixes=("offers/",))
+    else:
+        shared_cache.get_cache().invalidate(keys=[f"offers/{int(pid)}" for pid in product_ids])
+
+# ---------- Faceted browse ----------
+MAX_BROWSE_PAGE = 100
+
+def browse(connection, category_ids=(), brands=(), price_bands=(), availability=(),
+           sort="price", after=None, limit=None):
+    """One page of products filtered by facet, with the facet counts (see facets.py).
+
+    Served from the in-memory facet index, which re-reads only the products whose
+    offers were invalidated since the last call. Pass the returned "next" as `after`
+    for the following page; `limit` defaults to facets.PAGE_SIZE.
+    """
+    if sort not in facets.SORTS:
+        raise ServiceError(f"Sort must be one of: {', '.join(facets.SORTS)}.")
+    try:
+        category_ids = [int(v) for v in category_ids]
+        price_bands = [int(v) for v in price_bands]
+        after = None if after in (None, "") else int(after)
+        limit = facets.PAGE_SIZE if limit in (None, "") else int(limit)
+    except (TypeError, ValueError):
+        raise ServiceError("Categories, price bands, 'after' and 'limit' must be integers.")
+    if not 1 <= limit <= MAX_BROWSE_PAGE:
+        raise ServiceError(f"'limit' must be between 1 and {MAX_BROWSE_PAGE}.")
+    # An unknown band or availability would otherwise just match nothing (or be ignored)
+    bands = len(facets.PRICE_EDGES) + 1
+    if any(not 0 <= band < bands for band in price_bands):
+        raise ServiceError(f"Price bands must be between 0 and {bands - 1}.")
+    availability = list(availability)
+    if any(value not in facets.AVAILABILITY for value in availability):
+        raise ServiceError(f"Availability must be one of: {', '.join(facets.AVAILABILITY)}.")
+    return facets.get_index().search(
+        connection, category_ids, list(brands), price_bands, availability, sort, after, limit
+    )
+
+# ---------- Cart ----------
+def get_cart(connection, user_id):
+    return _fetchall(connection, CART_SQL, (user_id,))
+
+def normalize_cart_version(count, total_qty, total_amount, weighted_ids):
+    return (int(count), int(total_qty), round(float(total_amount), 2), int(weighted_ids))
+
+def cart_version(connection, user_id):
+    return normalize_cart_version(*_fetchone(connection, CART_VERSION_SQL, (user_id,)))
+
+def cart_version_of(rows):
+    """Version of CART_SQL rows; equals cart_version() while the cart is unchanged."""
+    return normalize_cart_version(
+        len(rows),
+        sum(int(r[3]) for r in rows),
+        sum(float(r[2]) * int(r[3]) for r in rows),
+        sum(int(r[5]) * int(r[3]) for r in rows),
+    )
+
+def add_to_cart(connection, user_id, inventory_id, quantity):
+    """Add `quantity` of a listing to the cart (merging with an existing row).
+
+    Returns (cart_id, new_quantity).
+    """
+    try:
+        result = _add_to_cart(connection, user_id, inventory_id, quantity)
+    except NotFoundError:
+        metrics.CART_ADDS.inc(result="not_found")
+        raise
+    except ServiceError:
+        metrics.CART_ADDS.inc(result="rejected")
+        raise
+    except Exception:
+        metrics.CART_ADDS.inc(result="error")
+        raise
+    metrics.CART_ADDS.inc(result="ok")
+    return result
+
+def _add_to_cart(connection, user_id, inventory_id, quantity):
+    c = connection.cursor()
+    try:
+        # Validate stock
+        c.execute("SELECT stock_quantity FROM Inventory WHERE inventory_id = %s", (inventory_id,))
+        row = c.fetchone()
+        if not row:
+            raise NotFoundError("Selected inventory item not found.")
+
+        stock = int(row[0])
+        if quantity <= 0:
+            raise ServiceError("Quantity must be positive.")
+        if quantity > stock:
+            raise ServiceError(f"Only {stock} left in stock.")
+
+        # Upsert-like behavior
+        c.execute(
+            "SELECT cart_id, quantity FROM Cart WHERE customer_id = %s AND inventory_id = %s",
+            (user_id, inventory_id),
+        )
+        existing = c.fetchone()
+        if existing:
+            cart_id, current_qty = existing
+            new_qty = int(current_qty) + int(quantity)
+            if new_qty > stock:
+                raise ServiceError(
+                    f"Adding {quantity} would exceed stock ({stock}). "
+                    f"You currently have {current_qty} in cart."
+                )
+            # The database's clock, like the INSERT's default, so the cart purge compares like with like
+            c.execute(f"UPDATE Cart SET quantity = %s, added_date = {now_sql()} WHERE cart_id = %s",
+                      (new_qty, cart_id))
+        else:
+            c.execute(
+                "INSERT INTO Cart (customer_id, inventory_id, quantity) VALUES (%s, %s, %s)",
+                (user_id, inventory_id, int(quantity)),
+            )
+            cart_id, new_qty = c.lastrowid, int(quantity)
+        connection.commit()
+        return cart_id, new_qty
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        c.close()
+
+def update_cart_items(connection, user_id, quantities):
+    """Apply {cart_id: new_quantity} to the user's cart in one transaction; 0 removes.
+
+    Stock for all lines is checked with a single query before anything is written
+    (and again by each UPDATE), and either every change is applied or none is.
+    Returns (updated, removed) counts.
+    """
+    quantities = {int(cart_id): int(qty) for cart_id, qty in quantities.items()}
+    if not quantities:
+        return 0, 0
+    if any(qty < 0 for qty in quantities.values()):
+        raise ServiceError("Quantities must not be negative.")
+
+    placeholders = ", ".join(["%s"] * len(quantities))
+    c = connection.cursor()
+    try:
+        c.execute(
+            f"""
+            SELECT c.cart_id, i.stock_quantity, p.product_name
+            FROM Cart c
+            JOIN Inventory i ON c.inventory_id = i.inventory_id
+            JOIN Products p ON i.product_id = p.product_id
+            WHERE c.customer_id = %s AND c.cart_id IN ({placeholders})
+            """,
+            (user_id, *quantities),
+        )
+        lines = {int(cart_id): (int(stock), name) for cart_id, stock, name in c.fetchall()}
+        missing = sorted(set(quantities) - set(lines))
+        if missing:
+            raise NotFoundError(f"Cart item(s) {', '.join(map(str, missing))} not found.")
+        short = [f"{lines[cart_id][1]} (only {lines[cart_id][0]} left)"
+                 for cart_id, qty in quantities.items() if qty > lines[cart_id][0]]
+        if short:
+            raise ServiceError("Not enough stock for " + ", ".join(short) + ".")
+
+        removed = [(cart_id, user_id) for cart_id, qty in quantities.items() if qty == 0]
+        updated = [(qty, cart_id, user_id) for cart_id, qty in quantities.items() if qty > 0]
+        if removed:
+            c.executemany("DELETE FROM Cart WHERE cart_id = %s AND customer_id = %s", removed)
+        if updated:
+            # Stock may have dropped since the SELECT (a concurrent checkout), so each
+            # UPDATE re-checks it against the current Inventory row
+            c.executemany(
+                f"""
+                UPDATE Cart SET quantity = %s, added_date = {now_sql()}
+                WHERE cart_id = %s AND customer_id = %s
+                  AND %s <= (SELECT i.stock_quantity FROM Inventory i WHERE i.inventory_id = Cart.inventory_id)
+                """,
+                [(qty, cart_id, user_id, qty) for qty, cart_id, user_id in updated],
+            )
+            if c.rowcount != len(updated):
+                raise ServiceError("Stock changed while saving your cart; please review the quantities.")
+        connection.commit()
+        return len(updated), len(removed)
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        c.close()
+
+# ---------- Checkout ----------
+def address_hash(address_line, city, state, postal_code):
+    """SHA-256 (hex) of an address, ignoring case and extra whitespace.
+
+    Must stay in step with the SHA2(...) expression in the PlaceOrder procedure.
+    """
+    fields = (" ".join(str(value).lower().split()) for value in (address_line, city, state, postal_code))
+    return hashlib.sha256("\x1f".join(fields).encode("utf-8")).hexdigest()
+
+def _address_id(cursor, user_id, address_line, city, state, postal_code):
+    """The user's existing address_id for this address, inserting it the first time."""
+    digest = address_hash(address_line, city, state, postal_code)
+    cursor.execute(
+        "SELECT address_id FROM Addresses WHERE user_id = %s AND address_hash = %s ORDER BY address_id LIMIT 1",
+        (user_id, digest),
+    )
+    row = cursor.fetchone()
+    if row:
+        return row[0]
+    cursor.execute(
+        "INSERT INTO Addresses (user_id, address_line1, city, state, postal_code, address_hash) "
+        "VALUES (%s, %s, %s, %s, %s, %s)",
+        (user_id, address_line, city, state, postal_code, digest),
+    )
+    return cursor.lastrowid
+
+def checkout_items(connection, user_id):
+    """Cart lines to pay for and their total; raises if any line exceeds stock.
+
+    Returns (items, total) where items are (inventory_id, quantity, price, stock, cart_id).
+    """
+    items = _fetchall(connection, CHECKOUT_ITEMS_SQL, (user_id,))
+    total_amount = 0.0
+    for inv_id, qty, price, stock, _ in items:
+        if int(qty) > int(stock):
+            raise ServiceError(f"Not enough stock for item ID {inv_id}. Only {stock} left.")
+        total_amount += int(qty) * float(price)
+    return items, round(total_amount, 2)
+
+def place_order(connection, user_id, address_line, city, state, postal_code, items=None):
+    """Turn the cart into an order in a single transaction; returns the new order_id.
+
+    `items`/total come from checkout_items() (re-read here when not given). Stock is
+    checked again inside the transaction, so a concurrent order for the same listing
+    makes this one fail with ServiceError instead of overselling.
+    """
+    start = time.perf_counter()
+    result = "error"
+    try:
+        order_id = _place_order(connection, user_id, address_line, city, state, postal_code, items)
+        result = "success"
+        return order_id
+    except ServiceError:
+        result = "rejected"
+        raise
+    finally:
+        metrics.CHECKOUTS.inc(result=result)
+        metrics.CHECKOUT_SECONDS.observe(time.perf_counter() - start, result=result)
+
+def _place_order(connection, user_id, address_line, city, state, postal_code, items):
+    if not all([address_line, city, state, postal_code]):
+        raise ServiceError("All fields are required.")
+    if items is None:
+        items, total_amount = checkout_items(connection, user_id)
+    else:
+        total_amount = round(sum(int(qty) * float(price) for _, qty, price, _, _ in items), 2)
+    if not items:
+        raise ServiceError("Your cart is empty. Add items before checking out.")
+    # Concurrent checkouts lock the listings they share in the same order, so they queue
+    # instead of deadlocking
+    items = sorted(items, key=lambda item: int(item[0]))
+
+    cur = connection.cursor(buffered=True)
+    try:
+        # Repeat customers ship to the same place; reuse that row instead of adding one per order
+        address_id = _address_id(cur, user_id, address_line, city, state, postal_code)
+
+        # Orders and OrderItems are partitioned by order_date, so both get the same stamp
+        order_date = datetime.now().replace(microsecond=0)
+        cur.execute(
+            "INSERT INTO Orders (customer_id, address_id, order_date, total_amount) VALUES (%s, %s, %s, %s)",
+            (user_id, address_id, order_date, total_amount),
+        )
+        order_id = cur.lastrowid
+
+        # The AfterOrderItemInsert trigger takes each line off stock_quantity, relative to
+        # the current row (which stays locked until commit), so nothing read before the
+        # transaction is written back; a listing that went below zero was oversold
+        ordered = {}
+        for inv_id, qty, price, _, _ in items:
+            cur.execute(
+                "INSERT INTO OrderItems (order_id, order_date, inventory_id, quantity, price_per_unit) VALUES (%s, %s, %s, %s, %s)",
+                (order_id, order_date, inv_id, int(qty), float(price)),
+            )
+            ordered[int(inv_id)] = ordered.get(int(inv_id), 0) + int(qty)
+
+        placeholders = ", ".join(["%s"] * len(ordered))
+        cur.execute(
+            f"SELECT inventory_id, product_id, stock_quantity FROM Inventory WHERE inventory_id IN ({placeholders})",
+            tuple(ordered),
+        )
+        rows = cur.fetchall()
+        for inv_id, _, stock in rows:
+            if int(stock) < 0:
+                left = int(stock) + ordered[int(inv_id)]
+                raise ServiceError(f"Not enough stock for item ID {inv_id}. Only {left} left.")
+        # Stock changed, so these products' cached offers are stale once we commit
+        product_ids = sorted({row[1] for row in rows})
+
+        # Only the lines paid for: anything added to the cart meanwhile stays there
+        cart_ids = [cart_id for _, _, _, _, cart_id in items]
+        placeholders = ", ".join(["%s"] * len(cart_ids))
+        cur.execute(
+            f"DELETE FROM Cart WHERE customer_id = %s AND cart_id IN ({placeholders})",
+            (user_id, *cart_ids),
+        )
+        connection.commit()
+        invalidate_offers(product_ids)
+        return order_id
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cur.close()
+
+# ---------- Orders ----------
+def order_history(connection, user_id, include_archived=False):
+    """The user's orders, newest first; archived ones only when asked for."""
+    query = """
+        SELECT o.order_id, o.order_date, o.total_amount, a.address_line1, a.city, 0 AS archived
+        FROM Orders o JOIN Addresses a ON o.address_id = a.address_id
+        WHERE o.customer_id = %s
+    """
+    params = (user_id,)
+    if include_archived:
+        query += """
+        UNION ALL
+        SELECT o.order_id, o.order_date, o.total_amount, a.address_line1, a.city, 1 AS archived
+        FROM OrdersArchive o JOIN Addresses a ON o.address_id = a.address_id
+        WHERE o.customer_id = %s
+        """
+        params = (user_id, user_id)
+    return _fetchall(connection, query + " ORDER BY order_date DESC;", params)
+
+def order_items(connection, order_id, order_date, archived=False):
+    """Lines of one order. order_date lets MySQL prune OrderItems to one partition."""
+    # Listings may have been removed since the order, hence the LEFT JOINs
+    items_table = "OrderItemsArchive" if archived else "OrderItems"
+    return _fetchall(
+        connection,
+        f"""
+        SELECT COALESCE(p.product_name, '(listing removed)'), u.first_name AS seller_name,
+               oi.quantity, oi.price_per_unit
+        FROM {items_table} oi
+        LEFT JOIN Inventory i ON oi.inventory_id = i.inventory_id
+        LEFT JOIN Products p ON i.product_id = p.product_id
+        LEFT JOIN Users u ON i.seller_id = u.user_id
+        WHERE oi.order_id = %s AND oi.order_date = %s;
+        """,
+        (order_id, order_date),
+    )
+
+def find_order(connection, user_id, order_id):
+    """(order_date, archived) for one of the user's orders; raises NotFoundError."""
+    row = _fetchone(connection, "SELECT order_date FROM Orders WHERE order_id = %s AND customer_id = %s",
+                    (order_id, user_id))
+    if row:
+        return row[0], False
+    row = _fetchone(connection, "SELECT order_date FROM OrdersArchive WHERE order_id = %s AND customer_id = %s",
+                    (order_id, user_id))
+    if row:
+        return row[0], True
+    raise NotFoundError(f"Order {order_id} not found.")
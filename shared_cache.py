@@ -0,0 +1,346 @@
+# shared_cache.py — catalog/offer cache shared by all worker processes on one box
+#
+#     HYPECULTURE_CACHE=local (default)               one process: an in-process dict
+#     HYPECULTURE_CACHE=unix:/run/user/1000/hc/sock   several workers: a cache server on a Unix socket
+#
+#     python shared_cache.py --socket /run/user/1000/hc/sock   # the server (launch_workers.py starts it)
+#
+# Messages are pickled, so the socket tier is locked down: server and workers must
+# share a secret HYPECULTURE_CACHE_KEY (launch_workers.py generates a random one),
+# and the socket must sit in a directory only this user can enter (mode 0700).
+#
+# With the socket tier every worker keeps a small local copy (L1) of what it read,
+# in front of the shared server (L2). invalidate() removes entries on the server,
+# which broadcasts the invalidation to every worker so they drop their L1 copies
+# too. Entries also expire after their TTL, which bounds staleness if a broadcast
+# is ever missed (e.g. while a worker reconnects). If the server is unreachable the
+# cache simply misses and callers read the database.
+#
+# Every invalidation bumps a version. A reader takes version() before reading the
+# database and passes it to set(), which drops the value if one of its keys was
+# invalidated in between -- otherwise a slow reader could put rows from before a
+# write back into the cache for every worker until the TTL ran out.
+import argparse
+import os
+import signal
+import sys
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+
+import metrics
+
+CACHE_URL = os.environ.get("HYPECULTURE_CACHE", "local")
+AUTHKEY = os.environ.get("HYPECULTURE_CACHE_KEY", "").encode()
+RECONNECT_DELAY = 2.0
+# Invalidation stamps a store remembers; older ones collapse into a horizon
+MAX_STAMPS = 10000
+
+CACHE_LOOKUPS = metrics.Counter(
+    "hypeculture_shared_cache_lookups", "Shared cache lookups by tier and result (l1_hit, hit, miss, error).", ["result"])
+CACHE_INVALIDATIONS = metrics.Counter(
+    "hypeculture_shared_cache_invalidations", "Invalidation broadcasts received by this process.")
+
+_listeners = []
+
+def add_invalidation_listener(callback):
+    """Call callback(keys, prefixes) for every invalidation this process sees.
+
+    That is its own invalidate() calls and, with the socket tier, the broadcasts
+    from other workers (and a flush of everything, prefix "", after reconnecting).
+    Runs on the invalidating or subscriber thread, so the callback must be quick.
+    """
+    _listeners.append(callback)
+
+def _notify(keys, prefixes):
+    for callback in list(_listeners):
+        callback(keys, prefixes)
+
+class _Store:
+    """Key -> (expires_at, value) with TTLs, invalidation by key or key prefix.
+
+    `version` counts invalidations; each key and prefix invalidated is stamped with
+    the version it was invalidated at, so set() can refuse values read before then.
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+        self.version = 0
+        self._key_stamps = {}
+        self._prefix_stamps = {}
+        self._horizon = 0  # stamps up to here were forgotten
+
+    def get_with_ttl(self, key):
+        """(seconds left, value), or None when missing or expired."""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        left = entry[0] - time.monotonic()
+        if left <= 0:
+            with self._lock:
+                self._data.pop(key, None)
+            return None
+        return left, entry[1]
+
+    def get(self, key):
+        entry = self.get_with_ttl(key)
+        return entry[1] if entry is not None else None
+
+    def _invalidated_since(self, key, version):
+        if version < self._horizon or self._key_stamps.get(key, 0) > version:
+            return True
+        return any(stamp > version and key.startswith(prefix) for prefix, stamp in self._prefix_stamps.items())
+
+    def set(self, key, value, ttl, version=None):
+        """Store `value` unless `key` was invalidated after `version`; returns whether it was."""
+        with self._lock:
+            if version is not None and self._invalidated_since(key, version):
+                return False
+            self._data[key] = (time.monotonic() + ttl, value)
+        return True
+
+    def invalidate(self, keys=(), prefixes=()):
+        """Drop the given keys and every key starting with one of `prefixes`."""
+        prefixes = tuple(prefixes)
+        with self._lock:
+            self.version += 1
+            if len(self._key_stamps) + len(self._prefix_stamps) >= MAX_STAMPS:
+                self._key_stamps.clear()
+                self._prefix_stamps.clear()
+                self._horizon = self.version - 1
+            for k in keys:
+                self._key_stamps[k] = self.version
+            for prefix in prefixes:
+                self._prefix_stamps[prefix] = self.version
+            doomed = {k for k in keys if k in self._data}
+            if prefixes:
+                doomed.update(k for k in self._data if k.startswith(prefixes))
+            for k in doomed:
+                del self._data[k]
+        return len(doomed)
+
+    def __len__(self):
+        return len(self._data)
+
+class LocalCache:
+    """Single-process cache: the same interface as SocketCache, without a server."""
+
+    def __init__(self):
+        self._store = _Store()
+
+    def get(self, key):
+        value = self._store.get(key)
+        CACHE_LOOKUPS.inc(result="l1_hit" if value is not None else "miss")
+        return value
+
+    def version(self):
+        """Token to take before reading what will be set(); see set()."""
+        return self._store.version
+
+    def set(self, key, value, ttl, version=None):
+        """Cache `value`, unless `key` was invalidated after `version` was taken."""
+        self._store.set(key, value, ttl, version)
+
+    def invalidate(self, keys=(), prefixes=()):
+        keys, prefixes = tuple(keys), tuple(prefixes)
+        self._store.invalidate(keys, prefixes)
+        _notify(keys, prefixes)
+
+class SocketCache:
+    """Client of the shared cache server, with a local L1 kept coherent by broadcasts."""
+
+    def __init__(self, address):
+        self.address = address
+        self._l1 = _Store()
+        self._conn = None
+        self._conn_lock = threading.Lock()
+        self._retry_at = 0.0
+        # The newest server version this worker has heard of (from broadcasts and
+        # replies); a set() stamped with it is refused if it lost a race on the server
+        self._server_version = 0
+        self._version_lock = threading.Lock()
+        threading.Thread(target=self._listen, name="cache-invalidations", daemon=True).start()
+
+    def _seen_server_version(self, version):
+        with self._version_lock:
+            self._server_version = max(self._server_version, version)
+
+    def _drop_l1(self, keys=(), prefixes=()):
+        self._l1.invalidate(keys, prefixes)
+        _notify(keys, prefixes)
+
+    def _request(self, *message):
+        with self._conn_lock:
+            if self._conn is None:
+                if time.monotonic() < self._retry_at:
+                    raise ConnectionError("shared cache unavailable")
+                try:
+                    self._conn = Client(self.address, family="AF_UNIX", authkey=AUTHKEY)
+                except OSError:
+                    self._retry_at = time.monotonic() + RECONNECT_DELAY
+                    raise
+            try:
+                self._conn.send(message)
+                return self._conn.recv()
+            except (OSError, EOFError):
+                self._conn = None
+                self._retry_at = time.monotonic() + RECONNECT_DELAY
+                raise ConnectionError("shared cache connection lost")
+
+    def get(self, key):
+        value = self._l1.get(key)
+        if value is not None:
+            CACHE_LOOKUPS.inc(result="l1_hit")
+            return value
+        l1_version = self._l1.version
+        try:
+            reply = self._request("get", key)
+        except (OSError, ConnectionError):
+            CACHE_LOOKUPS.inc(result="error")
+            return None
+        if reply is None:
+            CACHE_LOOKUPS.inc(result="miss")
+            return None
+        ttl, value = reply
+        self._l1.set(key, value, ttl, l1_version)  # unless a broadcast dropped it meanwhile
+        CACHE_LOOKUPS.inc(result="hit")
+        return value
+
+    def version(self):
+        """Token to take before reading what will be set(); see set()."""
+        return self._server_version, self._l1.version
+
+    def set(self, key, value, ttl, version=None):
+        """Cache `value` here and on the server, unless `key` was invalidated after
+        `version` was taken (then neither copy is written)."""
+        server_version, l1_version = version if version is not None else (None, None)
+        try:
+            stored = self._request("set", key, value, ttl, server_version)
+        except (OSError, ConnectionError):
+            stored = True  # keep serving it from L1 in this process; the TTL bounds staleness
+        if stored:
+            self._l1.set(key, value, ttl, l1_version)
+
+    def invalidate(self, keys=(), prefixes=()):
+        keys, prefixes = tuple(keys), tuple(prefixes)
+        self._drop_l1(keys, prefixes)
+        try:
+            self._seen_server_version(self._request("invalidate", keys, prefixes))
+        except (OSError, ConnectionError):
+            pass  # the TTL still bounds how long other workers serve the old value
+
+    def _listen(self):
+        """Apply invalidation broadcasts from the server to the L1 copy."""
+        while True:
+            try:
+                conn = Client(self.address, family="AF_UNIX", authkey=AUTHKEY)
+                conn.send(("subscribe",))
+                self._seen_server_version(conn.recv())
+                # Anything cached before (re)subscribing may have missed a broadcast
+                self._drop_l1(prefixes=("",))
+                while True:
+                    version, keys, prefixes = conn.recv()
+                    self._drop_l1(keys, prefixes)
+                    self._seen_server_version(version)
+                    CACHE_INVALIDATIONS.inc()
+            except (OSError, EOFError):
+                time.sleep(RECONNECT_DELAY)
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    """The process-wide cache selected by HYPECULTURE_CACHE."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            if CACHE_URL.startswith("unix:"):
+                if not AUTHKEY:
+                    raise RuntimeError("HYPECULTURE_CACHE=unix:... needs the server's HYPECULTURE_CACHE_KEY")
+                _cache = SocketCache(CACHE_URL.partition(":")[2])
+            else:
+                _cache = LocalCache()
+        return _cache
+
+# ---------- server ----------
+def _check_private_dir(directory):
+    info = os.stat(directory)
+    if info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise RuntimeError(f"{directory} must be owned by this user and closed to everyone else (mode 0700)")
+
+def serve(address):
+    """Run the cache server on a Unix socket until interrupted.
+
+    Refuses to start without HYPECULTURE_CACHE_KEY, in a directory other users can
+    reach, or over an existing file: only the socket this server created is removed.
+    """
+    if not AUTHKEY:
+        raise RuntimeError("HYPECULTURE_CACHE_KEY is not set; use a long random secret shared with the workers")
+    _check_private_dir(os.path.dirname(os.path.abspath(address)))
+    if os.path.lexists(address):
+        raise RuntimeError(f"{address} already exists; is another cache server running?")
+    store = _Store()
+    subscribers = []
+    subscribers_lock = threading.Lock()
+
+    def broadcast(version, keys, prefixes):
+        with subscribers_lock:
+            for conn in list(subscribers):
+                try:
+                    conn.send((version, keys, prefixes))
+                except OSError:
+                    subscribers.remove(conn)
+
+    def handle(conn):
+        try:
+            while True:
+                message = conn.recv()
+                op = message[0]
+                if op == "get":
+                    conn.send(store.get_with_ttl(message[1]))
+                elif op == "set":
+                    _, key, value, ttl, version = message
+                    conn.send(store.set(key, value, ttl, version))
+                elif op == "invalidate":
+                    _, keys, prefixes = message
+                    store.invalidate(keys, prefixes)
+                    version = store.version
+                    conn.send(version)
+                    broadcast(version, keys, prefixes)
+                elif op == "subscribe":
+                    with subscribers_lock:
+                        conn.send(store.version)
+                        subscribers.append(conn)
+                    return  # the connection now only carries broadcasts
+                elif op == "stats":
+                    conn.send({"entries": len(store), "subscribers": len(subscribers)})
+                else:
+                    conn.send(None)
+        except (OSError, EOFError):
+            conn.close()
+
+    # The listener unlinks its socket when closed, including on SIGTERM
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    with Listener(address, family="AF_UNIX", authkey=AUTHKEY) as listener:
+        print(f"shared cache listening on {address}")
+        while True:
+            try:
+                conn = listener.accept()
+            except OSError:
+                continue  # e.g. a client that failed authentication
+            threading.Thread(target=handle, args=(conn,), daemon=True).start()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the HYPECULTURE shared cache server.")
+    parser.add_argument("--socket", required=True, help="socket path, in a directory with mode 0700")
+    args = parser.parse_args()
+    try:
+        serve(args.socket)
+    except RuntimeError as e:
+        raise SystemExit(f"shared cache: {e}")
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+# sqlite_backend.py — server-less SQLite storage with the MySQL connector's interface
+#
+# The views talk to the database through the small slice of mysql-connector's API
+# they actually use: connection.cursor(buffered=...), commit(), rollback(),
+# is_connected(), close(); cursor.execute() with %s placeholders, fetchone(),
+# fetchall(), lastrowid, rowcount, close() and `with connection.cursor() as c`.
+# SQLiteConnection provides exactly that on top of sqlite3, with the schema, seed
+# data and stock trigger from sqlite_schema.sql, so the whole app (and the
+# benchmarks) can run without a MySQL server.
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sqlite_schema.sql")
+
+# Statements executed through any SQLiteConnection; read by the benchmarks
+_statement_count = 0
+_count_lock = threading.Lock()
+
+# %s placeholders outside of string literals
+_PLACEHOLDER = re.compile(r"('(?:[^']|'')*')|%s")
+
+def _to_qmark(query):
+    return _PLACEHOLDER.sub(lambda m: m.group(1) or "?", query)
+
+def statement_count():
+    """Total number of statements run through SQLite connections in this process."""
+    return _statement_count
+
+def _count_statement(_sql):
+    global _statement_count
+    with _count_lock:
+        _statement_count += 1
+
+# MySQL hands back datetime objects for TIMESTAMP columns; do the same here
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_converter("TIMESTAMP", lambda value: datetime.fromisoformat(value.decode()))
+
+class SQLiteCursor:
+    """Cursor wrapper accepting MySQL-style %s placeholders."""
+
+    def __init__(self, connection):
+        self._connection = connection
+        self._cursor = connection._conn.cursor()
+
+    def execute(self, query, params=()):
+        with self._connection._lock:
+            self._cursor.execute(_to_qmark(query), tuple(params or ()))
+        return self
+
+    def executemany(self, query, seq_of_params):
+        with self._connection._lock:
+            self._cursor.executemany(_to_qmark(query), [tuple(p) for p in seq_of_params])
+        return self
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def fetchmany(self, size=None):
+        return self._cursor.fetchmany(size or self._cursor.arraysize)
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def close(self):
+        self._cursor.close()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class SQLiteConnection:
+    """A sqlite3 connection that behaves like a mysql.connector connection for this app."""
+
+    def __init__(self, path=":memory:"):
+        self.path = path
+        # Streamlit runs every session in its own thread and the app shares one
+        # cached connection, so allow cross-thread use and serialize statements.
+        self._conn = sqlite3.connect(
+            path, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False
+        )
+        self._lock = threading.RLock()
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.set_trace_callback(_count_statement)
+
+    def cursor(self, buffered=None):
+        return SQLiteCursor(self)
+
+    def commit(self):
+        with self._lock:
+            self._conn.commit()
+
+    def rollback(self):
+        with self._lock:
+            self._conn.rollback()
+
+    def is_connected(self):
+        try:
+            self._conn.execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def close(self):
+        self._conn.close()
+
+    def has_schema(self):
+        row = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'Users'"
+        ).fetchone()
+        return row is not None
+
+    def apply_schema(self, schema_path=SCHEMA_PATH):
+        with open(schema_path, encoding="utf-8") as f:
+            script = f.read()
+        with self._lock:
+            self._conn.executescript(script)
+
+def create_sqlite_connection(path=":memory:"):
+    """Open (and, if new, initialize) a SQLite database with the HYPECULTURE schema."""
+    connection = SQLiteConnection(path)
+    if not connection.has_schema():
+        connection.apply_schema()
+    return connection
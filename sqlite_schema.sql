@@ -0,0 +1,149 @@
+-- SQLite version of hypeculture.sql, used by sqlite_backend.py.
+-- Same tables, columns, seed data and stock trigger; MySQL-only pieces are translated:
+--   AUTO_INCREMENT -> INTEGER PRIMARY KEY AUTOINCREMENT, ENUM -> CHECK constraint,
+--   CURRENT_TIMESTAMP -> local time (MySQL stores TIMESTAMPs in the session time zone),
+--   month partitions on Orders/OrderItems -> plain tables (same columns and indexes).
+-- The stored procedures are not ported; the app does not call them.
+PRAGMA foreign_keys = ON;
+
+-- ---------------------------------
+-- DDL (Data Definition Language)
+-- ---------------------------------
+
+CREATE TABLE Users (
+    user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    first_name VARCHAR(50) NOT NULL,
+    last_name VARCHAR(50) NOT NULL,
+    email VARCHAR(100) UNIQUE NOT NULL,
+    password_hash VARCHAR(255) NOT NULL,
+    user_role TEXT NOT NULL CHECK (user_role IN ('customer', 'seller', 'admin')),
+    created_at TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+
+CREATE TABLE Categories (
+    category_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    category_name VARCHAR(50) NOT NULL UNIQUE
+);
+
+CREATE TABLE Products (
+    product_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    product_name VARCHAR(100) NOT NULL,
+    brand VARCHAR(50),
+    category_id INT REFERENCES Categories(category_id)
+);
+
+CREATE TABLE Inventory (
+    inventory_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    seller_id INT REFERENCES Users(user_id),
+    product_id INT REFERENCES Products(product_id),
+    price DECIMAL(10, 2) NOT NULL,
+    stock_quantity INT NOT NULL
+);
+-- MySQL creates these implicitly for its foreign keys
+CREATE INDEX idx_inventory_seller ON Inventory (seller_id);
+CREATE INDEX idx_inventory_product ON Inventory (product_id);
+
+CREATE TABLE Addresses (
+    address_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INT REFERENCES Users(user_id),
+    address_line1 VARCHAR(255) NOT NULL,
+    city VARCHAR(100) NOT NULL,
+    state VARCHAR(100) NOT NULL,
+    postal_code VARCHAR(20) NOT NULL,
+    address_hash CHAR(64)
+);
+-- Checkout looks addresses up by (user_id, address_hash); also serves lookups by user_id
+CREATE INDEX idx_addresses_hash ON Addresses (user_id, address_hash);
+
+CREATE TABLE Orders (
+    order_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    customer_id INT,
+    address_id INT,
+    order_date TIMESTAMP NOT NULL DEFAULT (datetime('now', 'localtime')),
+    total_amount DECIMAL(10, 2),
+    order_status VARCHAR(20) DEFAULT 'Placed'
+);
+CREATE INDEX idx_orders_customer ON Orders (customer_id, order_date);
+CREATE INDEX idx_orders_date ON Orders (order_date);
+
+CREATE TABLE OrderItems (
+    order_item_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_id INT NOT NULL,
+    order_date TIMESTAMP NOT NULL DEFAULT (datetime('now', 'localtime')),
+    inventory_id INT,
+    quantity INT NOT NULL,
+    price_per_unit DECIMAL(10, 2) NOT NULL
+);
+CREATE INDEX idx_order_items_order ON OrderItems (order_id);
+CREATE INDEX idx_order_items_inventory ON OrderItems (inventory_id);
+
+CREATE TABLE OrdersArchive (
+    order_id INT PRIMARY KEY,
+    customer_id INT,
+    address_id INT,
+    order_date TIMESTAMP NOT NULL,
+    total_amount DECIMAL(10, 2),
+    order_status VARCHAR(20),
+    archived_at TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+CREATE INDEX idx_orders_archive_customer ON OrdersArchive (customer_id, order_date);
+
+CREATE TABLE OrderItemsArchive (
+    order_item_id INT PRIMARY KEY,
+    order_id INT NOT NULL,
+    order_date TIMESTAMP NOT NULL,
+    inventory_id INT,
+    quantity INT NOT NULL,
+    price_per_unit DECIMAL(10, 2) NOT NULL
+);
+CREATE INDEX idx_order_items_archive_order ON OrderItemsArchive (order_id);
+
+CREATE TABLE Cart (
+    cart_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    customer_id INT REFERENCES Users(user_id),
+    inventory_id INT REFERENCES Inventory(inventory_id),
+    quantity INT NOT NULL,
+    added_date TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+CREATE INDEX idx_cart_customer ON Cart (customer_id, added_date);
+CREATE INDEX idx_cart_inventory ON Cart (inventory_id);
+CREATE INDEX idx_cart_added ON Cart (added_date);
+
+-- ---------------------------------
+-- DML (Data Manipulation Language) - Sample Data
+-- ---------------------------------
+
+INSERT INTO Users (first_name, last_name, email, password_hash, user_role) VALUES
+('Alice', 'Wonder', 'alice@email.com', 'pass123', 'customer'),
+('Bob', 'Builder', 'bob@email.com', 'pass123', 'customer'),
+('Charlie', 'Shoes', 'charlie@seller.com', 'pass123', 'seller'),
+('Diana', 'Kicks', 'diana@seller.com', 'pass123', 'seller'),
+('Edward', 'Admin', 'admin@hypeculture.com', 'adminpass', 'admin');
+
+INSERT INTO Categories (category_name) VALUES ('Sneakers'), ('Boots'), ('Formal Shoes');
+
+INSERT INTO Products (product_name, brand, category_id) VALUES
+('Air Jordan 4', 'Nike', 1),
+('Panda Dunks', 'Nike', 1),
+('Yeezy Boost 350', 'Adidas', 1),
+('Classic Timberland', 'Timberland', 2);
+
+INSERT INTO Inventory (seller_id, product_id, price, stock_quantity) VALUES
+(3, 1, 250.00, 10),
+(4, 1, 245.00, 5),
+(3, 2, 150.00, 20),
+(4, 3, 220.00, 15);
+
+-- ---------------------------------
+-- Triggers
+-- ---------------------------------
+
+-- Trigger to update inventory stock after an order is placed
+CREATE TRIGGER AfterOrderItemInsert
+AFTER INSERT ON OrderItems
+FOR EACH ROW
+BEGIN
+    UPDATE Inventory
+    SET stock_quantity = stock_quantity - NEW.quantity
+    WHERE inventory_id = NEW.inventory_id;
+END;
@@ -0,0 +1,56 @@
+# tests/conftest.py — every test gets a fresh in-memory SQLite database
+#
+#     python -m pytest -q
+#
+# The SQLite backend (sqlite_backend.py) loads sqlite_schema.sql, seed data and the
+# stock trigger included, so no MySQL server is needed.
+import os
+import sys
+
+# Read by db_connector / shared_cache / metrics at import time
+os.environ["HYPECULTURE_DB"] = "sqlite"
+os.environ["HYPECULTURE_CACHE"] = "local"
+os.environ.pop("HYPECULTURE_METRICS_WORKER", None)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+import shared_cache  # noqa: E402
+from db_connector import create_connection  # noqa: E402
+
+# Seed rows from sqlite_schema.sql
+ALICE, BOB = 1, 2
+CHARLIE, DIANA = 3, 4  # sellers
+
+@pytest.fixture
+def connection():
+    # The process-wide cache (and the facet index listening to it) must not serve
+    # another test's database
+    shared_cache.get_cache().invalidate(prefixes=("",))
+    conn = create_connection()
+    yield conn
+    conn.close()
+
+@pytest.fixture
+def marketplace(connection):
+    """The seed data plus a small generated catalog, with some listings sold out."""
+    import datagen
+    counts = {"users": 200, "products": 80, "listings": 400, "orders": 300, "carts": 40}
+    datagen.populate(connection, counts, seed=7)
+    c = connection.cursor()
+    c.execute("UPDATE Inventory SET stock_quantity = 0 WHERE inventory_id % 4 = 0")
+    connection.commit()
+    c.close()
+    shared_cache.get_cache().invalidate(prefixes=("",))
+    return connection
+
+def fetchall(connection, query, params=()):
+    c = connection.cursor()
+    try:
+        c.execute(query, params)
+        return c.fetchall()
+    finally:
+        c.close()
+
+def scalar(connection, query, params=()):
+    return fetchall(connection, query, params)[0][0]
@@ -0,0 +1,26 @@
+import numpy as np
+
+import datagen
+from conftest import fetchall
+
+OFFSETS = {"users": 4, "products": 4, "inventory": 4, "addresses": 0, "orders": 0, "order_items": 0}
+COUNTS = {"users": 300, "products": 20, "listings": 30, "orders": 200, "carts": 400}
+
+def test_the_same_seed_generates_the_same_rows():
+    first, second = (datagen.generate(COUNTS, 5, 365, OFFSETS, [1, 2, 3]) for _ in range(2))
+    assert vars(first).keys() == vars(second).keys()
+    for name, values in vars(first).items():
+        assert np.array_equal(values, getattr(second, name)), name
+    assert datagen.generate(COUNTS, 6, 365, OFFSETS, [1, 2, 3]).order_ts.tolist() != first.order_ts.tolist()
+
+def test_carts_hold_each_listing_once_per_customer():
+    ds = datagen.generate(COUNTS, 5, 365, OFFSETS, [1, 2, 3])
+    pairs = set(zip(ds.cart_customer.tolist(), ds.cart_listing.tolist()))
+    assert len(pairs) == len(ds.cart_customer) > 0
+    assert len(ds.cart_qty) == len(ds.cart_ts) == len(ds.cart_customer)
+
+def test_populate_loads_quietly(connection, capsys):
+    ds = datagen.populate(connection, COUNTS, seed=5)
+    assert capsys.readouterr().out == ""
+    assert fetchall(connection, "SELECT COUNT(*) FROM OrderItems")[0][0] == len(ds.order_item_ids)
+    assert ds.order_ts.max() <= datagen.END_DATE.timestamp()
@@ -0,0 +1,59 @@
+import pytest
+
+import db_connector
+from conftest import scalar
+
+class _FakeConnection:
+    """Stands in for a pooled MySQL connection; closing returns it to the pool."""
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    def cursor(self, *args, **kwargs):
+        return self._connection.cursor()
+
+    def close(self):
+        pass
+
+class _FakePool:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def get_connection(self):
+        return _FakeConnection(self.connection)
+
+@pytest.fixture
+def failing_mysql(monkeypatch):
+    attempts = []
+
+    def pool(**kwargs):
+        attempts.append(kwargs)
+        raise db_connector.Error("Can't connect to MySQL server")
+
+    monkeypatch.setattr(db_connector, "DB_BACKEND", "mysql")
+    monkeypatch.setattr(db_connector.pooling, "MySQLConnectionPool", pool)
+    monkeypatch.setattr(db_connector, "_pool", None)
+    monkeypatch.setattr(db_connector, "_pool_retry_at", 0.0)
+    monkeypatch.setattr(db_connector, "_pool_failing", False)
+    return attempts
+
+def test_a_failed_pool_is_retried_after_a_delay_and_reported_once(failing_mysql, monkeypatch, capsys):
+    now = [1000.0]
+    monkeypatch.setattr(db_connector.time, "monotonic", lambda: now[0])
+    assert db_connector.get_pool() is None
+    assert db_connector.get_pool() is None
+    assert len(failing_mysql) == 1
+    now[0] += db_connector.POOL_RETRY_DELAY
+    assert db_connector.get_pool() is None
+    assert len(failing_mysql) == 2
+    assert capsys.readouterr().out.count("Error while creating MySQL connection pool") == 1
+
+def test_fetch_parallel_inside_a_borrowed_connection_reuses_it(connection, monkeypatch):
+    pool = _FakePool(connection)
+    monkeypatch.setattr(db_connector, "get_pool", lambda: pool)
+    monkeypatch.setattr(db_connector, "_executor", None)  # must not be needed
+    queries = {"users": ("SELECT COUNT(*) FROM Users", None), "one": ("SELECT %s", (1,))}
+    users = scalar(connection, "SELECT COUNT(*) FROM Users")
+    with db_connector._borrow(pool) as borrowed:
+        assert db_connector.fetch_parallel(borrowed, queries) == {"users": [(users,)], "one": [(1,)]}
+    assert db_connector._borrowed.count == 0
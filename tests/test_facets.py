@@ -0,0 +1,131 @@
+import random
+
+import numpy as np
+import pytest
+
+import facets
+import services
+import shared_cache
+from conftest import fetchall
+from facets import FacetIndex
+
+def _catalog(connection):
+    """Every browsable product worked out row by row: {product_id: (item, band, availability)}."""
+    listings = {}
+    for pid, name, brand, category_id, price, stock in fetchall(connection, """
+        SELECT p.product_id, p.product_name, p.brand, p.category_id, i.price, i.stock_quantity
+        FROM Products p JOIN Inventory i ON i.product_id = p.product_id
+        WHERE p.category_id IS NOT NULL
+    """):
+        listings.setdefault(pid, (name, brand, category_id, []))[3].append((float(price), stock))
+    catalog = {}
+    for pid, (name, brand, category_id, offers) in listings.items():
+        in_stock = [price for price, stock in offers if stock > 0]
+        price = min(in_stock) if in_stock else min(price for price, _ in offers)
+        band = int(np.searchsorted(facets.PRICE_EDGES, price, side="right"))
+        item = (pid, name, brand, category_id, round(price, 2), len(in_stock))
+        catalog[pid] = (item, band, "in_stock" if in_stock else "sold_out")
+    return catalog
+
+def _matches(entry, category_ids, brands, price_bands, availability, skip=None):
+    item, band, avail = entry
+    checks = {
+        "category": not category_ids or item[3] in category_ids,
+        "brand": not brands or (item[2] or facets.NO_BRAND) in brands,
+        "price": not price_bands or band in price_bands,
+        "availability": not availability or avail in availability,
+    }
+    return all(ok for name, ok in checks.items() if name != skip)
+
+def _all_pages(index, connection, sort, limit, **filters):
+    items, after = [], None
+    while True:
+        page = index.search(connection, sort=sort, after=after, limit=limit, **filters)
+        items += page["items"]
+        after = page["next"]
+        if after is None:
+            return items, page
+
+def _random_filters(rng, catalog):
+    brands = sorted({item[2] or facets.NO_BRAND for item, _, _ in catalog.values()})
+    categories = sorted({item[3] for item, _, _ in catalog.values()})
+    pick = lambda values: rng.sample(values, rng.randint(0, min(3, len(values))))  # noqa: E731
+    return {
+        "category_ids": pick(categories),
+        "brands": pick(brands),
+        "price_bands": pick(list(range(len(facets.PRICE_EDGES) + 1))),
+        "availability": pick(list(facets.AVAILABILITY)),
+    }
+
+def test_search_matches_a_brute_force_scan(marketplace):
+    catalog = _catalog(marketplace)
+    index = FacetIndex()
+    rng = random.Random(11)
+    for _ in range(25):
+        filters = _random_filters(rng, catalog)
+        expected = [e for e in catalog.values() if _matches(e, *filters.values())]
+
+        by_price, page = _all_pages(index, marketplace, "price", rng.choice([1, 7, 24]), **filters)
+        assert by_price == [e[0] for e in sorted(expected, key=lambda e: (round(e[0][4] * 100), e[0][0]))]
+        newest, _ = _all_pages(index, marketplace, "newest", 10, **filters)
+        assert newest == [e[0] for e in sorted(expected, key=lambda e: -e[0][0])]
+        assert page["total"] == len(expected)
+
+        # Each facet's counts apply the other facets' filters only
+        counts = page["facets"]
+        for value, _, n in counts["category"]:
+            assert n == sum(e[0][3] == value and _matches(e, *filters.values(), skip="category") for e in catalog.values())
+        for value, _, n in counts["brand"]:
+            assert n == sum((e[0][2] or facets.NO_BRAND) == value and _matches(e, *filters.values(), skip="brand")
+                            for e in catalog.values())
+        for value, _, n in counts["price"]:
+            assert n == sum(e[1] == value and _matches(e, *filters.values(), skip="price") for e in catalog.values())
+        for value, _, n in counts["availability"]:
+            assert n == sum(e[2] == value and _matches(e, *filters.values(), skip="availability")
+                            for e in catalog.values())
+
+def _snapshot(index, connection):
+    page = index.search(connection, limit=services.MAX_BROWSE_PAGE)
+    assert page["next"] is None
+    newest = index.search(connection, sort="newest", limit=services.MAX_BROWSE_PAGE)["items"]
+    return page["items"], newest, page["facets"], page["total"]
+
+def test_invalidated_products_are_refreshed_in_place(marketplace, monkeypatch):
+    monkeypatch.setattr(shared_cache, "_listeners", [])
+    index = FacetIndex()
+    shared_cache.add_invalidation_listener(index.note_invalidation)
+    before = _snapshot(index, marketplace)
+
+    c = marketplace.cursor()
+    c.execute("SELECT inventory_id, product_id FROM Inventory ORDER BY inventory_id LIMIT 30")
+    listings = c.fetchall()
+    changed = set()
+    for inventory_id, product_id in listings[:10]:
+        c.execute("UPDATE Inventory SET price = price * 0.5 + 400 WHERE inventory_id = %s", (inventory_id,))
+        changed.add(product_id)
+    for inventory_id, product_id in listings[10:20]:
+        c.execute("UPDATE Inventory SET stock_quantity = 0 WHERE inventory_id = %s", (inventory_id,))
+        changed.add(product_id)
+    for inventory_id, product_id in listings[20:]:
+        c.execute("DELETE FROM Cart WHERE inventory_id = %s", (inventory_id,))
+        c.execute("DELETE FROM OrderItems WHERE inventory_id = %s", (inventory_id,))
+        c.execute("DELETE FROM OrderItemsArchive WHERE inventory_id = %s", (inventory_id,))
+        c.execute("DELETE FROM Inventory WHERE inventory_id = %s", (inventory_id,))
+        changed.add(product_id)
+    marketplace.commit()
+    c.close()
+
+    # Not yet invalidated: still the old view
+    assert _snapshot(index, marketplace) == before
+    services.invalidate_offers(changed)
+    refreshed = _snapshot(index, marketplace)
+    assert refreshed != before
+    assert refreshed == _snapshot(FacetIndex(), marketplace)
+
+def test_browse_rejects_unknown_filters(connection):
+    with pytest.raises(services.ServiceError):
+        services.browse(connection, price_bands=[len(facets.PRICE_EDGES) + 1])
+    with pytest.raises(services.ServiceError):
+        services.browse(connection, availability=["backorder"])
+    with pytest.raises(services.ServiceError):
+        services.browse(connection, sort="popular")
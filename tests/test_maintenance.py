@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+
+import maintenance
+from conftest import ALICE, BOB, fetchall, scalar
+from services import address_hash
+
+def _cart_line(cursor, customer_id, inventory_id, added_date):
+    cursor.execute(
+        "INSERT INTO Cart (customer_id, inventory_id, quantity, added_date) VALUES (%s, %s, %s, %s)",
+        (customer_id, inventory_id, 1, added_date),
+    )
+
+def test_purge_deletes_only_carts_left_alone_past_the_ttl(connection):
+    old = datetime.now() - timedelta(days=45)
+    c = connection.cursor()
+    # Alice's cart is abandoned; Bob added a line yesterday, which keeps his old one
+    _cart_line(c, ALICE, 1, old)
+    _cart_line(c, ALICE, 3, old + timedelta(days=1))
+    _cart_line(c, BOB, 1, old)
+    _cart_line(c, BOB, 3, datetime.now() - timedelta(days=1))
+    connection.commit()
+    c.close()
+
+    assert maintenance.purge_abandoned_carts(connection, ttl_days=30, batch_size=1) == 2
+    assert fetchall(connection, "SELECT customer_id, inventory_id FROM Cart ORDER BY cart_id") == [(BOB, 1), (BOB, 3)]
+    assert maintenance.purge_abandoned_carts(connection, ttl_days=30) == 0
+
+def _address(cursor, user_id, line, hashed=True):
+    fields = (line, "Springfield", "IL", "62701")
+    cursor.execute(
+        "INSERT INTO Addresses (user_id, address_line1, city, state, postal_code, address_hash) "
+        "VALUES (%s, %s, %s, %s, %s, %s)",
+        (user_id, *fields, address_hash(*fields) if hashed else None),
+    )
+    return cursor.lastrowid
+
+def _order(cursor, user_id, address_id):
+    cursor.execute("INSERT INTO Orders (customer_id, address_id, total_amount) VALUES (%s, %s, %s)",
+                   (user_id, address_id, 10.00))
+
+def test_duplicate_addresses_are_hashed_merged_and_purged(connection):
+    c = connection.cursor()
+    keeper = _address(c, ALICE, "1 Main St")
+    twin = _address(c, ALICE, "1  MAIN ST", hashed=False)
+    other = _address(c, ALICE, "9 Elm St", hashed=False)
+    bobs = _address(c, BOB, "1 Main St")  # same address, another customer
+    _address(c, BOB, "5 Oak Ave")  # never ordered to
+    for user_id, address_id in ((ALICE, keeper), (ALICE, twin), (ALICE, other), (BOB, bobs)):
+        _order(c, user_id, address_id)
+    connection.commit()
+    c.close()
+
+    assert maintenance.hash_addresses(connection, batch_size=1) == 2
+    assert scalar(connection, "SELECT COUNT(*) FROM Addresses WHERE address_hash IS NULL") == 0
+    assert maintenance.merge_duplicate_addresses(connection) == (1, 1)
+    assert [row[0] for row in fetchall(connection, "SELECT address_id FROM Orders ORDER BY order_id")] == [
+        keeper, keeper, other, bobs]
+    assert maintenance.purge_orphaned_addresses(connection, batch_size=1) == 2
+    assert [row[0] for row in fetchall(connection, "SELECT address_id FROM Addresses ORDER BY address_id")] == [
+        keeper, other, bobs]
+
+def test_table_sizes_counts_rows(connection):
+    sizes = maintenance.table_sizes(connection)
+    assert set(sizes) == set(maintenance.REPORTED_TABLES)
+    assert sizes["Cart"][0] == scalar(connection, "SELECT COUNT(*) FROM Cart")
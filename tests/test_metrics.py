@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+import metrics
+
+@pytest.fixture
+def registry(monkeypatch):
+    """An empty registry, so only the test's own metrics are rendered."""
+    monkeypatch.setattr(metrics, "_registry", [])
+    monkeypatch.delenv("HYPECULTURE_METRICS_WORKER", raising=False)
+    return metrics._registry
+
+def test_counter_exposition_in_both_formats(registry):
+    logins = metrics.Counter("test_logins", "Logins.", ["result"])
+    logins.inc(result="success")
+    logins.inc(2, result="failure")
+    assert metrics.render(openmetrics=True) == (
+        "# HELP test_logins Logins.\n"
+        "# TYPE test_logins counter\n"
+        'test_logins_total{result="failure"} 2\n'
+        'test_logins_total{result="success"} 1\n'
+        "# EOF\n"
+    )
+    text = metrics.render(openmetrics=False)
+    assert "# TYPE test_logins_total counter\n" in text
+    assert "# EOF" not in text
+
+def test_histogram_buckets_are_cumulative(registry):
+    latency = metrics.Histogram("test_seconds", "Latency.", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value)
+    lines = metrics.render().splitlines()
+    assert lines[2:] == [
+        'test_seconds_bucket{le="0.1"} 2',
+        'test_seconds_bucket{le="1.0"} 3',
+        'test_seconds_bucket{le="+Inf"} 4',
+        "test_seconds_sum 3.65",
+        "test_seconds_count 4",
+        "# EOF",
+    ]
+    assert latency.count() == 4
+
+def test_histogram_times_blocks_that_raise(registry):
+    latency = metrics.Histogram("test_seconds", "Latency.", ["view"])
+    with pytest.raises(RuntimeError):
+        with latency.time(view="cart"):
+            raise RuntimeError
+    assert latency.count(view="cart") == 1
+
+def test_label_values_are_escaped(registry):
+    gauge = metrics.Gauge("test_gauge", "Gauge.", ["path"])
+    gauge.set(1.5, path='a\\b "c"\nd')
+    assert r'test_gauge{path="a\\b \"c\"\nd"} 1.5' in metrics.render()
+
+def test_labels_must_match_the_declared_names(registry):
+    counter = metrics.Counter("test_total_things", "Things.", ["result"])
+    with pytest.raises(ValueError):
+        counter.inc(outcome="ok")
+
+def test_worker_label_is_added_to_every_series(registry, monkeypatch):
+    monkeypatch.setenv("HYPECULTURE_METRICS_WORKER", "api-{pid}")
+    metrics.Counter("test_logins", "Logins.", ["result"]).inc(result="ok")
+    metrics.Gauge("test_pool", "Pool.").set(3)
+    worker = f'worker="api-{os.getpid()}"'
+    text = metrics.render()
+    assert f'test_logins_total{{result="ok",{worker}}} 1' in text
+    assert f"test_pool{{{worker}}} 3" in text
+
+def test_textfile_is_replaced_atomically(registry, tmp_path):
+    metrics.Gauge("test_pool", "Pool.").set(3)
+    path = tmp_path / "hypeculture.prom"
+    metrics.write_textfile(str(path))
+    assert path.read_text().endswith("test_pool 3\n")
+    assert os.listdir(tmp_path) == ["hypeculture.prom"]
@@ -0,0 +1,66 @@
+import numpy as np
+
+import recommendations
+from conftest import ALICE, fetchall, scalar
+from recommendations import Recommender, pair_counts
+
+def _unpack(keys, counts):
+    return {(int(k) >> 32, int(k) & 0xFFFFFFFF): int(n) for k, n in zip(keys, counts)}
+
+def test_pair_counts_counts_each_order_once_in_both_directions():
+    # Order 2 lists product 5 twice; order 3 has a single product
+    keys, counts = pair_counts([1, 1, 2, 2, 2, 2, 3], [5, 7, 5, 7, 9, 5, 9])
+    assert _unpack(keys, counts) == {(5, 7): 2, (7, 5): 2, (5, 9): 1, (9, 5): 1, (7, 9): 1, (9, 7): 1}
+    assert np.all(np.diff(keys) > 0)
+
+def test_pair_counts_skips_oversized_baskets():
+    keys, _ = pair_counts([1, 1, 1, 2, 2], [1, 2, 3, 4, 5], max_basket=2)
+    assert _unpack(keys, np.ones(len(keys))) == {(4, 5): 1, (5, 4): 1}
+
+def _random_lines(rng, orders, first_order=1):
+    sizes = rng.integers(1, 8, size=orders)
+    order_ids = np.repeat(np.arange(first_order, first_order + orders), sizes)
+    return order_ids, rng.integers(1, 40, size=len(order_ids))
+
+def test_incremental_adds_match_a_full_build():
+    rng = np.random.default_rng(3)
+    batches = [_random_lines(rng, 200, first) for first in (1, 201, 401)]
+    incremental = Recommender(k=4, max_basket=6)
+    incremental.build(*batches[0])
+    for batch in batches[1:]:
+        incremental.add_orders(*batch)
+
+    full = Recommender(k=4, max_basket=6)
+    full.build(np.concatenate([b[0] for b in batches]), np.concatenate([b[1] for b in batches]))
+    assert np.array_equal(incremental._keys, full._keys)
+    assert np.array_equal(incremental._counts, full._counts)
+    assert incremental._top == full._top
+
+def _place(connection, order_id, inventory_ids):
+    c = connection.cursor()
+    c.execute("INSERT INTO Orders (order_id, customer_id, total_amount) VALUES (%s, %s, %s)", (order_id, ALICE, 1.00))
+    c.executemany(
+        "INSERT INTO OrderItems (order_id, inventory_id, quantity, price_per_unit) VALUES (%s, %s, %s, %s)",
+        [(order_id, inventory_id, 1, 1.00) for inventory_id in inventory_ids],
+    )
+    connection.commit()
+    c.close()
+
+def test_refresh_picks_up_orders_committed_out_of_id_order(marketplace, monkeypatch):
+    monkeypatch.setattr(recommendations, "REREAD_WINDOW", 50)
+    last = scalar(marketplace, "SELECT MAX(order_id) FROM Orders")
+    listed = [row[0] for row in fetchall(marketplace, "SELECT inventory_id FROM Inventory LIMIT 6")]
+    rec = Recommender()
+    rec.load(marketplace)
+
+    _place(marketplace, last + 5, listed[:3])
+    assert rec.refresh(marketplace) == 3
+    _place(marketplace, last + 2, listed[2:5])  # an earlier id, committed later
+    assert rec.refresh(marketplace) == 3
+    assert rec.refresh(marketplace) == 0
+
+    full = Recommender()
+    full.load(marketplace)
+    assert np.array_equal(rec._keys, full._keys)
+    assert np.array_equal(rec._counts, full._counts)
+    assert rec._top == full._top
@@ -0,0 +1,143 @@
+import pytest
+
+import services
+from conftest import ALICE, BOB, scalar
+from services import NotFoundError, ServiceError
+
+# Seed listings: (inventory_id, product_id, price, stock)
+AJ4_CHARLIE = 1  # Air Jordan 4, 250.00, 10 in stock
+AJ4_DIANA = 2  # Air Jordan 4, 245.00, 5 in stock
+DUNKS = 3  # Panda Dunks, 150.00, 20 in stock
+
+def _stock(connection, inventory_id):
+    return scalar(connection, "SELECT stock_quantity FROM Inventory WHERE inventory_id = %s", (inventory_id,))
+
+def test_add_to_cart_merges_lines_up_to_stock(connection):
+    cart_id, qty = services.add_to_cart(connection, ALICE, AJ4_DIANA, 3)
+    assert qty == 3
+    assert services.add_to_cart(connection, ALICE, AJ4_DIANA, 2) == (cart_id, 5)
+    with pytest.raises(ServiceError, match="exceed stock"):
+        services.add_to_cart(connection, ALICE, AJ4_DIANA, 1)
+    with pytest.raises(ServiceError, match="positive"):
+        services.add_to_cart(connection, ALICE, DUNKS, 0)
+    with pytest.raises(NotFoundError):
+        services.add_to_cart(connection, ALICE, 999, 1)
+    assert [row[3] for row in services.get_cart(connection, ALICE)] == [5]
+
+def test_update_cart_items_is_all_or_nothing(connection):
+    aj4, _ = services.add_to_cart(connection, ALICE, AJ4_DIANA, 1)
+    dunks, _ = services.add_to_cart(connection, ALICE, DUNKS, 1)
+
+    with pytest.raises(ServiceError, match="Not enough stock"):
+        services.update_cart_items(connection, ALICE, {aj4: 2, dunks: 21})
+    assert [(row[5], row[3]) for row in services.get_cart(connection, ALICE)] == [(aj4, 1), (dunks, 1)]
+
+    assert services.update_cart_items(connection, ALICE, {aj4: 4, dunks: 0}) == (1, 1)
+    assert [(row[5], row[3]) for row in services.get_cart(connection, ALICE)] == [(aj4, 4)]
+
+def test_update_cart_items_only_touches_the_callers_cart(connection):
+    bobs, _ = services.add_to_cart(connection, BOB, DUNKS, 2)
+    with pytest.raises(NotFoundError):
+        services.update_cart_items(connection, ALICE, {bobs: 0})
+    with pytest.raises(ServiceError, match="negative"):
+        services.update_cart_items(connection, BOB, {bobs: -1})
+    assert [row[3] for row in services.get_cart(connection, BOB)] == [2]
+
+def test_cart_version_tracks_the_rows(connection):
+    services.add_to_cart(connection, ALICE, DUNKS, 2)
+    rows = services.get_cart(connection, ALICE)
+    assert services.cart_version(connection, ALICE) == services.cart_version_of(rows)
+    services.add_to_cart(connection, ALICE, DUNKS, 1)
+    assert services.cart_version(connection, ALICE) != services.cart_version_of(rows)
+
+def test_place_order_turns_the_cart_into_an_order(connection):
+    services.add_to_cart(connection, ALICE, AJ4_DIANA, 2)
+    services.add_to_cart(connection, ALICE, DUNKS, 3)
+    items, total = services.checkout_items(connection, ALICE)
+    assert total == 2 * 245.00 + 3 * 150.00
+
+    order_id = services.place_order(connection, ALICE, "1 Main St", "Springfield", "IL", "62701", items)
+
+    # The AfterOrderItemInsert trigger takes the lines off stock
+    assert _stock(connection, AJ4_DIANA) == 3
+    assert _stock(connection, DUNKS) == 17
+    assert services.get_cart(connection, ALICE) == []
+    (found_id, _, order_total, address_line, city, archived), = services.order_history(connection, ALICE)
+    assert (found_id, float(order_total), address_line, city, archived) == (order_id, total, "1 Main St", "Springfield", 0)
+    order_date, archived = services.find_order(connection, ALICE, order_id)
+    lines = services.order_items(connection, order_id, order_date, archived)
+    assert sorted((name, qty) for name, _, qty, _ in lines) == [("Air Jordan 4", 2), ("Panda Dunks", 3)]
+    with pytest.raises(NotFoundError):
+        services.find_order(connection, BOB, order_id)
+
+def test_repeat_orders_reuse_the_address(connection):
+    for address in (("1 Main St", "Springfield", "IL", "62701"), ("1  MAIN st ", "springfield", "IL", "62701")):
+        services.add_to_cart(connection, ALICE, DUNKS, 1)
+        services.place_order(connection, ALICE, *address)
+    assert scalar(connection, "SELECT COUNT(*) FROM Addresses WHERE user_id = %s", (ALICE,)) == 1
+    assert scalar(connection, "SELECT COUNT(DISTINCT address_id) FROM Orders WHERE customer_id = %s", (ALICE,)) == 1
+
+def test_place_order_rejects_a_cart_over_stock(connection):
+    services.add_to_cart(connection, ALICE, AJ4_DIANA, 5)
+    c = connection.cursor()
+    c.execute("UPDATE Inventory SET stock_quantity = 3 WHERE inventory_id = %s", (AJ4_DIANA,))
+    connection.commit()
+    c.close()
+    with pytest.raises(ServiceError, match="Not enough stock"):
+        services.place_order(connection, ALICE, "1 Main St", "Springfield", "IL", "62701")
+    assert scalar(connection, "SELECT COUNT(*) FROM Orders") == 0
+    assert _stock(connection, AJ4_DIANA) == 3
+    assert len(services.get_cart(connection, ALICE)) == 1
+
+def test_place_order_does_not_write_back_stale_stock(connection):
+    services.add_to_cart(connection, ALICE, DUNKS, 2)
+    items, _ = services.checkout_items(connection, ALICE)
+    # Bob checks out the same listing between Alice's read and her order
+    services.add_to_cart(connection, BOB, DUNKS, 3)
+    services.place_order(connection, BOB, "2 Oak Ave", "Springfield", "IL", "62701")
+    services.place_order(connection, ALICE, "1 Main St", "Springfield", "IL", "62701", items)
+    assert _stock(connection, DUNKS) == 15
+
+def test_place_order_refuses_to_oversell(connection):
+    services.add_to_cart(connection, ALICE, AJ4_DIANA, 4)
+    items, _ = services.checkout_items(connection, ALICE)
+    services.add_to_cart(connection, BOB, AJ4_DIANA, 3)
+    services.place_order(connection, BOB, "2 Oak Ave", "Springfield", "IL", "62701")
+    with pytest.raises(ServiceError, match="Only 2 left"):
+        services.place_order(connection, ALICE, "1 Main St", "Springfield", "IL", "62701", items)
+    assert _stock(connection, AJ4_DIANA) == 2
+    assert scalar(connection, "SELECT COUNT(*) FROM Orders WHERE customer_id = %s", (ALICE,)) == 0
+    assert len(services.get_cart(connection, ALICE)) == 1
+
+def test_place_order_keeps_lines_added_after_the_read(connection):
+    services.add_to_cart(connection, ALICE, DUNKS, 1)
+    items, _ = services.checkout_items(connection, ALICE)
+    services.add_to_cart(connection, ALICE, AJ4_CHARLIE, 1)
+    services.place_order(connection, ALICE, "1 Main St", "Springfield", "IL", "62701", items)
+    assert [row[0] for row in services.get_cart(connection, ALICE)] == ["Air Jordan 4"]
+
+def test_place_order_needs_an_address_and_a_cart(connection):
+    with pytest.raises(ServiceError, match="required"):
+        services.place_order(connection, ALICE, "1 Main St", "", "IL", "62701")
+    with pytest.raises(ServiceError, match="empty"):
+        services.place_order(connection, ALICE, "1 Main St", "Springfield", "IL", "62701")
+
+def test_offers_are_cached_until_invalidated(connection):
+    assert services.list_sellers(connection, 1)[0][3] == 245.00
+    c = connection.cursor()
+    c.execute("UPDATE Inventory SET price = 199.00 WHERE inventory_id = %s", (AJ4_CHARLIE,))
+    connection.commit()
+    c.close()
+    assert services.list_sellers(connection, 1)[0][3] == 245.00
+    services.invalidate_offers([1])
+    assert services.list_sellers(connection, 1)[0][3] == 199.00
+
+def test_checkout_invalidates_the_ordered_products_offers(connection):
+    assert services.list_sellers(connection, 2)[0][4] == 20
+    services.add_to_cart(connection, ALICE, DUNKS, 4)
+    services.place_order(connection, ALICE, "1 Main St", "Springfield", "IL", "62701")
+    assert services.list_sellers(connection, 2)[0][4] == 16
+
+def test_authenticate(connection):
+    assert services.authenticate(connection, "alice@email.com", "pass123") == (ALICE, "customer", "Alice")
+    assert services.authenticate(connection, "alice@email.com", "wrong") is None
@@ -0,0 +1,133 @@
+import os
+import secrets
+import subprocess
+import sys
+import time
+
+import pytest
+
+import shared_cache
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(shared_cache.time, "monotonic", clock.monotonic)
+    return clock
+
+def test_entries_expire_after_their_ttl(clock):
+    store = shared_cache._Store()
+    store.set("catalog", ["rows"], ttl=30)
+    clock.now += 29
+    assert store.get_with_ttl("catalog") == (1, ["rows"])
+    clock.now += 1
+    assert store.get("catalog") is None
+    assert len(store) == 0
+
+def test_invalidate_by_key_and_prefix():
+    store = shared_cache._Store()
+    for key in ("catalog", "offers:1", "offers:12", "offer_count"):
+        store.set(key, key, ttl=60)
+    assert store.invalidate(keys=("catalog", "missing"), prefixes=("offers:",)) == 3
+    assert [k for k in ("catalog", "offers:1", "offers:12", "offer_count") if store.get(k)] == ["offer_count"]
+
+def test_set_refuses_values_read_before_an_invalidation():
+    store = shared_cache._Store()
+    version = store.version
+    store.invalidate(keys=("offers:1",))
+    assert store.set("offers:1", "stale", 60, version) is False
+    assert store.set("offers:2", "fresh", 60, version) is True
+    store.invalidate(prefixes=("offers:",))
+    assert store.set("offers:2", "stale", 60, version) is False
+    assert store.set("offers:2", "unversioned", 60) is True
+    assert store.set("offers:2", "current", 60, store.version) is True
+    assert store.get("offers:2") == "current"
+
+def test_forgotten_stamps_refuse_every_older_version(monkeypatch):
+    monkeypatch.setattr(shared_cache, "MAX_STAMPS", 3)
+    store = shared_cache._Store()
+    old = store.version
+    for i in range(3):
+        store.invalidate(keys=(f"k{i}",))
+    recent = store.version
+    store.invalidate(keys=("k3",))  # clears the stamps
+    assert store.set("unrelated", 1, 60, old) is False
+    assert store.set("unrelated", 1, 60, recent) is True
+    assert store.set("k3", 1, 60, recent) is False
+
+def test_local_cache_notifies_listeners(monkeypatch):
+    seen = []
+    monkeypatch.setattr(shared_cache, "_listeners", [])
+    shared_cache.add_invalidation_listener(lambda keys, prefixes: seen.append((keys, prefixes)))
+    cache = shared_cache.LocalCache()
+    cache.set("offers:1", "rows", 60)
+    version = cache.version()
+    cache.invalidate(keys=["offers:1"], prefixes=["catalog"])
+    assert seen == [(("offers:1",), ("catalog",))]
+    cache.set("offers:1", "stale", 60, version)
+    assert cache.get("offers:1") is None
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.02)
+
+@pytest.fixture
+def cache_server(tmp_path, monkeypatch):
+    runtime = tmp_path / "run"
+    runtime.mkdir(mode=0o700)
+    address = str(runtime / "cache.sock")
+    key = secrets.token_hex(16)
+    server = subprocess.Popen(
+        [sys.executable, shared_cache.__file__, "--socket", address],
+        env={**os.environ, "HYPECULTURE_CACHE_KEY": key},
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        _wait_for(lambda: os.path.exists(address))
+        monkeypatch.setattr(shared_cache, "AUTHKEY", key.encode())
+        monkeypatch.setattr(shared_cache, "_listeners", [])
+        yield address
+    finally:
+        server.terminate()
+        server.wait(timeout=5)
+    assert not os.path.exists(address)
+
+def test_server_refuses_an_open_directory_or_an_existing_file(tmp_path):
+    env = {**os.environ, "HYPECULTURE_CACHE_KEY": "secret"}
+    open_dir = tmp_path / "open"
+    open_dir.mkdir(mode=0o755)
+    open_dir.chmod(0o755)
+    taken = tmp_path / "private"
+    taken.mkdir(mode=0o700)
+    (taken / "cache.sock").write_text("not ours")
+    for address, reason in ((open_dir / "cache.sock", "0700"), (taken / "cache.sock", "already exists")):
+        result = subprocess.run([sys.executable, shared_cache.__file__, "--socket", str(address)],
+                                env=env, capture_output=True, text=True, timeout=10)
+        assert result.returncode != 0 and reason in result.stderr
+    assert (taken / "cache.sock").read_text() == "not ours"
+
+def test_socket_caches_share_entries_and_invalidations(cache_server):
+    writer = shared_cache.SocketCache(cache_server)
+    reader = shared_cache.SocketCache(cache_server)
+    writer.set("offers:1", ["rows"], 60)
+    assert reader.get("offers:1") == ["rows"]  # from the server, now in reader's L1
+
+    before = reader.version()
+    writer.invalidate(prefixes=("offers:",))
+    _wait_for(lambda: reader._l1.get("offers:1") is None)
+    assert reader.get("offers:1") is None
+
+    # A fill read before the invalidation loses the race on the server too
+    reader.set("offers:1", ["stale"], 60, before)
+    assert writer.get("offers:1") is None
+    reader.set("offers:1", ["fresh"], 60, reader.version())
+    assert writer.get("offers:1") == ["fresh"]
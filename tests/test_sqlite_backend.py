@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+
+import sqlite_backend
+from conftest import ALICE, fetchall, scalar
+from db_connector import now_sql
+
+def test_order_item_insert_decrements_stock(connection):
+    c = connection.cursor()
+    c.execute("INSERT INTO Orders (customer_id, total_amount) VALUES (%s, %s)", (ALICE, 300.00))
+    order_id = c.lastrowid
+    c.executemany(
+        "INSERT INTO OrderItems (order_id, inventory_id, quantity, price_per_unit) VALUES (%s, %s, %s, %s)",
+        [(order_id, 3, 2, 150.00), (order_id, 3, 1, 150.00)],
+    )
+    connection.commit()
+    c.close()
+    assert scalar(connection, "SELECT stock_quantity FROM Inventory WHERE inventory_id = 3") == 17
+
+def test_placeholders_inside_string_literals_are_left_alone():
+    assert sqlite_backend._to_qmark("SELECT '%s', 'it''s %s' WHERE a = %s") == "SELECT '%s', 'it''s %s' WHERE a = ?"
+
+def test_literal_percent_s_survives_a_round_trip(connection):
+    assert fetchall(connection, "SELECT '100%s', %s", (7,)) == [("100%s", 7)]
+
+def test_timestamps_come_back_as_datetime(connection):
+    c = connection.cursor()
+    c.execute("INSERT INTO Cart (customer_id, inventory_id, quantity) VALUES (%s, %s, %s)", (ALICE, 3, 1))
+    stamp = datetime(2024, 5, 1, 12, 30)
+    c.execute("INSERT INTO Cart (customer_id, inventory_id, quantity, added_date) VALUES (%s, %s, %s, %s)",
+              (ALICE, 1, 1, stamp))
+    connection.commit()
+    c.close()
+    default, given = [row[0] for row in fetchall(connection, "SELECT added_date FROM Cart ORDER BY cart_id")]
+    assert isinstance(default, datetime)
+    assert given == stamp
+
+def test_now_sql_is_on_the_default_timestamp_clock(connection):
+    c = connection.cursor()
+    c.execute("INSERT INTO Cart (customer_id, inventory_id, quantity) VALUES (%s, %s, %s)", (ALICE, 3, 1))
+    connection.commit()
+    c.close()
+    default = scalar(connection, "SELECT added_date FROM Cart")
+    now = datetime.fromisoformat(scalar(connection, f"SELECT {now_sql()}"))
+    assert abs(now - default) < timedelta(seconds=5)
+
+def test_statements_are_counted(connection):
+    before = sqlite_backend.statement_count()
+    fetchall(connection, "SELECT 1")
+    fetchall(connection, "SELECT 2")
+    assert sqlite_backend.statement_count() - before == 2